@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares two JSON reports produced by run_benchmarks.py, typically for two
+different commits. Ratios are new/old, so a throughput ratio above one and a
+latency ratio below one mean the new version is faster.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+from sys import stdout
+
+from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter
+
+
+def compare(old, new):
+    old_results = dict((b["name"], b) for b in old["benchmarks"])
+
+    print >>stdout, "%-50s %12s %12s %8s %8s %8s %8s" % (
+        "benchmark", "old calls/s", "new calls/s", "ratio", "p50", "p99",
+        "rss")
+
+    for b in new["benchmarks"]:
+        try:
+            o = old_results[b["name"]]
+        except KeyError:
+            continue
+
+        print >>stdout, "%-50s %12.1f %12.1f %8.2f %8.2f %8.2f %8.2f" % (
+            b["name"],
+            o["throughput"],
+            b["throughput"],
+            _ratio(b["throughput"], o["throughput"]),
+            _ratio(b["latency_ms"]["p50"], o["latency_ms"]["p50"]),
+            _ratio(b["latency_ms"]["p99"], o["latency_ms"]["p99"]),
+            _ratio(b["peak_rss_kb"], o["peak_rss_kb"]))
+
+    print >>stdout
+    print >>stdout, "peak RSS of main process: %d kB -> %d kB (%.2f)" % (
+        old["peak_rss_kb"], new["peak_rss_kb"],
+        _ratio(new["peak_rss_kb"], old["peak_rss_kb"]))
+
+
+def _ratio(new, old):
+    try:
+        return new / float(old)
+    except (TypeError, ZeroDivisionError):
+        return float("nan")
+
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__,
+                            version="%(prog)s version " + __version__,
+                            formatter_class=RawDescriptionHelpFormatter)
+
+    parser.add_argument("old", type=file,
+                        help="JSON report of the old version")
+
+    parser.add_argument("new", type=file,
+                        help="JSON report of the new version")
+
+    args = parser.parse_args()
+
+    compare(json.load(args.old), json.load(args.new))
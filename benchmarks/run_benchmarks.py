@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks pycornetto on a synthetic Cornetto database and writes the
+results as JSON to standard output.
+
+For every benchmark, the number of calls, the throughput (calls per second)
+and the latency percentiles (in milliseconds) are reported, together with
+the peak resident set size during the benchmark. Every benchmark runs in a
+forked child process, so its peak is not hidden by that of an earlier
+benchmark; the resident set size of the child at the start, i.e. the memory
+inherited from the main process, is reported as well. Results of different
+commits can be compared with compare_benchmarks.py.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter
+from cornetto.parse import parse_cdb
+from cornetto.simcornet import SimCornet
+
+from synthetic import SyntheticCornetto
+
+
+_sim_measures = ( "resnik_sim", "jiang_conrath_dist", "jiang_conrath_sim",
+                  "lin_sim" )
+
+
+
+class BenchmarkRunner(object):
+    """
+    Runs benchmarks and collects the results
+    """
+
+    def __init__(self, repeat=1):
+        self.repeat = repeat
+        self.results = []
+
+
+    def run(self, name, func, args_list):
+        """
+        Call func once for every tuple of arguments in args_list (repeated
+        self.repeat times) in a forked child process and record the
+        latencies and the peak resident set size
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            os.close(read_fd)
+            status = 1
+
+            try:
+                result = self._measure(name, func, args_list)
+                out = os.fdopen(write_fd, "w")
+                json.dump(result, out)
+                out.close()
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        inp = os.fdopen(read_fd)
+        data = inp.read()
+        inp.close()
+        os.waitpid(pid, 0)
+
+        if not data:
+            raise RuntimeError("benchmark %s failed" % name)
+
+        self.results.append(json.loads(data))
+        print >>sys.stderr, "%-45s %8d calls %10.1f calls/s %8d kB" % (
+            name, self.results[-1]["calls"], self.results[-1]["throughput"],
+            self.results[-1]["peak_rss_kb"])
+
+
+    def _measure(self, name, func, args_list):
+        # a forked process starts with a peak equal to its current size
+        base_rss = _peak_rss()
+        latencies = []
+        start = time.time()
+
+        for i in range(self.repeat):
+            for args in args_list:
+                t = time.time()
+                func(*args)
+                latencies.append(time.time() - t)
+
+        total = time.time() - start
+        result = _summarize(name, latencies, total)
+        result["base_rss_kb"] = base_rss
+        return result
+
+
+def _summarize(name, latencies, total):
+    latencies = sorted(latencies)
+
+    return dict(
+        name=name,
+        calls=len(latencies),
+        total_sec=total,
+        throughput=len(latencies) / total if total else None,
+        latency_ms=dict(
+            mean=1000 * sum(latencies) / len(latencies),
+            p50=1000 * _percentile(latencies, 50),
+            p90=1000 * _percentile(latencies, 90),
+            p99=1000 * _percentile(latencies, 99),
+            max=1000 * latencies[-1]),
+        peak_rss_kb=_peak_rss())
+
+
+def _percentile(sorted_values, p):
+    # nearest-rank method
+    k = int(math.ceil(p / 100.0 * len(sorted_values))) - 1
+    return sorted_values[max(0, k)]
+
+
+def _peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # bytes on Mac OS X, kilobytes elsewhere
+    if sys.platform == "darwin":
+        peak /= 1024
+
+    return peak
+
+
+def _git_commit():
+    try:
+        return subprocess.Popen(["git", "rev-parse", "HEAD"],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                cwd=os.path.dirname(os.path.abspath(__file__))
+                                ).communicate()[0].strip() or None
+    except OSError:
+        return None
+
+
+
+def run_benchmarks(args):
+    workdir = tempfile.mkdtemp(prefix="cornetto-bench-")
+    cdb_lu = os.path.join(workdir, "cdb_lu.xml")
+    cdb_syn = os.path.join(workdir, "cdb_syn.xml")
+    rand = random.Random(args.seed)
+
+    try:
+        print >>sys.stderr, "Generating synthetic database in", workdir
+        synth = SyntheticCornetto(forms=args.forms,
+                                  senses=args.senses,
+                                  synset_size=args.synset_size,
+                                  depth=args.depth,
+                                  counts=True,
+                                  seed=args.seed)
+        synth.write(cdb_lu, cdb_syn)
+
+        runner = BenchmarkRunner(repeat=args.repeat)
+
+        # parsing is slow, so always once
+        runner.run("parse_cdb", parse_cdb, [(cdb_lu, cdb_syn)])
+        runner.run("parse_cdb(engine=lean)", parse_cdb,
+                   [(cdb_lu, cdb_syn, False, "lean")])
+
+        c = SimCornet(cdb_lu, cdb_syn)
+
+        forms = [ rand.choice(synth.forms) for i in range(args.queries) ]
+        specs = [ "%s:%s:%s" % rand.choice(synth.lex_units)[1:]
+                  for i in range(args.queries) ]
+        pairs = [ (rand.choice(synth.forms), rand.choice(synth.forms))
+                  for i in range(args.pairs) ]
+
+        runner.run("get_lex_units(form)", c.get_lex_units,
+                   [ (form,) for form in forms ])
+        runner.run("get_lex_units(form:cat:sense)", c.get_lex_units,
+                   [ (spec,) for spec in specs ])
+        runner.run("get_synsets(form)", c.get_synsets,
+                   [ (form,) for form in forms ])
+
+        for depth in range(1, args.max_depth + 1):
+            runner.run("get_related_lex_units(form, HAS_HYPERONYM%d)" % depth,
+                       c.get_related_lex_units,
+                       [ (form, "HAS_HYPERONYM%d" % depth) for form in forms ])
+
+        for depth in range(1, min(args.max_depth, 3) + 1):
+            runner.run("get_related_lex_units(form, %d)" % depth,
+                       c.get_related_lex_units,
+                       [ (form, str(depth)) for form in forms[:args.pairs] ])
+
+        runner.run("test_lex_units_relation(form, HAS_HYPERONYM+, form)",
+                   c.test_lex_units_relation,
+                   [ (form1, "HAS_HYPERONYM+", form2) for form1, form2 in pairs ])
+        runner.run("test_lex_units_relation(form, +, form)",
+                   c.test_lex_units_relation,
+                   [ (form1, "+", form2) for form1, form2 in pairs ])
+        runner.run("all_common_subsumers(form, form)",
+                   c.all_common_subsumers, pairs)
+
+        for measure in _sim_measures:
+            runner.run("%s(form, form)" % measure,
+                       getattr(c, measure), pairs)
+
+        return dict(
+            pycornetto_version=__version__,
+            git_commit=_git_commit(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            parameters=dict(forms=args.forms,
+                            senses=args.senses,
+                            synset_size=args.synset_size,
+                            depth=args.depth,
+                            queries=args.queries,
+                            pairs=args.pairs,
+                            repeat=args.repeat,
+                            seed=args.seed),
+            database=dict(lex_units=len(synth.lex_units),
+                          synsets=len(synth.synsets),
+                          relations=len(synth.relations),
+                          edges=c._graph.number_of_edges()),
+            benchmarks=runner.results,
+            # of the main process, which only generates and reads the
+            # database
+            peak_rss_kb=_peak_rss())
+    finally:
+        shutil.rmtree(workdir)
+
+
+
+parser = ArgumentParser(description=__doc__,
+                        version="%(prog)s version " + __version__,
+                        formatter_class=RawDescriptionHelpFormatter)
+
+parser.add_argument("-f", "--forms", type=int, default=5000,
+                    help="number of word forms (default is 5000)")
+
+parser.add_argument("-s", "--senses", type=int, default=3,
+                    help="maximum number of senses per word form (default is 3)")
+
+parser.add_argument("-z", "--synset-size", type=int, default=4,
+                    help="maximum number of lexical units per synset "
+                    "(default is 4)")
+
+parser.add_argument("-d", "--depth", type=int, default=8,
+                    help="maximum depth of the hypernym hierarchy (default is 8)")
+
+parser.add_argument("-q", "--queries", type=int, default=1000,
+                    help="number of lookup queries (default is 1000)")
+
+parser.add_argument("-p", "--pairs", type=int, default=100,
+                    help="number of word pairs for relation tests, common "
+                    "subsumers and similarity (default is 100)")
+
+parser.add_argument("-m", "--max-depth", type=int, default=4,
+                    help="maximum search depth for related lexical units "
+                    "(default is 4)")
+
+parser.add_argument("-n", "--repeat", type=int, default=1,
+                    help="number of times to repeat each query benchmark "
+                    "(default is 1)")
+
+parser.add_argument("-r", "--seed", type=int, default=0,
+                    help="seed for random generator (default is 0)")
+
+parser.add_argument("-o", "--output",
+                    help="file to write results to (default is standard output)")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    report = run_benchmarks(args)
+
+    if args.output:
+        out = open(args.output, "w")
+    else:
+        out = sys.stdout
+
+    json.dump(report, out, indent=2, sort_keys=True)
+    out.write("\n")
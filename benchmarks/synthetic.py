@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Generates a synthetic Cornetto database (cdb_lu and cdb_syn xml files) of
+configurable size.
+
+The generated files have the same structure as the real Cornetto files,
+as far as pycornetto is concerned, and can therefore be used for testing
+and benchmarking without access to the licensed database. Synsets are
+organized in a hypernym hierarchy per category, and other relations are
+added at random according to the relation mix. Optionally, counts and
+subcounts are added as by cornetto-add-counts.py and
+cornetto-add-sub-counts.py.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import random
+from xml.sax.saxutils import quoteattr
+
+
+_syllables = ( "ba be bo bi de da do di ka ke ko ki la le lo li ma me mo mi "
+               "na ne no ni pa pe po pi ra re ro ri sa se so si ta te to ti "
+               "va ve vo wa we wo za ze zo aan oor ijs eit uin lamp slang "
+               "hond kat berg boom steen huis" ).split()
+
+_cats = ("noun", "verb", "adj")
+_cat_weights = (0.7, 0.2, 0.1)
+
+# probability that a synset has this relation to a random other synset
+default_relation_mix = {
+    "HAS_MERO_PART": 0.15,
+    "HAS_HOLO_MEMBER": 0.05,
+    "NEAR_SYNONYM": 0.10,
+    "ROLE_INSTRUMENT": 0.05,
+    "XPOS_NEAR_SYNONYM": 0.05,
+}
+
+# inverse relations, which are added as well, like in Cornetto
+_inverse_relations = {
+    "HAS_HYPERONYM": "HAS_HYPONYM",
+    "HAS_MERO_PART": "HAS_HOLO_PART",
+    "HAS_HOLO_MEMBER": "HAS_MERO_MEMBER",
+    "NEAR_SYNONYM": "NEAR_SYNONYM",
+    "ROLE_INSTRUMENT": "INVOLVED_INSTRUMENT",
+    "XPOS_NEAR_SYNONYM": "XPOS_NEAR_SYNONYM",
+}
+
+
+
+class SyntheticCornetto(object):
+    """
+    A synthetic Cornetto database
+
+    After generation, the following attributes are available:
+        - forms: list of word forms
+        - lex_units: list of (c_lu_id, form, cat, sense) tuples
+        - synsets: list of (c_sy_id, list of c_lu_ids) tuples
+        - relations: list of (from_sy_id, relation, to_sy_id) tuples
+        - counts: dict mapping c_lu_id to (count, subcount),
+          empty unless counts were requested
+    """
+
+    def __init__(self, forms=1000, senses=3, synset_size=4, depth=8,
+                 relation_mix=None, counts=False, seed=0):
+        """
+        Generate a new synthetic database
+
+        @keyword forms: number of word forms
+        @type forms: int
+
+        @keyword senses: maximum number of senses per word form
+        @type senses: int
+
+        @keyword synset_size: maximum number of lexical units per synset
+        @type synset_size: int
+
+        @keyword depth: maximum depth of the hypernym hierarchy
+        @type depth: int
+
+        @keyword relation_mix: mapping of relation names to the probability
+            that a synset has this relation to a random other synset; defaults
+            to default_relation_mix
+        @type relation_mix: dict
+
+        @keyword counts: add counts and subcounts
+        @type counts: bool
+
+        @keyword seed: seed for the random generator
+        @type seed: int
+        """
+        if relation_mix is None:
+            relation_mix = default_relation_mix
+
+        self._random = random.Random(seed)
+        self.forms = self._generate_forms(forms)
+        self.lex_units = self._generate_lex_units(senses)
+        self.synsets = self._generate_synsets(synset_size)
+        self.relations = self._generate_hierarchy(depth)
+        self.relations += self._generate_relations(relation_mix)
+        self.counts = {}
+
+        if counts:
+            self._generate_counts()
+
+
+    def write(self, cdb_lu, cdb_syn):
+        """
+        Write database to xml files
+
+        @param cdb_lu: file to write the lexical units to
+        @type cdb_lu: file or filename
+
+        @param cdb_syn: file to write the synsets to
+        @type cdb_syn: file or filename
+        """
+        self.write_cdb_lu(cdb_lu)
+        self.write_cdb_syn(cdb_syn)
+
+
+    def write_cdb_lu(self, out):
+        if not hasattr(out, "write"):
+            out = open(out, "w")
+
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+        if self.counts:
+            out.write("<cdb_lu_collection%s>\n" % "".join(
+                ' count-total-%s="%d"' % (cat, count)
+                for cat, count in sorted(self._count_totals().items())))
+        else:
+            out.write("<cdb_lu_collection>\n")
+
+        for c_lu_id, form, cat, sense in self.lex_units:
+            if self.counts:
+                count_attribs = ' count="%d" subcount="%d"' % self.counts[c_lu_id]
+            else:
+                count_attribs = ""
+
+            out.write('<cdb_lu c_lu_id=%s c_seq_nr="%s" type="swu">'
+                      '<form form-cat="%s" form-spelling=%s%s/>'
+                      '<sem-definition>a synthetic lexical unit</sem-definition>'
+                      '</cdb_lu>\n' %
+                      (quoteattr(c_lu_id), sense, cat, quoteattr(form),
+                       count_attribs))
+
+        out.write("</cdb_lu_collection>\n")
+        out.flush()
+
+
+    def write_cdb_syn(self, out):
+        if not hasattr(out, "write"):
+            out = open(out, "w")
+
+        sy_id2relations = {}
+
+        for from_sy_id, relation, to_sy_id in self.relations:
+            sy_id2relations.setdefault(from_sy_id, []).append((relation, to_sy_id))
+
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        out.write("<cdb_syn_collection>\n")
+
+        for c_sy_id, lu_ids in self.synsets:
+            out.write('<cdb_synset c_sy_id="%s" d_synset_id="d_%s">'
+                      '<synonyms>' % (c_sy_id, c_sy_id))
+
+            for c_lu_id in lu_ids:
+                out.write('<synonym c_lu_id=%s/>' % quoteattr(c_lu_id))
+
+            out.write('</synonyms><wn_internal_relations>')
+
+            for relation, to_sy_id in sy_id2relations.get(c_sy_id, []):
+                out.write('<relation relation_name="%s" target="%s"/>' %
+                          (relation, to_sy_id))
+
+            out.write('</wn_internal_relations></cdb_synset>\n')
+
+        out.write("</cdb_syn_collection>\n")
+        out.flush()
+
+
+    # generation
+
+    def _generate_forms(self, n):
+        forms = set()
+
+        while len(forms) < n:
+            length = self._random.randint(1, 4)
+            forms.add("".join(self._random.choice(_syllables)
+                              for i in range(length)))
+
+        forms = sorted(forms)
+        self._random.shuffle(forms)
+        return forms
+
+
+    def _generate_lex_units(self, max_senses):
+        lex_units = []
+
+        for form in self.forms:
+            # most words have a single sense
+            n = min(max_senses, 1 + int(self._random.expovariate(1.5)))
+
+            for sense in range(1, n + 1):
+                cat = self._choose_cat()
+                c_lu_id = "l_%d" % len(lex_units)
+                lex_units.append((c_lu_id, form, cat, str(sense)))
+
+        return lex_units
+
+
+    def _choose_cat(self):
+        r = self._random.random()
+
+        for cat, weight in zip(_cats, _cat_weights):
+            if r < weight:
+                return cat
+            r -= weight
+
+        return _cats[0]
+
+
+    def _generate_synsets(self, max_size):
+        # group lexical units per category, then chop into synsets
+        synsets = []
+        self._sy_id2cat = {}
+
+        for cat in _cats:
+            lu_ids = [ lu[0] for lu in self.lex_units if lu[2] == cat ]
+            self._random.shuffle(lu_ids)
+
+            while lu_ids:
+                size = self._random.randint(1, max_size)
+                c_sy_id = "d_%s-%d" % (cat[0], len(synsets))
+                synsets.append((c_sy_id, lu_ids[:size]))
+                self._sy_id2cat[c_sy_id] = cat
+                lu_ids = lu_ids[size:]
+
+        return synsets
+
+
+    def _generate_hierarchy(self, max_depth):
+        # Synsets are assigned to levels, where each level is larger than the
+        # previous one, and each synset gets a random hypernym from the level
+        # above.
+        relations = []
+        self._hypernym = {}
+
+        for cat in _cats:
+            sy_ids = [ sy_id
+                       for sy_id, lus in self.synsets
+                       if self._sy_id2cat[sy_id] == cat ]
+            levels = []
+            size = 1
+
+            while sy_ids:
+                if len(levels) == max_depth:
+                    levels[-1].extend(sy_ids)
+                    break
+                levels.append(sy_ids[:size])
+                sy_ids = sy_ids[size:]
+                size *= 3
+
+            for parents, children in zip(levels, levels[1:]):
+                for child in children:
+                    parent = self._random.choice(parents)
+                    self._hypernym[child] = parent
+                    relations.append((child, "HAS_HYPERONYM", parent))
+                    relations.append((parent, "HAS_HYPONYM", child))
+
+        return relations
+
+
+    def _generate_relations(self, relation_mix):
+        relations = []
+        sy_ids = [ sy_id for sy_id, lus in self.synsets ]
+
+        for from_sy_id in sy_ids:
+            for relation, p in sorted(relation_mix.items()):
+                if self._random.random() < p:
+                    to_sy_id = self._random.choice(sy_ids)
+
+                    if to_sy_id != from_sy_id:
+                        relations.append((from_sy_id, relation, to_sy_id))
+                        inverse = _inverse_relations.get(relation)
+
+                        if inverse:
+                            relations.append((to_sy_id, inverse, from_sy_id))
+
+        return relations
+
+
+    def _generate_counts(self):
+        # Zipfian counts per word form and category, so that, like in
+        # cornetto-add-counts.py, all senses of a form get the same count
+        form_counts = {}
+
+        for rank, form in enumerate(self.forms):
+            for cat in _cats:
+                form_counts[form, cat] = int(1000000 / (rank + 1.0) ** 1.1 *
+                                             self._random.random())
+
+        sy_count = {}
+
+        for c_sy_id, lu_ids in self.synsets:
+            sy_count[c_sy_id] = 0
+
+        lu_id2sy_id = {}
+
+        for c_sy_id, lu_ids in self.synsets:
+            for c_lu_id in lu_ids:
+                lu_id2sy_id[c_lu_id] = c_sy_id
+
+        # a lexical unit contributes its count to all of its hypernyms
+        for c_lu_id, form, cat, sense in self.lex_units:
+            count = form_counts[form, cat]
+            sy_id = self._hypernym.get(lu_id2sy_id[c_lu_id])
+
+            while sy_id:
+                sy_count[sy_id] += count
+                sy_id = self._hypernym.get(sy_id)
+
+        for c_lu_id, form, cat, sense in self.lex_units:
+            count = form_counts[form, cat]
+            subcount = count + sy_count[lu_id2sy_id[c_lu_id]]
+            self.counts[c_lu_id] = (count, subcount)
+
+
+    def _count_totals(self):
+        totals = dict((cat, 0) for cat in _cats)
+        totals["other"] = 0
+
+        for c_lu_id, form, cat, sense in self.lex_units:
+            totals[cat] = max(totals[cat], self.counts[c_lu_id][1])
+
+        totals["all"] = sum(totals.values())
+        return totals
+
+
+
+
+if __name__ == "__main__":
+    from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter
+
+    parser = ArgumentParser(description=__doc__,
+                            version="%(prog)s version " + __version__,
+                            formatter_class=RawDescriptionHelpFormatter)
+
+    parser.add_argument("cdb_lu",
+                        help="xml file to write the lexical units to")
+
+    parser.add_argument("cdb_syn",
+                        help="xml file to write the synsets to")
+
+    parser.add_argument("-f", "--forms", type=int, default=1000,
+                        help="number of word forms (default is 1000)")
+
+    parser.add_argument("-s", "--senses", type=int, default=3,
+                        help="maximum number of senses per word form "
+                        "(default is 3)")
+
+    parser.add_argument("-z", "--synset-size", type=int, default=4,
+                        help="maximum number of lexical units per synset "
+                        "(default is 4)")
+
+    parser.add_argument("-d", "--depth", type=int, default=8,
+                        help="maximum depth of the hypernym hierarchy "
+                        "(default is 8)")
+
+    parser.add_argument("-c", "--counts", action="store_true",
+                        help="add counts and subcounts")
+
+    parser.add_argument("-r", "--seed", type=int, default=0,
+                        help="seed for random generator (default is 0)")
+
+    args = parser.parse_args()
+
+    SyntheticCornetto(forms=args.forms,
+                      senses=args.senses,
+                      synset_size=args.synset_size,
+                      depth=args.depth,
+                      counts=args.counts,
+                      seed=args.seed).write(args.cdb_lu, args.cdb_syn)
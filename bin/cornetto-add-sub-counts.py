@@ -79,19 +79,11 @@ class TweakedCornet(Cornet):
           self._c_sy_id2synset, 
           self._graph,
           self._lu_etree ) = tweaked_parse_cdb(cdb_lu, cdb_syn, verbose)
+        self._after_parse()
     
         
         
     def write_cdb_lu(self, out=stdout):
-        # tricky: remove the added attribute "c_sy_id" which points to the
-        # synsets a lu belongs to, otherwise it will be doubled when the file
-        # is read again!
-        for lu in self._lu_etree.findall("//cdb_lu"):
-            try:
-                del lu.attrib["c_sy_id"]
-            except KeyError:
-                pass
-            
         out.write('<?xml version="1.0" encoding="utf-8"?>\n')    
         self._lu_etree.write(out, encoding="utf-8")
         
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Annotates text with the lexical units of the Cornetto database, using all
+cores.
+
+Reads one text (e.g. a sentence) per line from a file or standard input,
+finds the forms of all lexical units in it, including multi-word units,
+and writes a line with a JSON list of matches for every input line to
+standard output. A match is an object with the keys "start" and "end"
+(character offsets, or token indices with --tokenized), "text" and
+"c_lu_ids".
+
+examples:
+
+  %(prog)s cdb_lu.xml cdb_syn.xml corpus.txt
+
+  %(prog)s --tokenized --longest --form-folding all cdb_lu.xml cdb_syn.xml
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+
+from itertools import izip, tee
+from multiprocessing import cpu_count
+from sys import exit, stderr, stdin, stdout
+
+from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter, \
+     FileType
+from cornetto.annotate import Annotator, annotate_parallel
+from cornetto.cornet import Cornet
+
+
+parser = ArgumentParser(description=__doc__,
+                        version="%(prog)s version " + __version__,
+                        formatter_class=RawDescriptionHelpFormatter)
+
+parser.add_argument("cdb_lu",
+                    type=file,
+                    help="xml file specifying the lexical units")
+
+parser.add_argument("cdb_syn",
+                    type=file,
+                    help="xml file specifying the synsets")
+
+parser.add_argument("input",
+                    type=FileType("r"),
+                    nargs="?",
+                    default=stdin,
+                    help="file with one text per line, encoded in UTF-8 "
+                    "(default is standard input)")
+
+parser.add_argument("-t", "--tokenized",
+                    action="store_true",
+                    help="input is tokenized: tokens are separated by spaces")
+
+parser.add_argument("-l", "--longest",
+                    action="store_true",
+                    help="only the longest match at every position, so "
+                    "matches do not overlap")
+
+parser.add_argument("--form-folding",
+                    choices=("case", "diacritics", "all"),
+                    help="match word forms ignoring case, diacritics or all "
+                    "of these")
+
+parser.add_argument("-w", "--workers",
+                    type=int,
+                    default=cpu_count(),
+                    help="number of worker processes (default is the number "
+                    "of cores)")
+
+parser.add_argument("-c", "--chunk-size",
+                    type=int,
+                    default=1000,
+                    metavar="N",
+                    help="number of lines sent to a worker at once "
+                    "(default is 1000)")
+
+parser.add_argument('-V', '--verbose',
+                    action='store_true',
+                    help="verbose output")
+
+
+
+def _read_texts(lines, tokenized):
+    for line in lines:
+        text = line.rstrip("\r\n").decode("utf-8")
+
+        if tokenized:
+            yield text.split()
+        else:
+            yield text
+
+
+def _match_text(text, match, tokenized):
+    if tokenized:
+        return u" ".join(text[match.start:match.end])
+    else:
+        return text[match.start:match.end]
+
+
+
+args = parser.parse_args()
+
+if args.workers < 1 or args.chunk_size < 1:
+    exit("Error: number of workers and chunk size must be positive")
+
+print >>stderr, "Reading Cornetto database - this may take a while..."
+cornet = Cornet()
+cornet.open(args.cdb_lu, args.cdb_syn, args.verbose, engine="lean")
+annotator = Annotator(cornet, args.form_folding)
+# only the annotator is needed by the workers
+del cornet
+
+# the texts are needed once more to output the matched text; tee buffers
+# no more of them than annotate_parallel reads ahead
+texts, originals = tee(_read_texts(args.input, args.tokenized))
+results = annotate_parallel(annotator, texts, args.tokenized, args.longest,
+                            args.workers, args.chunk_size)
+
+try:
+    for text, matches in izip(originals, results):
+        record = [ dict(start=match.start, end=match.end,
+                        text=_match_text(text, match, args.tokenized),
+                        c_lu_ids=match.c_lu_ids)
+                   for match in matches ]
+        stdout.write(json.dumps(record, ensure_ascii=False).encode("utf-8") +
+                     "\n")
+except KeyboardInterrupt:
+    exit(1)
+except IOError as e:
+    # e.g. output piped into head
+    exit("Error: %s" % e)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Answers many queries to the Cornetto database offline, using all cores.
+
+Reads one query per line from a file or standard input, where the
+arguments of a query are separated by tabs, and writes the results in the
+same order to standard output. By default every line is a query for the ask
+method, e.g. "lamp HAS_HYPERONYM", but any other method can be used, e.g.
+a similarity measure with lines like "lamp<TAB>fiets".
+
+Arguments are strings, except those of optional parameters, which are
+converted to the type of their default: integers and floats are parsed,
+booleans are given as true/false, yes/no or 1/0, parameters with None as
+default, such as limit, take a number if the argument is one, and an empty
+argument means the default. For example, with -M get_k_shortest_paths, the
+line "lamp<TAB>HAS_HYPERONYM<TAB>licht<TAB>5" asks for 5 paths. Methods
+taking sequences, such as find_multi_word_units, are not supported.
+
+The database is read once, after which a pool of worker processes is forked
+which share it. With --snapshot, the workers instead open a memory-mapped
+SQLite snapshot of the database (no similarity measures), which is built
+first if it is older than the xml files.
+
+Results are written as tab-separated values - the arguments followed by the
+result, where results other than numbers and strings are encoded in JSON -
+or as JSON lines with the keys "query" and "result". Failed queries are
+reported on standard error, and have an empty result or an "error" key.
+Blank lines are not queries, but get an empty result too, so the output
+has one line for every input line.
+
+examples:
+
+  %(prog)s cdb_lu.xml cdb_syn.xml queries.txt
+
+  cut -f1,2 pairs.txt | %(prog)s -s -M lin_sim -f jsonl cdb_lu.xml cdb_syn.xml
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+
+from collections import deque
+from inspect import getargspec
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+from os.path import getsize
+from sys import exit, stderr, stdin, stdout
+
+from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter, \
+     FileType
+
+
+# set in the main process before forking, or by the initializer of a worker
+_cornet = None
+_method = None
+
+
+parser = ArgumentParser(description=__doc__,
+                        version="%(prog)s version " + __version__,
+                        formatter_class=RawDescriptionHelpFormatter)
+
+parser.add_argument("cdb_lu",
+                    type=file,
+                    help="xml file specifying the lexical units")
+
+parser.add_argument("cdb_syn",
+                    type=file,
+                    help="xml file specifying the synsets")
+
+parser.add_argument("input",
+                    type=FileType("r"),
+                    nargs="?",
+                    default=stdin,
+                    help="file with one query per line (default is standard "
+                    "input)")
+
+parser.add_argument("-M", "--method",
+                    default="ask",
+                    help="method to call with the arguments on each line, "
+                    "which are converted to the types of the defaults of "
+                    "optional parameters (default is ask)")
+
+parser.add_argument("-f", "--format",
+                    choices=("tsv", "jsonl"),
+                    default="tsv",
+                    help="format of the results (default is tsv)")
+
+parser.add_argument("-o", "--output-format",
+                    choices=("spec", "xml"),
+                    default="spec",
+                    help="output format of lexical units and synsets "
+                    "(default is spec)")
+
+parser.add_argument("-w", "--workers",
+                    type=int,
+                    default=cpu_count(),
+                    help="number of worker processes (default is the number "
+                    "of cores)")
+
+parser.add_argument("-c", "--chunk-size",
+                    type=int,
+                    default=100,
+                    metavar="N",
+                    help="number of queries sent to a worker at once "
+                    "(default is 100)")
+
+parser.add_argument("--snapshot",
+                    metavar="FILE",
+                    help="let the workers open this SQLite snapshot of the "
+                    "database, which is rebuilt if older than the xml files")
+
+parser.add_argument("-m", "--max-depth",
+                    type=int)
+
+parser.add_argument('-s', '--similarity',
+                    action='store_true',
+                    help="load the word similarity measures "
+                    "(requires cdb_lu file with counts)")
+
+parser.add_argument('-V', '--verbose',
+                    action='store_true',
+                    help="verbose output")
+
+
+
+def _open_snapshot(db_file, max_depth, output_format):
+    # connections must not be shared between processes
+    global _cornet
+    from cornetto.sqlite import SqliteCornet
+    # map all of the file, leaving room for growth as in prefork mode
+    _cornet = SqliteCornet(db_file, mmap_size=2 * getsize(db_file))
+    _configure(_cornet, max_depth, output_format)
+
+
+def _configure(cornet, max_depth, output_format):
+    if max_depth is not None:
+        cornet.set_max_depth(max_depth)
+
+    cornet.set_output_format(output_format)
+
+
+def _answer(chunk):
+    """
+    answer a chunk of queries; returns a list of (result, error) pairs
+    """
+    method = getattr(_cornet, _method)
+    answers = []
+
+    for query in chunk:
+        if not query:
+            # blank line
+            answers.append((None, None))
+            continue
+
+        try:
+            answers.append((method(*_convert(method, query)), None))
+        except Exception as e:
+            answers.append((None, "%s: %s" % (e.__class__.__name__, e)))
+
+    return answers
+
+
+def _convert(method, query):
+    """
+    convert the arguments of optional parameters to the type of their
+    default, or to a number if possible when the default is None; empty
+    arguments are replaced by the default
+    """
+    names, varargs, keywords, defaults = getargspec(method)
+    # index in query of the first optional parameter (names include self)
+    first = len(names) - len(defaults or ()) - 1
+    args = list(query)
+
+    for i, arg in enumerate(query[first:len(names) - 1], first):
+        default = defaults[i - first]
+
+        if arg == "":
+            args[i] = default
+        elif isinstance(default, bool):
+            args[i] = _parse_bool(arg)
+        elif isinstance(default, (int, long, float)):
+            args[i] = type(default)(arg)
+        elif default is None:
+            args[i] = _parse_number(arg)
+
+    return args
+
+
+def _parse_bool(arg):
+    value = arg.lower()
+
+    if value in ("true", "yes", "1"):
+        return True
+    elif value in ("false", "no", "0"):
+        return False
+
+    raise ValueError("not a boolean: " + repr(arg))
+
+
+def _parse_number(arg):
+    for number_type in int, float:
+        try:
+            return number_type(arg)
+        except ValueError:
+            pass
+
+    return arg
+
+
+def _read_chunks(lines, chunk_size):
+    """
+    split lines into chunks of tuples of arguments, where blank lines are
+    empty tuples
+    """
+    queries = ( tuple(line.rstrip("\r\n").decode("utf-8").split("\t"))
+                if line.strip() else ()
+                for line in lines )
+
+    while True:
+        chunk = list(islice(queries, chunk_size))
+
+        if not chunk:
+            break
+
+        yield chunk
+
+
+def _imap_chunks(pool, chunks, pending):
+    """
+    like pool.imap, but reads no more than pending chunks ahead, so large
+    inputs are streamed instead of read into memory
+    """
+    results = deque()
+
+    for chunk in chunks:
+        results.append((chunk, pool.apply_async(_answer, (chunk,))))
+
+        if len(results) >= pending:
+            chunk, result = results.popleft()
+            yield chunk, result.get()
+
+    while results:
+        chunk, result = results.popleft()
+        yield chunk, result.get()
+
+
+def _write_tsv(query, result, error):
+    if error is not None or result is None:
+        result = u""
+    elif not isinstance(result, (basestring, int, long, float)):
+        result = json.dumps(result, ensure_ascii=False)
+
+    stdout.write(u"\t".join(query + (unicode(result),)).encode("utf-8") +
+                 "\n")
+
+
+def _write_jsonl(query, result, error):
+    record = dict(query=query, result=result)
+
+    if error is not None:
+        record["error"] = error
+
+    stdout.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + "\n")
+
+
+
+args = parser.parse_args()
+
+if args.snapshot and args.similarity:
+    exit("Error: similarity measures are not available with a snapshot")
+
+if args.workers < 1 or args.chunk_size < 1:
+    exit("Error: number of workers and chunk size must be positive")
+
+if args.snapshot:
+    from cornetto.sqlite import SqliteCornet
+    from cornetto.prefork import build_snapshot
+    cornet_class = SqliteCornet
+    build_snapshot(args.cdb_lu, args.cdb_syn, args.snapshot, args.verbose)
+elif args.similarity:
+    from cornetto.simcornet import SimCornet
+    cornet_class = SimCornet
+else:
+    from cornetto.cornet import Cornet
+    cornet_class = Cornet
+
+if args.method.startswith("_") or not callable(getattr(cornet_class,
+                                                       args.method, None)):
+    exit("Error: %s is not a method of %s" % (repr(args.method),
+                                              cornet_class.__name__))
+
+_method = args.method
+
+if args.snapshot:
+    pool = Pool(args.workers, initializer=_open_snapshot,
+                initargs=(args.snapshot, args.max_depth, args.output_format))
+else:
+    print >>stderr, "Reading Cornetto database - this may take a while..."
+    # read before forking, so the workers share the database copy-on-write
+    _cornet = cornet_class()
+    _cornet.open(args.cdb_lu, args.cdb_syn, args.verbose)
+    _configure(_cornet, args.max_depth, args.output_format)
+    pool = Pool(args.workers)
+
+write = _write_jsonl if args.format == "jsonl" else _write_tsv
+chunks = _read_chunks(args.input, args.chunk_size)
+line = 0
+
+try:
+    for chunk, answers in _imap_chunks(pool, chunks, 2 * args.workers):
+        for query, (result, error) in zip(chunk, answers):
+            line += 1
+
+            if error is not None:
+                print >>stderr, "Error in query on line %d (%s): %s" % (
+                    line, "\t".join(query).encode("utf-8"), error)
+
+            write(query, result, error)
+except KeyboardInterrupt:
+    pool.terminate()
+    exit(1)
+except IOError as e:
+    # e.g. output piped into head
+    pool.terminate()
+    exit("Error: %s" % e)
+else:
+    pool.close()
+    pool.join()
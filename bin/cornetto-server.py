@@ -53,9 +53,110 @@ parser.add_argument('-l', '--log',
                     action='store_true', 
                     help="log requests")
 
+parser.add_argument("-a", "--asynchronous",
+                    action="store_true",
+                    help="use the asynchronous server, which keeps connections "
+                    "alive, also accepts JSON requests on /json, and executes "
+                    "calls in a pool of workers")
+
+parser.add_argument("-w", "--workers",
+                    type=int,
+                    default=4,
+                    help="number of workers of the asynchronous server "
+                    "(default is 4)")
+
+parser.add_argument("-e", "--executor",
+                    choices=("thread", "process"),
+                    default="thread",
+                    help="type of workers of the asynchronous server "
+                    "(default is thread)")
+
+parser.add_argument("-T", "--threads",
+                    type=int,
+                    default=0,
+                    metavar="N",
+                    help="handle requests in a pool of N threads "
+                    "(default is one request at a time)")
+
+parser.add_argument("-q", "--queue-size",
+                    type=int,
+                    default=64,
+                    metavar="N",
+                    help="maximal number of requests waiting for a thread or "
+                    "worker; further requests are refused as 'server busy' "
+                    "(default is 64)")
+
+parser.add_argument("-r", "--reserved",
+                    type=int,
+                    default=1,
+                    metavar="N",
+                    help="number of threads or places in the worker pool "
+                    "reserved for cheap calls such as get_lex_units "
+                    "(default is 1)")
+
+parser.add_argument("--client-calls",
+                    type=int,
+                    metavar="N",
+                    help="maximal number of calls in progress per client IP "
+                    "address")
+
+parser.add_argument("--client-rate",
+                    type=float,
+                    metavar="CALLS",
+                    help="maximal number of calls per second per client IP "
+                    "address")
+
+parser.add_argument("--client-burst",
+                    type=int,
+                    metavar="N",
+                    help="maximal number of calls per client IP address in a "
+                    "burst (default is twice the rate)")
+
+parser.add_argument("-c", "--cache-size",
+                    type=int,
+                    default=0,
+                    metavar="MB",
+                    help="cache results in MB megabytes of memory, shared by "
+                    "all worker processes (default is no cache)")
+
+parser.add_argument("-P", "--prefork",
+                    type=int,
+                    metavar="N",
+                    help="fork N worker processes which share a memory-mapped "
+                    "SQLite snapshot of the database (no similarity measures)")
+
+parser.add_argument("--snapshot",
+                    metavar="FILE",
+                    help="SQLite snapshot for prefork mode, which is rebuilt "
+                    "if older than the xml files (default is name of cdb_lu "
+                    "file plus '.db')")
+
+parser.add_argument("-S", "--slow-log",
+                    metavar="FILE",
+                    help="write slow queries to FILE as JSON lines")
+
+parser.add_argument("-t", "--slow-threshold",
+                    type=float,
+                    default=0.1,
+                    metavar="SECONDS",
+                    help="minimal duration of slow queries in seconds "
+                    "(default is 0.1)")
+
+parser.add_argument("--slow-sample",
+                    type=float,
+                    default=0.0,
+                    metavar="FRACTION",
+                    help="fraction of the other queries to write to the "
+                    "slow query log (default is 0.0)")
+
 parser.add_argument("-m", "--max-depth", 
                     type=int)
 
+parser.add_argument("--form-folding",
+                    choices=("case", "diacritics", "all"),
+                    help="match word forms ignoring case, diacritics or all "
+                    "of these")
+
 parser.add_argument('-s', '--similarity', 
                     action='store_true', 
                     help="extend interface with word similarity measures "
@@ -90,4 +191,24 @@ except ValueError:
     exit("Error: %s is not a valid port number" % repr(port))
     
 
-start_server(**args.__dict__)    
+if args.prefork:
+    if args.similarity:
+        exit("Error: similarity measures are not available in prefork mode")
+    if args.asynchronous:
+        exit("Error: prefork mode uses the threaded server")
+    if args.threads or args.client_calls or args.client_rate:
+        exit("Error: admission control is not available in prefork mode")
+    from cornetto.prefork import start_prefork_server
+    args.workers = args.prefork
+    del args.prefork, args.asynchronous, args.executor, args.similarity, \
+        args.threads, args.queue_size, args.reserved, args.client_calls, \
+        args.client_rate, args.client_burst
+    start_prefork_server(**args.__dict__)
+elif args.asynchronous:
+    from cornetto.asyncserver import start_async_server
+    del args.asynchronous, args.prefork, args.snapshot, args.threads
+    start_async_server(**args.__dict__)
+else:
+    del args.asynchronous, args.workers, args.executor, args.prefork, \
+        args.snapshot
+    start_server(**args.__dict__)    
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by 
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Exports the Cornetto xml database files to an indexed SQLite database file, 
+which can be queried using the SqliteCornet class from the cornetto.sqlite
+module.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+from os.path import exists
+from sys import exit, stderr
+
+from cornetto.argparse import ArgumentParser, RawDescriptionHelpFormatter
+from cornetto.sqlite import export_cdb
+
+
+parser = ArgumentParser(description=__doc__,
+                        version="%(prog)s version " + __version__,
+                        formatter_class=RawDescriptionHelpFormatter)
+
+parser.add_argument("cdb_lu", 
+                    type=file,
+                    help="xml file specifying the lexical units")
+
+parser.add_argument("cdb_syn", 
+                    type=file,
+                    help="xml file specifying the synsets")
+
+parser.add_argument("db_file", 
+                    help="SQLite database file to write")
+
+parser.add_argument('-V', '--verbose', 
+                    action='store_true', 
+                    help="verbose output")
+
+args = parser.parse_args()
+
+
+if exists(args.db_file):
+    exit("Error: %s already exists" % repr(args.db_file))
+
+print >>stderr, "Reading Cornetto database - this may take a while..."
+
+export_cdb(args.cdb_lu, args.cdb_syn, args.db_file, args.verbose)
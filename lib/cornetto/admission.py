@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+admission control for the Cornetto servers
+
+An AdmissionController decides for every call whether the server accepts
+it, and refuses it right away with a fault otherwise:
+
+    - the server is busy (fault code 503) when the maximal number of calls
+      in progress is reached, where expensive calls (graph search and
+      similarity) are refused earlier than cheap ones (lookups, help), so
+      there is always capacity left for the latter
+
+    - a client is too demanding (fault code 429) when it exceeds its
+      maximal number of calls in progress or its rate limit; clients are
+      identified by IP address, and rates are limited by a token bucket,
+      which allows short bursts
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import xmlrpclib
+
+from threading import Lock
+from time import time
+
+
+# methods which only look things up, and are therefore cheap
+cheap_methods = frozenset((
+    "get_lex_units", "get_lex_unit_by_id", "get_synset_by_id",
+    "get_synsets", "get_count", "get_total_counts",
+    "help", "help_specs", "help_formats", "db_version", "echo", "stats",
+    "health", "reload_status", "system.listMethods", "system.methodHelp",
+    "system.methodSignature" ))
+
+# fault codes
+SERVER_BUSY = 503
+TOO_MANY_REQUESTS = 429
+
+# number of clients above which idle clients are forgotten
+_max_idle_clients = 10000
+
+
+
+class Rejected(xmlrpclib.Fault):
+    """
+    Fault for a call which is not admitted
+
+    @ivar reason: "busy", "client_busy" or "rate"
+    """
+
+    def __init__(self, code, message, reason):
+        xmlrpclib.Fault.__init__(self, code, message)
+        self.reason = reason
+
+
+
+class TokenBucket(object):
+    """
+    Allows on average rate events per second, and bursts of at most burst
+    events
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time()
+
+
+    def take(self, now=None):
+        """
+        Take a token if there is one; returns whether there was
+        """
+        if now is None: now = time()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        return False
+
+
+    def full(self, now=None):
+        if now is None: now = time()
+        return self.tokens + (now - self.last) * self.rate >= self.burst
+
+
+
+class AdmissionController(object):
+    """
+    Thread-safe admission control for calls
+    """
+
+    def __init__(self, max_calls=None, max_expensive=None, client_calls=None,
+                 client_rate=None, client_burst=None,
+                 cheap_methods=cheap_methods):
+        """
+        All limits are optional.
+
+        @keyword max_calls: maximal number of calls in progress
+        @keyword max_expensive: maximal number of expensive calls in progress
+        @keyword client_calls: maximal number of calls in progress per client
+        @keyword client_rate: maximal number of calls per second per client
+        @keyword client_burst: maximal number of calls per client in a burst;
+            by default twice the rate (and at least one)
+        @keyword cheap_methods: names of cheap methods
+        """
+        self.max_calls = max_calls
+        self.max_expensive = max_expensive
+        self.client_calls = client_calls
+        self.client_rate = client_rate
+
+        if client_burst is None and client_rate:
+            client_burst = max(1, 2 * client_rate)
+
+        self.client_burst = client_burst
+        self.cheap_methods = cheap_methods
+        self.calls = 0
+        self.expensive = 0
+        self._lock = Lock()
+        # client -> calls in progress
+        self._client_calls = {}
+        # client -> token bucket
+        self._buckets = {}
+
+
+    def admit(self, client, methods):
+        """
+        Admit a call, or a batch of calls, from a client, or raise Rejected
+
+        @param client: client identifier, e.g. IP address
+        @param methods: list of names of the methods called
+
+        @return: ticket to pass to release once the call is finished
+        """
+        expensive = not all( method in self.cheap_methods
+                             for method in methods )
+
+        with self._lock:
+            if self.max_calls is not None and self.calls >= self.max_calls:
+                raise Rejected(SERVER_BUSY, "server busy", "busy")
+
+            if ( expensive and self.max_expensive is not None and
+                 self.expensive >= self.max_expensive ):
+                raise Rejected(SERVER_BUSY, "server busy", "busy")
+
+            client_calls = self._client_calls.get(client, 0)
+
+            if self.client_calls is not None and client_calls >= self.client_calls:
+                raise Rejected(TOO_MANY_REQUESTS,
+                               "too many concurrent requests", "client_busy")
+
+            if self.client_rate:
+                try:
+                    bucket = self._buckets[client]
+                except KeyError:
+                    self._forget_idle_clients()
+                    bucket = self._buckets[client] = TokenBucket(
+                        self.client_rate, self.client_burst)
+
+                if not bucket.take():
+                    raise Rejected(TOO_MANY_REQUESTS, "rate limit exceeded",
+                                   "rate")
+
+            self.calls += 1
+            self.expensive += expensive
+            self._client_calls[client] = client_calls + 1
+
+        return expensive
+
+
+    def release(self, client, ticket):
+        """
+        Release a call admitted by admit
+        """
+        with self._lock:
+            self.calls -= 1
+            self.expensive -= ticket
+            client_calls = self._client_calls[client] - 1
+
+            if client_calls:
+                self._client_calls[client] = client_calls
+            else:
+                del self._client_calls[client]
+
+
+    def is_cheap(self, methods):
+        return all( method in self.cheap_methods for method in methods )
+
+
+    def _forget_idle_clients(self):
+        if len(self._buckets) < _max_idle_clients:
+            return
+
+        now = time()
+
+        for client, bucket in self._buckets.items():
+            if bucket.full(now) and client not in self._client_calls:
+                del self._buckets[client]
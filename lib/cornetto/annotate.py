@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+annotation of text with the lexical units of the Cornetto database
+
+An Annotator holds a trie of the words of all forms in the database,
+including those of multi-word units, and finds all forms in a text in a
+single pass: from every token, it follows the trie for as long as the next
+tokens allow, so the time taken is linear in the length of the text (times
+the number of words of the longest multi-word unit) and independent of the
+size of the database.
+
+    >>> from cornetto.cornet import Cornet
+    >>> from cornetto.annotate import Annotator
+    >>> annotator = Annotator(Cornet("cdb_lu.xml", "cdb_syn.xml"))
+    >>> list(annotator.annotate_tokens("op de hoogte".split(), longest=True))
+    [Match(start=0, end=3, c_lu_ids=('r_a-8873',))]
+
+annotate_parallel annotates a large number of texts in a pool of forked
+processes, which share the annotator.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import re
+
+from collections import deque, namedtuple
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+from cornetto.cornet import _form_foldings
+
+
+# a match of the form of one or more lexical units, where start and end
+# are token indices or, for raw text, character offsets
+Match = namedtuple("Match", "start end c_lu_ids")
+
+# a character other than a word character or space between two word
+# characters, such as the hyphen in "e-mail" or the apostrophe in "auto's"
+_joiner = re.compile(r"(?<=\w)[^\w\s](?=\w)", re.UNICODE)
+
+# key of the lexical unit ids in a node of the trie, which is never a word
+_ids = ""
+
+# set in the parent process before forking the workers of annotate_parallel
+_annotator = None
+
+
+
+class Annotator(object):
+    """
+    Finds the forms of lexical units in tokenized or raw text
+    """
+
+    def __init__(self, cornet, form_folding=False):
+        """
+        @param cornet: opened database
+        @type cornet: Cornet, or subclass thereof such as SqliteCornet
+
+        @keyword form_folding: match forms ignoring case ('case'),
+            diacritics ('diacritics') or both ('all'), or exactly (None);
+            by default the same as for lexical unit specifications of
+            cornet (see L{Cornet.set_form_folding})
+        @type form_folding: string
+        """
+        if form_folding is False:
+            form_folding = cornet._form_folding
+
+        try:
+            self._fold = _form_foldings[form_folding]
+        except (KeyError, TypeError):
+            raise ValueError("unknown form folding: %s" % form_folding)
+
+        # word -> node, where a node maps next words to nodes and _ids to
+        # the lexical unit ids of the form ending there; nodes with nothing
+        # but ids are represented by a tuple of the ids
+        self._trie = {}
+        joiners = set()
+
+        for form in cornet._get_forms():
+            words = form.split()
+            c_lu_ids = tuple( cornet._get_lu_id(lu)
+                              for lu in cornet._get_lex_units_with_form(form) )
+
+            if words and c_lu_ids:
+                self._add(words, c_lu_ids)
+
+                for word in words:
+                    if not word.isalnum():
+                        joiners.update(_joiner.findall(word))
+
+        # words in raw text: word characters, possibly joined by any of the
+        # characters which join them in the words of forms
+        if joiners:
+            word = r"\w+(?:[%s]\w+)*" % re.escape(u"".join(sorted(joiners)))
+        else:
+            word = r"\w+"
+
+        self._word = re.compile(word, re.UNICODE)
+
+
+    def annotate_tokens(self, tokens, longest=False):
+        """
+        Find forms in tokenized text
+
+        @param tokens: words of the text
+        @type tokens: sequence of strings
+
+        @keyword longest: only find the longest form starting at a token
+            and continue after it, so matches do not overlap; otherwise all
+            forms are found, e.g. "op de hoogte" as well as "op", "de" and
+            "hoogte"
+        @type longest: bool
+
+        @return: iterator over Match tuples with token indices, in order
+            of start, and of end for the same start
+        """
+        if self._fold:
+            tokens = map(self._fold, tokens)
+
+        for start, end, c_lu_ids in self._matches(tokens, longest):
+            yield Match(start, end, c_lu_ids)
+
+
+    def annotate_text(self, text, longest=False):
+        """
+        Find forms in raw text, which is split into words first
+
+        Words are sequences of word characters, possibly joined by the
+        characters which join them in the words of forms, such as hyphens
+        and apostrophes. Other characters, including those at the start or
+        end of forms, such as the period of an abbreviation, are not part
+        of words, so forms with such characters are not found in raw text.
+
+        @param text: text
+        @type text: unicode
+
+        @keyword longest: only find the longest form starting at a word
+            (see L{annotate_tokens})
+        @type longest: bool
+
+        @return: iterator over Match tuples with character offsets
+        """
+        spans = [ match.span() for match in self._word.finditer(text) ]
+        tokens = [ text[start:end] for start, end in spans ]
+
+        for match in self.annotate_tokens(tokens, longest):
+            yield Match(spans[match.start][0], spans[match.end - 1][1],
+                        match.c_lu_ids)
+
+
+    def _add(self, words, c_lu_ids):
+        if self._fold:
+            words = map(self._fold, words)
+
+        node = self._trie
+
+        for word in words[:-1]:
+            child = node.get(word)
+
+            if child is None:
+                child = node[word] = {}
+            elif isinstance(child, tuple):
+                child = node[word] = {_ids: child}
+
+            node = child
+
+        child = node.get(words[-1])
+
+        if child is None:
+            node[words[-1]] = c_lu_ids
+        elif isinstance(child, tuple):
+            # forms which are the same after folding
+            node[words[-1]] = child + c_lu_ids
+        else:
+            child[_ids] = child.get(_ids, ()) + c_lu_ids
+
+
+    def _matches(self, tokens, longest):
+        """
+        Iterate over (start, end, lexical unit ids) tuples
+        """
+        start = 0
+
+        while start < len(tokens):
+            node = self._trie
+            found = []
+
+            for end in xrange(start + 1, len(tokens) + 1):
+                node = node.get(tokens[end - 1])
+
+                if node is None:
+                    break
+                elif isinstance(node, tuple):
+                    found.append((start, end, node))
+                    break
+                elif _ids in node:
+                    found.append((start, end, node[_ids]))
+
+            if longest and found:
+                yield found[-1]
+                start = found[-1][1]
+            else:
+                for match in found:
+                    yield match
+
+                start += 1
+
+
+
+def annotate_parallel(annotator, texts, tokenized=False, longest=False,
+                      workers=None, chunk_size=1000):
+    """
+    Annotate many texts in a pool of forked processes, which share the
+    annotator copy-on-write
+
+    Texts are read, and sent to the workers, in chunks, and no more than
+    twice as many chunks as there are workers are pending at any time, so
+    texts can be streamed from a large corpus.
+
+    @param annotator: annotator
+    @type annotator: Annotator
+
+    @param texts: raw texts, or sequences of tokens if tokenized is true
+    @type texts: iterable
+
+    @keyword tokenized: texts are sequences of tokens
+    @type tokenized: bool
+
+    @keyword longest: only find the longest form starting at a token (see
+        L{Annotator.annotate_tokens})
+    @type longest: bool
+
+    @keyword workers: number of worker processes; by default the number of
+        cores
+    @type workers: int
+
+    @keyword chunk_size: number of texts sent to a worker at once
+    @type chunk_size: int
+
+    @return: iterator over the lists of matches of the texts, in order
+    """
+    global _annotator
+    _annotator = annotator
+    workers = workers or cpu_count()
+    texts = iter(texts)
+    pool = Pool(workers)
+    pending = deque()
+
+    try:
+        while True:
+            chunk = list(islice(texts, chunk_size))
+
+            if chunk:
+                pending.append(pool.apply_async(_annotate_chunk,
+                                                (chunk, tokenized, longest)))
+
+            if pending and (not chunk or len(pending) >= 2 * workers):
+                for matches in pending.popleft().get():
+                    yield map(Match._make, matches)
+            elif not chunk:
+                break
+    except:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+def _annotate_chunk(chunk, tokenized, longest):
+    if tokenized:
+        annotate = _annotator.annotate_tokens
+    else:
+        annotate = _annotator.annotate_text
+
+    # plain tuples take less time to pickle
+    return [ map(tuple, annotate(text, longest)) for text in chunk ]
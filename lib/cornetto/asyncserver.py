@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+asynchronous server exposing Cornetto database through XML-RPC and JSON
+
+A single event loop (asyncore) accepts connections, keeps them alive and
+reads and writes HTTP requests and responses for all of them, whereas the
+actual calls, including marshalling of the answers, are executed by a
+bounded pool of worker threads or processes. Idle connections thus cost
+no more than a socket.
+
+XML-RPC requests are accepted by POST on "/" or "/RPC2", and JSON-RPC
+requests by POST on "/json" (see cornetto.wire). GET on "/metrics" and
+"/health" is answered as in the threaded server.
+
+Admission control (see cornetto.admission) takes place in the event loop,
+before calls are passed to the pool, so refused calls cost next to nothing.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import asynchat
+import asyncore
+import os
+import socket
+
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from sys import exc_info, stderr
+from threading import Lock
+from time import strftime
+
+from cornetto.admission import Rejected
+from cornetto.server import ( CornetDispatcher, create_admission, create_cache,
+                              create_proxy, create_reloader, register_cache,
+                              register_functions )
+from cornetto.wire import WireError, compress, decompress, execute, get_codec
+
+
+# methods answered by the event loop itself instead of the workers
+_local_methods = ( "stats", "health", "reload", "reload_status" )
+
+_metrics_path = "/metrics"
+_health_path = "/health"
+
+_reasons = { 200: "OK",
+             400: "Bad Request",
+             404: "Not Found",
+             405: "Method Not Allowed",
+             411: "Length Required",
+             413: "Request Entity Too Large" }
+
+# the dispatcher used by the workers; it is a module global so forked
+# worker processes inherit it
+_dispatcher = None
+
+
+
+class AsyncCornetServer(asyncore.dispatcher):
+    """
+    Event-driven HTTP server which dispatches XML-RPC and JSON-RPC calls to a
+    pool of worker threads or processes
+    """
+
+    def __init__(self, dispatcher, host="localhost", port=5204,
+                 workers=4, executor="thread", log=False,
+                 max_request_size=1024 * 1024, backlog=1024):
+        """
+        @param dispatcher: dispatcher with registered functions
+        @type dispatcher: CornetDispatcher
+        @keyword host: host to listen on
+        @keyword port: port to listen on
+        @keyword workers: number of worker threads or processes
+        @keyword executor: "thread" or "process"
+        @keyword log: log requests
+        @keyword max_request_size: maximal size of request bodies in bytes
+        @keyword backlog: maximal number of pending connections
+        """
+        global _dispatcher
+        _dispatcher = dispatcher
+        self.dispatcher = dispatcher
+        self.workers = workers
+        self.executor = executor
+        self.log = log
+        self.max_request_size = max_request_size
+
+        # the pool must be created before the socket, so worker processes
+        # do not inherit it
+        if executor not in ("thread", "process"):
+            raise ValueError("unknown executor: %s" % executor)
+
+        self.pool = self._create_pool()
+
+        self.trigger = _Trigger()
+
+        asyncore.dispatcher.__init__(self)
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.set_reuse_addr()
+        self.bind((host, port))
+        self.listen(backlog)
+
+
+    def serve_forever(self):
+        # poll instead of select, which is limited to about a thousand sockets
+        try:
+            asyncore.loop(use_poll=True)
+        finally:
+            self.pool.terminate()
+
+
+    def replace_pool(self):
+        """
+        Replace the pool of worker processes by new ones forked from the
+        current process, e.g. after reloading the database. Calls already
+        submitted to the old pool are finished first.
+        """
+        old_pool, self.pool = self.pool, self._create_pool()
+        old_pool.close()
+
+
+    def _create_pool(self):
+        if self.executor == "thread":
+            return ThreadPool(self.workers)
+        else:
+            # processes must not keep the sockets of the server open
+            return Pool(self.workers, initializer=asyncore.close_all)
+
+
+    def handle_accept(self):
+        pair = self.accept()
+
+        if pair is not None:
+            _HttpChannel(self, pair[0], pair[1])
+
+
+    def handle_error(self):
+        # report, but never close the listening socket
+        self.log_info("uncaught exception: %s: %s" % exc_info()[:2], "error")
+
+
+    def submit(self, func, args, callback):
+        """
+        Call func with args in a worker and then call callback with its
+        result in the event loop
+        """
+        trigger = self.trigger
+        self.pool.apply_async(func, args,
+                              callback=lambda result:
+                                  trigger.pull(callback, result))
+
+
+
+class _HttpChannel(asynchat.async_chat):
+    """
+    A persistent HTTP/1.1 connection
+    """
+
+    def __init__(self, server, sock, addr):
+        asynchat.async_chat.__init__(self, sock)
+        self.server = server
+        self.addr = addr
+        self.set_terminator("\r\n\r\n")
+        self._data = []
+        self._request = None
+        self._busy = False
+        # pipelined requests which arrived while another one was busy
+        self._pending = deque()
+
+
+    def readable(self):
+        # read no further requests while one is being handled,
+        # so responses are sent in order
+        return not self._busy and asynchat.async_chat.readable(self)
+
+
+    def collect_incoming_data(self, data):
+        self._data.append(data)
+
+
+    def found_terminator(self):
+        data = "".join(self._data)
+        self._data = []
+
+        if self._request is None:
+            self._read_headers(data)
+        else:
+            request, self._request = self._request, None
+            self.set_terminator("\r\n\r\n")
+            self._handle(request, data)
+
+
+    def _read_headers(self, data):
+        lines = data.split("\r\n")
+
+        try:
+            command, path, version = lines[0].split()
+        except ValueError:
+            self._respond(None, 400, "text/plain", "bad request line\n",
+                          close=True)
+            return
+
+        headers = {}
+
+        for line in lines[1:]:
+            key, sep, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        request = _Request(command, path.split("?")[0], version, headers)
+
+        if command != "POST":
+            self._handle(request, "")
+            return
+
+        try:
+            length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            self._respond(request, 411, "text/plain", "length required\n",
+                          close=True)
+            return
+
+        if length > self.server.max_request_size:
+            self._respond(request, 413, "text/plain", "request too large\n",
+                          close=True)
+        elif length:
+            if headers.get("expect", "").lower() == "100-continue":
+                self.push("HTTP/1.1 100 Continue\r\n\r\n")
+            self._request = request
+            self.set_terminator(length)
+        else:
+            self._handle(request, "")
+
+
+    def _handle(self, request, body):
+        if self._busy:
+            self._pending.append((request, body))
+        elif request.command == "GET":
+            self._handle_get(request)
+        elif request.command != "POST":
+            self._respond(request, 405, "text/plain", "method not allowed\n")
+        else:
+            codec = get_codec(request.path)
+
+            if codec:
+                self._handle_call(request, codec, body)
+            else:
+                self._respond(request, 404, "text/plain", "no such path\n")
+
+
+    def _handle_get(self, request):
+        if request.path == _metrics_path:
+            self._respond(request, 200, "text/plain; version=0.0.4",
+                          self.server.dispatcher.metrics.prometheus_text())
+        elif request.path == _health_path:
+            self._respond(request, 200, "text/plain", "OK\n")
+        else:
+            self._respond(request, 404, "text/plain", "no such path\n")
+
+
+    def _handle_call(self, request, codec, body):
+        dispatcher = self.server.dispatcher
+
+        try:
+            calls, batch = codec.decode(decompress(
+                body, request.headers.get("content-encoding", "")))
+        except WireError as inst:
+            self._respond(request, 200, codec.content_type,
+                          codec.encode_error(inst.code, inst.message))
+            return
+
+        admission = dispatcher.admission
+        ticket = None
+
+        if admission is not None:
+            try:
+                ticket = admission.admit(self.addr[0],
+                                         [ call.method for call in calls ])
+            except Rejected as inst:
+                dispatcher.metrics.request_rejected(inst.reason)
+                self._respond(request, 200, codec.content_type,
+                              codec.encode_error(inst.faultCode,
+                                                 inst.faultString))
+                return
+
+        dispatcher.metrics.request_started()
+        args = (codec, calls, batch, request.headers.get("accept-encoding", ""))
+
+        if all(call.method in _local_methods for call in calls):
+            self._call_finished(request, codec,
+                                _execute(dispatcher=dispatcher, *args), ticket)
+        else:
+            self._busy = True
+            self.server.submit(_execute, args,
+                               lambda result: self._call_finished(
+                                   request, codec, result, ticket))
+
+
+    def _call_finished(self, request, codec, result, ticket=None):
+        response, encoding, timings = result
+        dispatcher = self.server.dispatcher
+        dispatcher.metrics.requests_finished(
+            [ (dispatcher._metric_label(method), seconds, error)
+              for method, seconds, error in timings ])
+
+        if ticket is not None:
+            dispatcher.admission.release(self.addr[0], ticket)
+
+        self._busy = False
+
+        # client may have gone away in the meantime
+        if self.connected:
+            self._respond(request, 200, codec.content_type, response,
+                          encoding=encoding)
+
+            while self._pending and not self._busy:
+                self._handle(*self._pending.popleft())
+
+
+    def _respond(self, request, code, content_type, body, close=False,
+                 encoding=None):
+        if request is None or not request.keep_alive():
+            close = True
+
+        headers = [ "HTTP/1.1 %d %s" % (code, _reasons[code]),
+                    "Content-Type: %s" % content_type,
+                    "Content-Length: %d" % len(body),
+                    "Connection: %s" % ("close" if close else "keep-alive") ]
+
+        if encoding:
+            headers.append("Content-Encoding: %s" % encoding)
+
+        self.push("\r\n".join(headers + ["", ""]) + body)
+
+        if self.server.log:
+            print >>stderr, '%s - - [%s] "%s %s %s" %d %d' % (
+                self.addr[0], strftime("%d/%b/%Y %H:%M:%S"),
+                getattr(request, "command", "-"), getattr(request, "path", "-"),
+                getattr(request, "version", "-"), code, len(body))
+
+        if close:
+            self.close_when_done()
+
+
+    def handle_error(self):
+        self.server.handle_error()
+        self.close()
+
+
+
+class _Request(object):
+
+    def __init__(self, command, path, version, headers):
+        self.command = command
+        self.path = path
+        self.version = version
+        self.headers = headers
+
+
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+
+        if self.version == "HTTP/1.1":
+            return connection != "close"
+        else:
+            return connection == "keep-alive"
+
+
+
+class _Trigger(asyncore.file_dispatcher):
+    """
+    Wakes up the event loop from other threads to run callbacks in it
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._callbacks = deque()
+        self._reader, self._writer = os.pipe()
+        asyncore.file_dispatcher.__init__(self, self._reader)
+
+
+    def pull(self, callback, *args):
+        with self._lock:
+            self._callbacks.append((callback, args))
+        os.write(self._writer, "x")
+
+
+    def writable(self):
+        return False
+
+
+    def handle_read(self):
+        self.recv(8192)
+
+        while True:
+            with self._lock:
+                if not self._callbacks:
+                    break
+                callback, args = self._callbacks.popleft()
+
+            try:
+                callback(*args)
+            except Exception:
+                self.log_info("uncaught exception in callback: %s: %s" %
+                              exc_info()[:2], "error")
+
+
+
+def _execute(codec, calls, batch, accept_encoding, dispatcher=None):
+    """
+    Execute calls and encode and compress the responses. Runs in a worker
+    thread or process.
+    """
+    if dispatcher is None:
+        dispatcher = _dispatcher
+
+    response, timings = execute(dispatcher, codec, calls, batch)
+    return compress(response, accept_encoding) + (timings,)
+
+
+
+def start_async_server(cdb_lu, cdb_syn, host="localhost", port=5204, log=None,
+                       verbose=False, max_depth=None, similarity=False,
+                       proxy_class=None, slow_log=None, slow_threshold=0.1,
+                       slow_sample=0.0, workers=4, executor="thread",
+                       queue_size=64, reserved=1, client_calls=None,
+                       client_rate=None, client_burst=None, cache_size=0,
+                       form_folding=None):
+    """
+    main function to start the asynchronous Cornetto server
+
+    Arguments are the same as for cornetto.server.start_server, plus:
+
+    @keyword workers: number of worker threads or processes
+    @type workers: int
+
+    @keyword executor: execute calls in a pool of threads ("thread") or of
+        forked processes ("process"), where each process shares the database
+        read in by the parent
+    @type executor: string
+
+    @keyword queue_size: maximal number of requests waiting for a worker;
+        further requests are refused with a "server busy" fault (code 503)
+    @type queue_size: int
+
+    @keyword reserved: number of places in the pool (workers plus queue)
+        reserved for cheap calls, such as get_lex_units
+    @type reserved: int
+
+    @note: The result cache is shared by all worker processes.
+
+    @note: The database is reloaded from the same files, without
+    interrupting service, on SIGHUP or a call to reload().
+    """
+    cache = create_cache(cache_size)
+    cornet = create_proxy(cdb_lu, cdb_syn, verbose, max_depth, similarity,
+                          proxy_class, slow_log, slow_threshold, slow_sample,
+                          cache, form_folding)
+
+    dispatcher = CornetDispatcher(encoding="UTF-8")
+    register_functions(dispatcher, cornet)
+    reloader = create_reloader(cornet, cdb_lu, cdb_syn, verbose, max_depth,
+                               form_folding)
+    dispatcher.register_reloader(reloader)
+    register_cache(dispatcher, reloader, cache)
+    max_calls = workers + queue_size
+    dispatcher.set_admission(create_admission(
+        max_calls=max_calls, max_expensive=max(1, max_calls - reserved),
+        client_calls=client_calls, client_rate=client_rate,
+        client_burst=client_burst))
+
+    server = AsyncCornetServer(dispatcher, host, port, workers=workers,
+                               executor=executor, log=log)
+
+    if executor == "process":
+        # worker processes have a copy of the old database
+        reloader.add_listener(
+            lambda cornet: server.trigger.pull(server.replace_pool))
+
+    print >>stderr, "Listening on %s:%d (%d %s workers)" % (host, port,
+                                                            workers, executor)
+    server.serve_forever()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+result cache shared by forked worker processes
+
+SharedCache maps byte string keys to byte string values in a fixed amount of
+shared memory (an anonymous memory map), so that processes forked after its
+creation - the workers of the prefork server or of the asynchronous server's
+process pool - see each other's entries.
+
+As in memcached, the memory is divided into classes of slots of equal size,
+where every class gets an equal share of the memory and an entry is stored in
+a slot of the smallest class it fits in. Within a class, slots are grouped
+into sets; a key can only be stored in the slots of the set it hashes to, and
+when these are all taken, the least recently used entry of the set is
+evicted. Entries which do not fit into the largest slots are not cached.
+
+All access is serialized by a single process-shared lock. Operations only
+copy the entry while holding it, and give up (count a miss, or skip
+storing) if it cannot be acquired within a second, e.g. because a process
+was killed while holding it.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import mmap
+import struct
+
+from hashlib import md5
+from multiprocessing import Lock
+
+
+# header: hits, misses and the clock used to time stamp entries
+_header = struct.Struct("<QQQ")
+
+# slot header: tag (first half of the hash of the key), time stamp of last
+# use (0 if empty), length of key and length of value
+_slot_header = struct.Struct("<8sQII")
+
+# seconds to wait for the lock
+_lock_timeout = 1.0
+
+
+
+class SharedCache(object):
+    """
+    Fixed-size LRU cache in memory shared with forked processes
+    """
+
+    def __init__(self, size=64 * 1024 * 1024,
+                 slot_sizes=(512, 4096, 32768, 262144), ways=8):
+        """
+        @keyword size: size of the shared memory in bytes
+        @keyword slot_sizes: sizes of the slots of each class in bytes;
+            larger entries are not cached
+        @keyword ways: number of slots per set
+        """
+        self.ways = ways
+        self.max_entry_size = max(slot_sizes) - _slot_header.size
+        share = (size - _header.size) // len(slot_sizes)
+        # slot size, number of sets and offset of each class
+        self._classes = []
+        offset = _header.size
+
+        for slot_size in sorted(slot_sizes):
+            sets = max(1, share // (slot_size * ways))
+            self._classes.append((slot_size, sets, offset))
+            offset += sets * ways * slot_size
+
+        self._memory = mmap.mmap(-1, offset)
+        self._lock = Lock()
+
+
+    def get(self, key):
+        """
+        Return the value stored under key, or None
+        """
+        tag, sets = self._locate(key)
+
+        if not self._lock.acquire(True, _lock_timeout):
+            return None
+
+        try:
+            hits, misses, clock = _header.unpack_from(self._memory, 0)
+
+            for slot_size, first in sets:
+                offset = self._find(first, slot_size, tag, key)
+
+                if offset is not None:
+                    break
+            else:
+                _header.pack_into(self._memory, 0, hits, misses + 1, clock)
+                return None
+
+            clock += 1
+            _header.pack_into(self._memory, 0, hits + 1, misses, clock)
+            tag, stamp, key_len, value_len = _slot_header.unpack_from(
+                self._memory, offset)
+            _slot_header.pack_into(self._memory, offset, tag, clock, key_len,
+                                   value_len)
+            start = offset + _slot_header.size + key_len
+            return self._memory[start:start + value_len]
+        finally:
+            self._lock.release()
+
+
+    def put(self, key, value):
+        """
+        Store value under key, evicting the least recently used entry in
+        its set if necessary; returns False if the entry is too large
+        """
+        entry_size = len(key) + len(value)
+
+        if entry_size > self.max_entry_size:
+            return False
+
+        tag, sets = self._locate(key)
+
+        if not self._lock.acquire(True, _lock_timeout):
+            return False
+
+        try:
+            hits, misses, clock = _header.unpack_from(self._memory, 0)
+            offset = None
+
+            for slot_size, first in sets:
+                # remove an older entry, which may be of another size
+                old = self._find(first, slot_size, tag, key)
+
+                if old is not None:
+                    _slot_header.pack_into(self._memory, old, "", 0, 0, 0)
+
+                if ( offset is None and
+                     _slot_header.size + entry_size <= slot_size ):
+                    offset = self._victim(first, slot_size)
+
+            clock += 1
+            _header.pack_into(self._memory, 0, hits, misses, clock)
+            _slot_header.pack_into(self._memory, offset, tag, clock, len(key),
+                                   len(value))
+            start = offset + _slot_header.size
+            self._memory[start:start + entry_size] = key + value
+            return True
+        finally:
+            self._lock.release()
+
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        with self._lock:
+            for slot_size, sets, offset in self._classes:
+                for slot in range(sets * self.ways):
+                    _slot_header.pack_into(self._memory,
+                                           offset + slot * slot_size,
+                                           "", 0, 0, 0)
+
+
+    def info(self):
+        """
+        Return the number of hits and misses so far, of all processes
+        """
+        # counters only ever grow, so reading them without the lock is good
+        # enough for statistics
+        hits, misses, clock = _header.unpack_from(self._memory, 0)
+        return hits, misses
+
+
+    def _locate(self, key):
+        """
+        tag of key, and the slot size and offset of the first slot of its
+        set in every class
+        """
+        digest = md5(key).digest()
+        number = struct.unpack("<Q", digest[8:])[0]
+        return digest[:8], [ (slot_size,
+                              offset + number % sets * self.ways * slot_size)
+                             for slot_size, sets, offset in self._classes ]
+
+
+    def _find(self, first, slot_size, tag, key):
+        """
+        offset of the slot in the set starting at first which holds key, or
+        None
+        """
+        for offset in range(first, first + self.ways * slot_size, slot_size):
+            slot_tag, stamp, key_len, value_len = _slot_header.unpack_from(
+                self._memory, offset)
+
+            if stamp and slot_tag == tag and key_len == len(key):
+                start = offset + _slot_header.size
+
+                if self._memory[start:start + key_len] == key:
+                    return offset
+
+
+    def _victim(self, first, slot_size):
+        """
+        offset of an empty slot, or of the least recently used one, in the
+        set starting at first
+        """
+        victim, oldest = None, None
+
+        for offset in range(first, first + self.ways * slot_size, slot_size):
+            stamp = _slot_header.unpack_from(self._memory, offset)[1]
+
+            if not stamp:
+                return offset
+
+            if oldest is None or stamp < oldest:
+                victim, oldest = offset, stamp
+
+        return victim
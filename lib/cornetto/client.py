@@ -0,0 +1,687 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+client for the Cornetto server
+
+CornetClient offers the query methods of Cornet and SimCornet, with the same
+arguments, but executes them on a Cornetto server, so code written against a
+local Cornet instance works unchanged against a remote one:
+
+    >>> from cornetto.client import CornetClient
+    >>> c = CornetClient("localhost", 5204)
+    >>> c.ask("lamp HAS_HYPERONYM", format="spec")
+    {'lamp:noun:1': {...}}
+
+A client may be shared by threads. It keeps a pool of connections alive
+between calls (as far as the server allows), retries calls which failed
+because of network errors or because the server was busy, with exponential
+backoff, and can send many calls in a single request:
+
+    >>> c.batch([("get_lex_units", ("lamp",)), ("get_lex_units", ("fiets",))])
+    [['lamp:noun:1', 'lamp:noun:2'], ['fiets:noun:1']]
+
+By default calls are sent as JSON-RPC, which, unlike XML-RPC, passes None
+results through unchanged. Errors on the server are raised as
+xmlrpclib.Fault, regardless of the protocol.
+
+Results of queries can be cached in memory and, optionally, in an SQLite
+file, which may be shared by several processes and survives them:
+
+    >>> c = CornetClient(cache_size=10000, cache_file="cornetto-cache.db")
+
+Cached results expire after a time to live, and are dropped as soon as the
+server reports a new database version (see db_version()), which the client
+checks at regular intervals.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import httplib
+import json
+import socket
+import sqlite3
+import xmlrpclib
+
+from collections import OrderedDict
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from inspect import getargspec
+from itertools import count
+from Queue import LifoQueue, Empty, Full
+from random import random
+from threading import Lock
+from time import sleep, time
+
+from cornetto.admission import SERVER_BUSY, TOO_MANY_REQUESTS
+from cornetto.simcornet import SimCornet
+from cornetto.simserver import SimCornetProxy
+
+
+# fault codes of calls which are worth retrying
+_retry_faults = ( SERVER_BUSY, TOO_MANY_REQUESTS )
+
+# HTTP status codes of requests which are worth retrying
+_retry_status = ( 502, 503, 504 )
+
+# methods whose results are not cached
+_uncached_methods = ( "db_version", )
+
+
+
+class CornetClient(object):
+    """
+    Thread-safe client for a Cornetto server, with the query methods of
+    Cornet and SimCornet
+    """
+
+    def __init__(self, host="localhost", port=5204, protocol="json",
+                 timeout=60.0, retries=3, backoff=0.1, pool_size=4,
+                 cache_size=0, cache_file=None, cache_ttl=3600,
+                 version_interval=60):
+        """
+        @keyword host: name or IP address of the server
+        @keyword port: port of the server
+        @keyword protocol: "json" for JSON-RPC or "xmlrpc" for XML-RPC
+        @keyword timeout: seconds to wait for the server to connect or
+            answer, or None to wait forever; calls which time out are not
+            retried
+        @keyword retries: maximal number of times to retry a failed call
+        @keyword backoff: seconds to wait before the first retry, which is
+            doubled on every next retry (plus or minus a random half)
+        @keyword pool_size: maximal number of idle connections kept open
+        @keyword cache_size: maximal number of results cached in memory
+        @keyword cache_file: SQLite file to cache results in as well
+        @keyword cache_ttl: seconds after which cached results expire
+        @keyword version_interval: seconds after which the database version
+            of the server is checked again
+        """
+        if protocol == "json":
+            self._codec = _JsonCodec()
+        elif protocol == "xmlrpc":
+            self._codec = _XmlRpcCodec()
+        else:
+            raise ValueError("unknown protocol: %s" % protocol)
+
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = LifoQueue(pool_size)
+        self._output_format = None
+
+        self._caches = []
+
+        if cache_size:
+            self._caches.append(_MemoryCache(cache_size))
+
+        if cache_file:
+            self._caches.append(_DiskCache(cache_file))
+
+        self.cache_ttl = cache_ttl
+        self.version_interval = version_interval
+        self._version = None
+        self._version_checked = None
+        self._version_lock = Lock()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def call(self, method, *args):
+        """
+        Call a method on the server with positional arguments and return its
+        result
+
+        @raise xmlrpclib.Fault: the call failed on the server
+        """
+        result = self._cached_request([(method, args)], False)[0]
+
+        if isinstance(result, xmlrpclib.Fault):
+            raise result
+
+        return result
+
+
+    def batch(self, calls):
+        """
+        Execute a list of calls in a single request
+
+        @param calls: list of tuples of method name, tuple of positional
+            arguments and, optionally, dict of keyword arguments
+        @return: list of results, in which calls which failed have an
+            xmlrpclib.Fault instead of a result
+        """
+        return self._cached_request([ (call[0], self._arguments(*call))
+                                      for call in calls ], True)
+
+
+    def map(self, method, items, batch_size=100):
+        """
+        Call a method for every item, in batches
+
+        @param method: name of the method
+        @param items: list of arguments; an item which is a tuple is taken
+            as a tuple of arguments
+        @keyword batch_size: maximal number of calls per request
+        @return: list of results, in which calls which failed have an
+            xmlrpclib.Fault instead of a result
+        """
+        calls = [ (method, item if isinstance(item, tuple) else (item,))
+                  for item in items ]
+        results = []
+
+        for start in range(0, len(calls), batch_size):
+            results += self.batch(calls[start:start + batch_size])
+
+        return results
+
+
+    def close(self):
+        """
+        Close all idle connections, and the cache file
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                break
+
+        for cache in self._caches:
+            cache.close()
+
+
+    def clear_cache(self):
+        """
+        Remove all cached results
+        """
+        for cache in self._caches:
+            cache.clear()
+
+
+    def set_output_format(self, format="spec"):
+        """
+        Change the default output format
+
+        @param format: output format
+        @type format: 'spec', 'xml'
+        """
+        if format in ("spec", "xml"):
+            self._output_format = format
+        else:
+            raise ValueError("unknown output format: %s" % format)
+
+
+    def set_max_depth(self, max_depth=None):
+        """
+        Not supported: the maximal depth of searches is set on the server
+        (cornetto-server.py --max-depth)
+        """
+        raise NotImplementedError("maximal depth is set on the server")
+
+
+    # private methods
+
+    def _arguments(self, method, args=(), kwargs=None):
+        """
+        positional arguments of a call to a query method with positional and
+        keyword arguments
+        """
+        try:
+            argspec = _signatures[method]
+        except KeyError:
+            # e.g. echo or stats
+            if kwargs:
+                raise TypeError("%s() takes no keyword arguments" % method)
+            return tuple(args)
+
+        kwargs = dict(kwargs or {})
+        names = argspec.args[1:]
+        defaults = dict(zip(names[len(names) - len(argspec.defaults or ()):],
+                            argspec.defaults or ()))
+
+        if len(args) > len(names):
+            raise TypeError("%s() takes at most %d arguments (%d given)" % (
+                method, len(names), len(args)))
+
+        if ( self._output_format and "format" in names[len(args):] and
+             "format" not in kwargs ):
+            kwargs["format"] = self._output_format
+
+        values = list(args)
+
+        for name in names[len(args):]:
+            if name in kwargs:
+                values.append(kwargs.pop(name))
+            elif name in defaults:
+                values.append(defaults[name])
+            else:
+                raise TypeError("%s() requires argument %s" % (method, name))
+
+        if kwargs:
+            raise TypeError("%s() got an unexpected keyword argument %s" % (
+                method, kwargs.keys()[0]))
+
+        # trailing default values are left to the server
+        n = len(values)
+
+        while ( n > len(args) and names[n - 1] in defaults and
+                values[n - 1] == defaults[names[n - 1]] ):
+            n -= 1
+
+        return tuple(values[:n])
+
+
+    def _cached_request(self, calls, batch):
+        """
+        results of calls from the caches if possible, and from the server
+        otherwise
+        """
+        if not self._caches:
+            return self._request(calls, batch)
+
+        version = self._check_version()
+        # unlike pickles, JSON is the same for equal calls
+        keys = [ None if call[0] in _uncached_methods else
+                 json.dumps(call, separators=(",", ":"))
+                 for call in calls ]
+        results = [ self._lookup(key, version) for key in keys ]
+        missing = [ i for i, result in enumerate(results)
+                    if result is _missing ]
+
+        if missing:
+            fetched = self._request([ calls[i] for i in missing ], batch)
+            expires = time() + self.cache_ttl
+
+            for i, result in zip(missing, fetched):
+                results[i] = result
+
+                if keys[i] and not isinstance(result, xmlrpclib.Fault):
+                    value = dumps(result, HIGHEST_PROTOCOL)
+
+                    for cache in self._caches:
+                        cache.put(keys[i], version, expires, value)
+
+        return results
+
+
+    def _lookup(self, key, version):
+        if key is None:
+            return _missing
+
+        for n, cache in enumerate(self._caches):
+            entry = cache.get(key, version)
+
+            if entry is not None:
+                # also keep entries from disk in memory
+                for faster in self._caches[:n]:
+                    faster.put(key, version, *entry)
+                return loads(entry[1])
+
+        return _missing
+
+
+    def _check_version(self):
+        """
+        database version of the server, which is asked for if it has not
+        been checked recently; all caches are cleared when it changed
+        """
+        with self._version_lock:
+            now = time()
+
+            if ( self._version_checked is not None and
+                 now - self._version_checked < self.version_interval ):
+                return self._version
+
+            version = self._request([("db_version", ())], False)[0]
+
+            if isinstance(version, xmlrpclib.Fault):
+                # older server; rely on expiry only
+                version = None
+
+            self._version_checked = now
+
+            if version != self._version:
+                for cache in self._caches:
+                    cache.remove_other_versions(version)
+                self._version = version
+
+            return version
+
+
+    def _request(self, calls, batch, attempt=0):
+        """
+        send calls to the server, retrying if necessary, and return their
+        results; all query methods are read-only, so retrying them is safe
+        """
+        while True:
+            try:
+                results = self._send(calls, batch)
+            except socket.timeout:
+                raise
+            except ( socket.error, httplib.HTTPException ) as inst:
+                # e.g. connection refused, or a kept-alive connection which
+                # the server closed in the meantime
+                error = inst
+            except xmlrpclib.ProtocolError as inst:
+                if inst.errcode not in _retry_status:
+                    raise
+                error = inst
+            except xmlrpclib.Fault as inst:
+                # the request as a whole was refused
+                if inst.faultCode not in _retry_faults:
+                    raise
+                error = inst
+            else:
+                break
+
+            if attempt >= self.retries:
+                raise error
+
+            self._wait(attempt)
+            attempt += 1
+
+        retry = [ i for i, result in enumerate(results)
+                  if isinstance(result, xmlrpclib.Fault) and
+                  result.faultCode in _retry_faults ]
+
+        if retry and attempt < self.retries:
+            # only retry the calls which were refused
+            self._wait(attempt)
+            retried = self._request([ calls[i] for i in retry ], batch,
+                                    attempt + 1)
+
+            for i, result in zip(retry, retried):
+                results[i] = result
+
+        return results
+
+
+    def _wait(self, attempt):
+        sleep(self.backoff * 2 ** attempt * (0.5 + random()))
+
+
+    def _send(self, calls, batch):
+        codec = self._codec
+        body = codec.encode(calls, batch)
+
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = httplib.HTTPConnection(self.host, self.port,
+                                                timeout=self.timeout)
+
+        try:
+            connection.request("POST", codec.path, body,
+                               { "Content-Type": codec.content_type,
+                                 "Accept-Encoding": "gzip" })
+            response = connection.getresponse()
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+
+        if response.will_close:
+            # reconnects on the next request
+            connection.close()
+
+        try:
+            self._pool.put_nowait(connection)
+        except Full:
+            connection.close()
+
+        if response.status != 200:
+            raise xmlrpclib.ProtocolError("%s:%s%s" % (self.host, self.port,
+                                                       codec.path),
+                                          response.status, response.reason,
+                                          response.msg)
+
+        if response.getheader("content-encoding", "").lower() == "gzip":
+            data = xmlrpclib.gzip_decode(data)
+
+        return codec.decode(data, batch)
+
+
+
+class _MemoryCache(object):
+    """
+    Thread-safe LRU cache of pickled results in memory
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+
+    def get(self, key, version):
+        """
+        Return the expiry time and value stored under key for version, or
+        None
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None or entry[0] != version or entry[1] < time():
+                return None
+
+            # move to the most recently used end
+            self._entries[key] = entry
+            return entry[1:]
+
+
+    def put(self, key, version, expires, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (version, expires, value)
+
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+    def remove_other_versions(self, version):
+        self.clear()
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+    def close(self):
+        pass
+
+
+
+class _DiskCache(object):
+    """
+    Cache of pickled results in an SQLite file, which may be shared by
+    processes; expired entries are removed when the file is opened
+    """
+
+    def __init__(self, filename):
+        self._lock = Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        # readers do not block writers, and losing the latest entries in a
+        # crash is harmless, so do not sync on every commit
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "key TEXT PRIMARY KEY, version TEXT, "
+                         "expires REAL, value BLOB)")
+        self._db.execute("DELETE FROM results WHERE expires < ?", (time(),))
+        self._db.commit()
+
+
+    def get(self, key, version):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires, value FROM results "
+                "WHERE key = ? AND version IS ? AND expires >= ?",
+                (key, version, time())).fetchone()
+
+        if row is not None:
+            return row[0], str(row[1])
+
+
+    def put(self, key, version, expires, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results "
+                             "VALUES (?, ?, ?, ?)",
+                             (key, version, expires, sqlite3.Binary(value)))
+            self._db.commit()
+
+
+    def remove_other_versions(self, version):
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE version IS NOT ?",
+                             (version,))
+            self._db.commit()
+
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+
+class _JsonCodec(object):
+    """
+    JSON-RPC 2.0
+    """
+
+    path = "/json"
+    content_type = "application/json"
+
+
+    def __init__(self):
+        self._ids = count(1)
+
+
+    def encode(self, calls, batch):
+        requests = [ dict(jsonrpc="2.0", method=method, params=list(args),
+                          id=self._ids.next())
+                     for method, args in calls ]
+
+        if batch:
+            return json.dumps(requests, separators=(",", ":"))
+        else:
+            return json.dumps(requests[0], separators=(",", ":"))
+
+
+    def decode(self, data, batch):
+        response = json.loads(data)
+
+        if not batch:
+            response = [response]
+        elif isinstance(response, dict):
+            # the request as a whole failed
+            raise self._fault(response.get("error", {}))
+        else:
+            # responses to a batch may come in any order
+            response.sort(key=lambda r: r.get("id"))
+
+        return [ self._fault(r["error"]) if "error" in r else r.get("result")
+                 for r in response ]
+
+
+    def _fault(self, error):
+        return xmlrpclib.Fault(error.get("code"), error.get("message"))
+
+
+
+class _XmlRpcCodec(object):
+    """
+    XML-RPC, with system.multicall for batches
+    """
+
+    path = "/RPC2"
+    content_type = "text/xml"
+
+
+    def encode(self, calls, batch):
+        # the server accepts None in requests, it just does not send it
+        if batch:
+            return xmlrpclib.dumps(
+                ([ dict(methodName=method, params=list(args))
+                   for method, args in calls ],),
+                "system.multicall", encoding="utf-8", allow_none=True)
+        else:
+            method, args = calls[0]
+            return xmlrpclib.dumps(tuple(args), method, encoding="utf-8",
+                                   allow_none=True)
+
+
+    def decode(self, data, batch):
+        try:
+            result = xmlrpclib.loads(data)[0][0]
+        except xmlrpclib.Fault as inst:
+            if batch:
+                raise
+            return [inst]
+
+        if not batch:
+            return [result]
+
+        return [ xmlrpclib.Fault(r["faultCode"], r["faultString"])
+                 if isinstance(r, dict) else r[0]
+                 for r in result ]
+
+
+
+def _remote_method(name):
+    """
+    method of CornetClient which calls the query method name on the server
+    """
+    def method(self, *args, **kwargs):
+        return self.call(name, *self._arguments(name, args, kwargs))
+
+    method.__name__ = name
+    method.__doc__ = ( getattr(SimCornet, name, None) or
+                       getattr(SimCornetProxy, name) ).__doc__
+    return method
+
+
+# marks results which are not in the cache
+_missing = object()
+
+# signatures of the methods of the server, which are the same as those
+# of SimCornet
+_signatures = dict( (name, getargspec(getattr(SimCornetProxy, name)))
+                    for name in dir(SimCornetProxy)
+                    if not name.startswith("_") )
+
+for _name in _signatures:
+    setattr(CornetClient, _name, _remote_method(_name))
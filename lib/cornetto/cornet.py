@@ -28,15 +28,11 @@ the Cornet class which exposes the Cornetto xml database
 #   perhaps change search from recursive DFS to deqeue based BFS?
 
 # TODO:
-# - deal with multi word units
 # - write unit tests
 # - remove code to circumvent bugs in the cornetto db
 # - more code comments
 
 # FEATURES:
-# - optmization: for testing hypernym and meronym relation, 
-#   a unidirectional BFS starting from the most specific/smallest part 
-#   is probably faster than the current bidirectional BFS
 # - option to supply xpath querys on xml
 # - pprinted xml
 
@@ -46,11 +42,108 @@ __author__ = 'Erwin Marsi <e.marsi@gmail.com>'
 __version__ = '0.6.1'
 
 
+import re
+import unicodedata
+
+from bisect import bisect_left
 from collections import deque
+from heapq import heappop, heappush, nsmallest
+from itertools import count
+from fnmatch import translate
+from cornetto.fuzzy import DeletionIndex
+from cornetto.instrument import install_hook
 from cornetto.parse import parse_cdb
 from xml.etree.cElementTree import tostring
 
 
+# a quoted form, possibly with spaces, or anything else without spaces
+_query_part = re.compile(r'"[^"]*"\S*|\S+')
+
+# characters which start or end wildcards in glob-style patterns
+_glob_start = "*?["
+_glob_end = "*?]"
+
+
+def _glob_affixes(pattern):
+    """
+    Return the literal prefix and suffix of a glob-style pattern, which are
+    both the whole pattern if it contains no wildcards
+    """
+    starts = [ i for i, char in enumerate(pattern) if char in _glob_start ]
+    
+    if not starts:
+        return pattern, pattern
+    
+    ends = [ i for i, char in enumerate(pattern) if char in _glob_end ]
+    return pattern[:starts[0]], pattern[ends[-1] + 1:]
+
+
+def _fold_case(form):
+    return form.lower()
+
+
+def _fold_diacritics(form):
+    # str values are plain ascii, just like ElementTree attributes
+    if isinstance(form, str):
+        return form
+    
+    return u"".join( char for char in unicodedata.normalize("NFD", form)
+                     if not unicodedata.combining(char) )
+
+
+def _fold_all(form):
+    return _fold_diacritics(form).lower()
+
+
+# form folding -> function mapping a form to its folded form
+_form_foldings = {
+    None: None,
+    "case": _fold_case,
+    "diacritics": _fold_diacritics,
+    "all": _fold_all }
+
+
+def _match_sorted(pattern, sorted_strings, reversed_strings):
+    """
+    Iterate over the strings matching a glob-style pattern, given as a
+    sorted list and as a sorted list of the reversed strings
+    """
+    prefix, suffix = _glob_affixes(pattern)
+    
+    if prefix == pattern:
+        # no wildcards
+        i = bisect_left(sorted_strings, pattern)
+        
+        if i < len(sorted_strings) and sorted_strings[i] == pattern:
+            yield pattern
+        return
+    
+    if len(suffix) > len(prefix):
+        candidates = ( string[::-1]
+                       for string in _prefixed(reversed_strings, 
+                                               suffix[::-1]) )
+    else:
+        candidates = _prefixed(sorted_strings, prefix)
+        
+    match = re.compile(translate(pattern)).match
+    
+    for string in candidates:
+        if match(string):
+            yield string
+
+
+def _prefixed(sorted_strings, prefix):
+    """
+    Iterate over the strings in a sorted list which start with prefix
+    """
+    for i in xrange(bisect_left(sorted_strings, prefix), len(sorted_strings)):
+        if not sorted_strings[i].startswith(prefix):
+            break
+        
+        yield sorted_strings[i]
+    
+
+
 class Cornet(object):    
     """
     The Cornet class exposes the Cornetto xml database
@@ -82,6 +175,13 @@ class Cornet(object):
        - slang:noun
        - slang::1
        - slang
+       
+    Forms of multi-word units are put in double quotes, e.g. "homo
+    sapiens":noun, although quotes are only really needed in queries for
+    L{ask}.
+       
+    Spelling forms must match exactly, unless form folding is set (see
+    L{set_form_folding}), e.g. to make "slang" match "Slang" as well.
     
     
     B{Relation specifications}
@@ -122,11 +222,14 @@ class Cornet(object):
     _handled_output_formats = ("spec", "xml", "raw")
     _default_output_format = "spec"    
     _default_max_depth = 9
+    # largest edit distance supported by get_lex_units_fuzzy
+    _max_fuzzy_distance = 2
 
     
     def __init__(self, cdb_lu=None, cdb_syn=None, 
                  output_format=_default_output_format,
-                 max_depth=_default_max_depth):
+                 max_depth=_default_max_depth,
+                 form_folding=None):
         """
         Create a new Cornet instance
         
@@ -136,7 +239,11 @@ class Cornet(object):
         @type default_format: string ('spec', 'xml', 'raw')
         @keyword max_depth: a maximal depth between 1 and 9
         @type max_depth: int
+        @keyword form_folding: form folding (see L{set_form_folding})
+        @type form_folding: None, 'case', 'diacritics' or 'all'
         """
+        # before opening, so the index of folded forms is built right away
+        self.set_form_folding(form_folding)
         
         if cdb_lu and cdb_syn:
             self.open(cdb_lu, cdb_syn)
@@ -145,7 +252,7 @@ class Cornet(object):
         self.set_max_depth(max_depth)
 
             
-    def open(self, cdb_lu, cdb_syn, verbose=False):
+    def open(self, cdb_lu, cdb_syn, verbose=False, engine="etree"):
         """
         Open and parse Cornetto database files
         
@@ -154,11 +261,13 @@ class Cornet(object):
         @param cdb_syn: xml definition of the synsets
         @type cdb_syn: file or filename
         @keyword verbose: verbose output during parsing
+        @keyword engine: parser engine, 'etree' or 'lean' (see parse_cdb)
         """
         ( self._form2lu, 
           self._c_lu_id2lu,
           self._c_sy_id2synset, 
-          self._graph ) = parse_cdb(cdb_lu, cdb_syn, verbose)
+          self._graph ) = parse_cdb(cdb_lu, cdb_syn, verbose, engine)
+        self._after_parse()
     
     
     def ask(self, query, format=None):
@@ -233,13 +342,106 @@ class Cornet(object):
         @rtype: list
         @return: list of lexical units in requested output format
         """
-        form, cat, sense = self._split_unit_spec(spec)
         formatter = self._get_lex_unit_formatter(format)
+        return [ formatter(lu) for lu in self._get_lex_units(spec) ]
+    
+    
+    def match_lex_units(self, spec, limit=None, format=None):
+        """
+        Get lexical units whose form matches a pattern
+        
+        The form in the specification is a glob-style pattern, where "*"
+        matches any sequence of characters, "?" any single character,
+        "[seq]" any character in seq and "[!seq]" any character not in seq.
+        Patterns with a literal prefix or suffix, as for autocompletion or
+        for finding compounds with a certain head, are looked up in sorted
+        indexes of the forms and of the reversed forms; other patterns are
+        matched against all forms.
+        
+        >>> inst.match_lex_units("gloei*")
+        ['gloeidraad:noun:1', 'gloeien:verb:1', 'gloeilamp:noun:1']
+        
+        >>> inst.match_lex_units("*lamp:noun:1", limit=3)
+        ['booglamp:noun:1', 'fotolamp:noun:1', 'gloeilamp:noun:1']
+        
+        @param spec: lexical unit specification with a pattern as form
+        @keyword limit: maximal number of lexical units
+        @type limit: int
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
+        
+        @rtype: list
+        @return: list of lexical units in requested output format, in
+                 alphabetical order of their (folded) forms, or of their
+                 reversed (folded) forms when looked up by suffix
+        """
+        formatter = self._get_lex_unit_formatter(format)
+        return [ formatter(lu) for lu in self._match_lex_units(spec, limit) ]
+    
+    
+    def get_lex_units_fuzzy(self, spec, max_distance=2, limit=None, 
+                            format=None):
+        """
+        Get lexical units whose form is within a certain edit distance of
+        the form in the specification, e.g. to cope with misspelled input
+        
+        The edit distance is the Levenshtein distance, i.e. the number of
+        insertions, deletions and substitutions of single characters. Forms
+        are looked up in an index of all forms, which is built the first
+        time this method is called. With form folding (see
+        L{set_form_folding}), the distance is that between the folded forms.
+        
+        >>> inst.get_lex_units_fuzzy("gloeilmap")
+        ['gloeilamp:noun:1']
+        
+        >>> inst.get_lex_units_fuzzy("lamb:noun", max_distance=1)
+        ['lamp:noun:3', 'lamp:noun:4', 'lamp:noun:1', 'lamp:noun:2']
         
+        @param spec: lexical unit specification
+        @keyword max_distance: maximal edit distance between 0 and 2
+        @type max_distance: int
+        @keyword limit: maximal number of lexical units
+        @type limit: int
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
+        
+        @rtype: list
+        @return: list of lexical units in requested output format, in
+                 order of increasing edit distance
+        """
+        formatter = self._get_lex_unit_formatter(format)
         return [ formatter(lu) 
-                 for lu in self._form2lu.get(form, [])
-                 if ( self._lu_has_cat(lu, cat) and 
-                      self._lu_has_sense(lu, sense) ) ]
+                 for lu in self._get_lex_units_fuzzy(spec, max_distance, 
+                                                     limit) ]
+    
+    
+    def find_multi_word_units(self, tokens, format=None):
+        """
+        Find multi-word units in tokenized text
+        
+        The text is scanned from left to right, and at every token the
+        longest multi-word unit starting there is taken, so matches do not
+        overlap. Tokens are compared with the words of the forms of
+        multi-word units as described for lexical unit specifications (see
+        L{set_form_folding}).
+        
+        >>> inst.find_multi_word_units("ik ben op de hoogte".split())
+        [(2, 5, ['op de hoogte:adj:1'])]
+        
+        @param tokens: words of the text
+        @type tokens: sequence of strings
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
+        
+        @rtype: list
+        @return: list of (start, end, lexical units) tuples, where start
+                 and end are the indices of the first token of the match
+                 and of the token following it, and the lexical units are
+                 in the requested output format
+        """
+        formatter = self._get_lex_unit_formatter(format)
+        return [ (start, end, [ formatter(lu) for lu in lus ])
+                 for start, end, lus in self._find_multi_word_units(tokens) ]
     
 
     def get_related_lex_units(self, lu_spec, rel_spec, format=None):
@@ -305,7 +507,7 @@ class Cornet(object):
         rel_formatter = self._get_relation_formatter(format)
         related_lus = {}
         
-        for from_lu in self.get_lex_units(lu_spec, format="raw"):
+        for from_lu in self._get_lex_units(lu_spec):
             from_lu_repr = lu_formatter(from_lu)
             
             related_lus[from_lu_repr] = \
@@ -342,16 +544,107 @@ class Cornet(object):
                  possibly empty
         @rtype: list 
         
-        @warning: The result may not be the only shortest path.
+        @warning: The result may not be the only shortest path; see
+                  L{get_shortest_path_dag} and L{get_k_shortest_paths}.
         """
         rel_name, depth = self._split_rel_spec(rel_spec)
         
-        from_lus = self.get_lex_units(from_lu_spec, format="raw")
-        to_lus = self.get_lex_units(to_lu_spec, format="raw")
+        from_lus = self._get_lex_units(from_lu_spec)
+        to_lus = self._get_lex_units(to_lu_spec)
         
         pred, common_lu, succ = self._bidirectional_shortest_path(from_lus, to_lus, rel_name, depth) 
         path = self._reconstruct_path(pred, common_lu, succ, format)
         return path
+    
+    
+    def get_shortest_path_dag(self, from_lu_spec, rel_spec, to_lu_spec, 
+                              format=None):
+        """
+        Get all shortest paths from any of the source lexical units to any
+        of the target lexical units along the specified relation(s), as a
+        directed acyclic graph 
+        
+        The graph maps every lexical unit on a shortest path to its
+        predecessors on these paths, i.e. to a list of (lexical unit,
+        relation) pairs; source lexical units have no predecessors. Paths
+        are enumerated by following predecessors back from the targets.
+        
+        >>> pprint(inst.get_shortest_path_dag("lamp", "HAS_HYPONYM2", "fotolamp"))
+        {'fotolamp:noun:1': [('gloeilamp:noun:1', 'HAS_HYPONYM')],
+         'gloeilamp:noun:1': [('lamp:noun:2', 'HAS_HYPONYM')],
+         'lamp:noun:2': []}
+        
+        @param from_lu_spec: lexical unit specification of the source(s)
+        @param rel_spec: relation(s) specification
+        @param to_lu_spec: lexical unit specification of the target(s)
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
+        
+        @return: mapping of lexical units to lists of (lexical unit,
+                 relation) pairs in requested output format, empty if there
+                 is no path
+        @rtype: dict
+        """
+        rel_name, depth = self._split_rel_spec(rel_spec)
+        from_lus = self._get_lex_units(from_lu_spec)
+        to_lus = self._get_lex_units(to_lu_spec)
+        
+        lu_formatter = self._get_lex_unit_formatter(format)
+        rel_formatter = self._get_relation_formatter(format)
+        
+        return dict( (lu_formatter(lu), 
+                      [ (lu_formatter(pred_lu), rel_formatter(edge))
+                        for pred_lu, edge in preds ])
+                     for lu, preds in self._shortest_path_dag(
+                         from_lus, to_lus, rel_name, depth).items() )
+    
+    
+    def get_k_shortest_paths(self, from_lu_spec, rel_spec, to_lu_spec, k=10,
+                             format=None):
+        """
+        Get the k shortest paths without cycles from any of the source
+        lexical units to any of the target lexical units along the
+        specified relation(s)
+        
+        Paths are found in order of length by Yen's algorithm, which
+        searches for alternatives deviating from the paths found so far.
+        
+        >>> inst.get_k_shortest_paths("lamp", "HAS_HYPONYM+", "fotolamp", k=2)
+        [['lamp:noun:2', 'HAS_HYPONYM', 'gloeilamp:noun:1', 'HAS_HYPONYM', 'fotolamp:noun:1'],
+         ['lamp:noun:1', 'HAS_HYPONYM', 'gloeilamp:noun:1', 'HAS_HYPONYM', 'fotolamp:noun:1']]
+        
+        @param from_lu_spec: lexical unit specification of the source(s)
+        @param rel_spec: relation(s) specification
+        @param to_lu_spec: lexical unit specification of the target(s)
+        @keyword k: maximal number of paths
+        @type k: int
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
+        
+        @return: list of paths, i.e. lists of lexical units and relations
+                 as returned by L{test_lex_units_relation}, in order of
+                 length
+        @rtype: list 
+        """
+        rel_name, depth = self._split_rel_spec(rel_spec)
+        from_lus = self._get_lex_units(from_lu_spec)
+        to_lus = self._get_lex_units(to_lu_spec)
+        
+        lu_formatter = self._get_lex_unit_formatter(format)
+        rel_formatter = self._get_relation_formatter(format)
+        paths = []
+        
+        for lus, edges in self._k_shortest_paths(from_lus, to_lus, rel_name,
+                                                 depth, k):
+            path = [lu_formatter(lus[0])]
+            
+            for lu, edge in zip(lus[1:], edges):
+                path.append(rel_formatter(edge))
+                path.append(lu_formatter(lu))
+                
+            paths.append(path)
+            
+        return paths
         
                  
         
@@ -385,26 +678,11 @@ class Cornet(object):
         @rtype: list
          
         """
-        form, cat, sense = self._split_unit_spec(spec)
-        synsets = []
         formatter = self._get_synset_formatter(format)
         
-        for lu in self._form2lu.get(form, []):
-            if ( self._lu_has_cat(lu, cat) and 
-                 self._lu_has_sense(lu, sense) ): 
-                # Using new attribute added while parsing synonym relations
-                # to find the id's of all synsets to which this lu belongs.
-                # Alternatively, we could use the graph to find all lu's which
-                # are synonym to this lu.
-                for c_sy_id in lu.get("c_sy_id", "").split(","):
-                    try:
-                        sy = self._c_sy_id2synset[c_sy_id]
-                    except KeyError:
-                        # oops, there is no synset with this id
-                        continue
-                    synsets.append(formatter(sy))
-                
-        return synsets
+        return [ formatter(sy)
+                 for lu in self._get_lex_units(spec)
+                 for sy in self._lu2synsets.get(lu, ()) ]
 
         
     def get_related_synsets(self, lu_spec, rel_name=None, format=None):
@@ -437,23 +715,27 @@ class Cornet(object):
         @note: Parameter rel_name is a relation name, not a relation specification.
                Search is thus not transitive.
         """
-        form, cat, sense = self._split_unit_spec(lu_spec)
         if rel_name: rel_name = rel_name.upper()
         syn_formatter = self._get_synset_formatter(format)
-        rel_formatter = self._get_relation_formatter(format)
+        rel_formatter = self._get_synset_relation_formatter(format)
         related_syns = {}
         
-        # lazy and slow
-        for from_syn in self.get_synsets(lu_spec, format="raw"):
-            for rel in from_syn.find("wn_internal_relations") or []:
-                if self._rel_has_name(rel, rel_name):
-                    to_syn_id = rel.get("target")
-                    to_syn = self._c_sy_id2synset[to_syn_id]
-                    
-                    syn_repr = syn_formatter(to_syn)
-                    rel_repr = rel_formatter(rel)
+        for lu in self._get_lex_units(lu_spec):
+            for from_syn in self._lu2synsets.get(lu, ()):
+                for rel in from_syn.find("wn_internal_relations") or []:
+                    if not rel_name or self._get_syn_rel_name(rel) == rel_name:
+                        to_syn_id = rel.get("target")
+                        
+                        try:
+                            to_syn = self._c_sy_id2synset[to_syn_id]
+                        except KeyError:
+                            # oops, there is no synset with this id
+                            continue
+                        
+                        syn_repr = syn_formatter(to_syn)
+                        rel_repr = rel_formatter(rel)
 
-                    related_syns.setdefault(rel_repr, []).append(syn_repr)
+                        related_syns.setdefault(rel_repr, []).append(syn_repr)
                         
         return related_syns
     
@@ -499,29 +781,42 @@ class Cornet(object):
         """Get a lexical unit based on a synset ID and a lemma"""
         try:
             synset = self._c_sy_id2synset[c_sy_id]
+            lu = self._synset_form2lu[synset, lemma]
         except KeyError:
+            # no synset with this id, or no lu with this lemma in it
             return None
 
+        return self._get_lex_unit_formatter(format)(lu)
+    
+    
+    def get_lex_units_from_synsets(self, pairs, format=None):
+        """
+        Get lexical units based on synset IDs and lemmas; a batch version of
+        L{get_lex_unit_from_synset}
+        
+        @param pairs: (synset id, lemma) pairs
+        @type pairs: iterable
+        @keyword format: output format
+        @type format: 'spec', 'xml', 'raw'
         
+        @return: for every pair, the lexical unit in the requested output
+                 format, or None
+        @rtype: list
+        """
         formatter = self._get_lex_unit_formatter(format)
-
-        c_lu_id = None
-
-        for syn in synset.find("synonyms") or []:
-            c_lu_id = syn.get("c_lu_id")
-            try:
-                lu = self._c_lu_id2lu[c_lu_id]
-                luform = self._get_lu_form(lu) #get form-spelling (lemma)
-                if luform == lemma:
-                    #this one matches with the lemma we specified, return it!
-                    return formatter(lu)
-            except KeyError:
-                # no lu with this id
-                continue
-
-        return None #nothing found
-
-
+        get_synset = self._c_sy_id2synset.get
+        get_lu = self._synset_form2lu.get
+        lex_units = []
+        
+        for c_sy_id, lemma in pairs:
+            lu = get_lu((get_synset(c_sy_id), lemma))
+            
+            if lu is not None:
+                lu = formatter(lu)
+                
+            lex_units.append(lu)
+            
+        return lex_units
 
         
         
@@ -538,7 +833,7 @@ class Cornet(object):
         {2: ['huisdier:noun:1', 'zoogdier:noun:1'],
          4: ['beest:noun:2', 'gedierte:noun:2', 'dier:noun:1'],
          5: ['ziel:noun:3',
-             'homo sapiens:noun:1',
+             '"homo sapiens":noun:1',
              'sterveling:noun:1',
              'mens:noun:1',
              'mensenkind:noun:1'],
@@ -565,7 +860,7 @@ class Cornet(object):
         rel_name = rel_name.upper()
         formatter = self._get_lex_unit_formatter(format)
         
-        lus1 = self.get_lex_units(lu_spec1, format="raw")
+        lus1 = self._get_lex_units(lu_spec1)
         sucs1 = self._transitive_closure(lus1, rel_name)
         
         # Add lus themselves as succesors with zero distance
@@ -574,7 +869,7 @@ class Cornet(object):
         for lu in lus1:
             sucs1[lu] = 0
         
-        lus2 = self.get_lex_units(lu_spec2, format="raw")
+        lus2 = self._get_lex_units(lu_spec2)
         sucs2 = self._transitive_closure(lus2, rel_name)
         
         # idem for lus2
@@ -669,6 +964,66 @@ class Cornet(object):
             raise ValueError("not a valid value for maximal depth: %s "
                              "(should be between 1 and 9 included)" % max_depth)
 
+
+    def set_form_folding(self, folding=None):
+        """
+        Set how the spelling forms in lexical unit specifications are
+        matched with those in the database, for all methods taking such
+        specifications
+        
+        With folding, all lexical units with forms which are the same after
+        folding are found in one lookup, those with the given form first.
+        Patterns (see L{match_lex_units}) are matched against the folded
+        forms, and fuzzy lookup (see L{get_lex_units_fuzzy}) finds the
+        forms whose folded form is close to the folded form given.
+        
+        >>> inst.set_form_folding("all")
+        >>> inst.get_lex_units("plafonniere")
+        [u'plafonni\xe8re:noun:1']
+        
+        @param folding: None (exact match), 'case' (ignore case),
+            'diacritics' (ignore accents and other diacritics) or 'all'
+            (ignore both)
+        @type folding: string
+        
+        @note: The index of folded forms is built when the database is
+               opened, or on first use after changing the folding, and the
+               index for fuzzy lookup is then rebuilt on first use too.
+        """
+        try:
+            self._fold = _form_foldings[folding]
+        except (KeyError, TypeError):
+            raise ValueError("unknown form folding: %s (should be None, "
+                             "'case', 'diacritics' or 'all')" % folding)
+        
+        self._form_folding = folding
+        self._folded_forms = None
+        self._fuzzy_index = None
+        self._phrases = None
+        
+    
+    def set_hook(self, hook=None):
+        """
+        Install a hook which receives statistics on every query, such as
+        the time spent per stage (parsing, lookup, search, formatting), the
+        number of nodes expanded and edges scanned, and the size of the
+        result. See the cornetto.instrument module.
+
+        >>> from cornetto.instrument import StatsCollector
+        >>> collector = StatsCollector()
+        >>> inst.set_hook(collector)
+        >>> inst.ask("lamp HAS_HYPONYM2")
+        >>> collector.snapshot()["ask"]["stage_times"].keys()
+        ['parse', 'search', 'other', 'lookup', 'format']
+
+        @param hook: hook receiving query statistics, or None to remove the
+            current hook
+        @type hook: cornetto.instrument.QueryHook
+
+        @note: Instrumentation is opt-in; without a hook there is no overhead.
+        """
+        install_hook(self, hook)
+
     
     # ------------------------------------------------------------------------------        
     # Semi-private methods
@@ -677,15 +1032,30 @@ class Cornet(object):
     # parsing specifications
 
     def _split_query(self, query):
-        query = query.strip().split() + 3 * [""]
+        query = _query_part.findall(query) + 3 * [""]
         # relation are always in upper case
         query[1] = query[1].upper()
         return query[:3]
     
     
     def _split_unit_spec(self, spec):
+        if isinstance(spec, str):
+            # utf-8 encoded, e.g. from the command line
+            spec = spec.decode("utf-8")
+            
+        spec = spec.strip()
+        
+        if spec.startswith('"'):
+            end = spec.find('"', 1)
+            
+            if end > 0:
+                # quoted form of a multi-word unit, with normalized spaces
+                form = " ".join(spec[1:end].split())
+                spec = spec[end + 1:] + 2 * self._unit_separator
+                return [form] + spec.split(self._unit_separator)[1:3]
+                
         spec = spec + 2 * self._unit_separator
-        return spec.strip().split(self._unit_separator)[:3]
+        return spec.split(self._unit_separator)[:3]
     
     
     def _split_rel_spec(self, spec):
@@ -699,6 +1069,358 @@ class Cornet(object):
         return name.upper(), depth
 
         
+    # lookup
+    
+    def _after_parse(self):
+        """
+        Build the indexes of a newly parsed database and drop the statistics
+        of the previous one; to be called by every open method
+        """
+        self._index_synsets()
+        self._index_forms()
+        self._degree_stats = None
+        
+    
+    def _index_synsets(self):
+        """
+        Index the lexical units of every synset, and the synsets of every
+        lexical unit, both as tuples, as well as the specifications of the
+        lexical units of every synset and the lexical unit of every synset
+        and form
+        """
+        self._synset2lus = {}
+        self._synset2specs = {}
+        self._synset_form2lu = {}
+        lu2synsets = {}
+        
+        # a synset may appear twice in self._c_sy_id2synset
+        # (see parse._parse_cdb_syn)
+        for synset in set(self._c_sy_id2synset.itervalues()):
+            lus = []
+            # REMOVE-ME: a set of synonym lu id's, because cdb is still buggy
+            # and sometimes targets the same lu multiple times
+            seen_lu_ids = set()
+            
+            for syn in synset.find("synonyms") or []:
+                c_lu_id = syn.get("c_lu_id")
+                
+                try:
+                    lu = self._c_lu_id2lu[c_lu_id]
+                except KeyError:
+                    # no lu with this id
+                    continue
+                
+                if c_lu_id not in seen_lu_ids:
+                    lus.append(lu)
+                    seen_lu_ids.add(c_lu_id)
+                    
+            self._synset2lus[synset] = tuple(lus)
+            self._synset2specs[synset] = tuple( self._lu_to_spec(lu)
+                                                for lu in lus )
+            
+            for lu in lus:
+                # the first one, if a synset has several with the same form
+                self._synset_form2lu.setdefault((synset, self._get_lu_form(lu)),
+                                                lu)
+            
+        for c_sy_id, synset in self._c_sy_id2synset.iteritems():
+            # only under its own id, not under its d_synset_id,
+            # and only the first of synsets with the same id
+            if synset.get("c_sy_id") == c_sy_id:
+                for lu in self._synset2lus[synset]:
+                    lu2synsets.setdefault(lu, []).append(synset)
+                    
+        self._lu2synsets = dict( (lu, tuple(synsets))
+                                 for lu, synsets in lu2synsets.iteritems() )
+        
+    
+    def _index_forms(self):
+        """
+        Index all forms, and all reversed forms, as sorted lists
+        """
+        self._forms = sorted(self._form2lu)
+        self._reversed_forms = sorted( form[::-1] for form in self._form2lu )
+        self._fuzzy_index = None
+        self._index_folded_forms()
+        self._index_phrases()
+        
+    
+    def _index_folded_forms(self):
+        """
+        Index all forms by their folded form, and all folded forms, and all
+        reversed folded forms, as sorted lists, if forms are folded
+        """
+        self._folded_forms = None
+        
+        if self._fold:
+            folded_forms = {}
+            fold = self._fold
+            
+            for form in sorted(self._get_forms()):
+                folded_forms.setdefault(fold(form), []).append(form)
+                
+            self._folded_forms = folded_forms
+            self._sorted_folded_forms = sorted(folded_forms)
+            self._reversed_folded_forms = sorted( folded[::-1] 
+                                                  for folded in folded_forms )
+            
+    
+    def _index_phrases(self):
+        """
+        Index the forms of multi-word units by their (folded) words, and
+        the numbers of words of these forms by their first (folded) word,
+        longest first
+        """
+        fold = self._fold or (lambda word: word)
+        phrases = {}
+        lengths = {}
+        
+        for form in self._get_forms():
+            words = tuple( fold(word) for word in form.split() )
+            
+            if len(words) > 1:
+                phrases.setdefault(words, form)
+                lengths.setdefault(words[0], set()).add(len(words))
+                
+        self._phrases = phrases
+        self._phrase_lengths = dict( (word, sorted(numbers, reverse=True))
+                                     for word, numbers in lengths.items() )
+        
+    
+    def _find_multi_word_units(self, tokens):
+        """
+        Return a list of (start, end, lexical units) tuples for the longest
+        multi-word units in tokens, with lexical units in raw format
+        """
+        if self._phrases is None:
+            self._index_phrases()
+            
+        if self._fold:
+            tokens = map(self._fold, tokens)
+        else:
+            tokens = list(tokens)
+            
+        phrases = self._phrases
+        get_lengths = self._phrase_lengths.get
+        matches = []
+        start = 0
+        
+        while start < len(tokens):
+            for length in get_lengths(tokens[start], ()):
+                end = start + length
+                
+                if end > len(tokens):
+                    continue
+                
+                form = phrases.get(tuple(tokens[start:end]))
+                
+                if form is not None:
+                    matches.append((start, end, self._lookup_form(form)))
+                    start = end
+                    break
+            else:
+                start += 1
+                
+        return matches
+                
+    
+    def _lookup_form(self, form):
+        """
+        Get all lexical units (in raw format) with this form, or with a form
+        which is the same after folding
+        """
+        if not self._fold:
+            return self._get_lex_units_with_form(form)
+        
+        forms = self._get_folded_forms().get(self._fold(form), ())
+        
+        if len(forms) > 1:
+            # the form itself first (sort is stable)
+            forms = sorted(forms, key=lambda other: other != form)
+        
+        return [ lu 
+                 for other in forms
+                 for lu in self._get_lex_units_with_form(other) ]
+        
+    
+    def _get_folded_forms(self):
+        """
+        Get the dict mapping folded forms to forms, building it first if
+        needed
+        """
+        if self._folded_forms is None:
+            self._index_folded_forms()
+            
+        return self._folded_forms
+    
+    
+    def _match_forms(self, pattern):
+        """
+        Iterate over forms matching a glob-style pattern, or whose folded
+        form matches the folded pattern if forms are folded
+        """
+        if not self._fold:
+            return _match_sorted(pattern, self._forms, self._reversed_forms)
+        
+        folded_forms = self._get_folded_forms()
+        return ( form 
+                 for folded in _match_sorted(self._fold(pattern),
+                                             self._sorted_folded_forms,
+                                             self._reversed_folded_forms)
+                 for form in folded_forms[folded] )
+                
+                
+    def _match_lex_units(self, spec, limit=None):
+        """
+        Get at most limit lexical units (in raw format) which satisfy this
+        specification with a pattern as form
+        """
+        pattern, cat, sense = self._split_unit_spec(spec)
+        lus = []
+        
+        for form in self._match_forms(pattern):
+            for lu in self._get_lex_units_with_form(form):
+                if ( self._lu_has_cat(lu, cat) and 
+                     self._lu_has_sense(lu, sense) ):
+                    if limit is not None and len(lus) >= limit:
+                        return lus
+                    
+                    lus.append(lu)
+                    
+        return lus
+    
+    
+    def _get_fuzzy_index(self):
+        """
+        Get the index for fuzzy lookup of forms, or of folded forms if forms
+        are folded, building it first if needed
+        """
+        # not built by open, because it takes a while and is often not needed
+        if self._fuzzy_index is None:
+            if self._fold:
+                self._get_folded_forms()
+                forms = self._sorted_folded_forms
+            else:
+                forms = self._get_forms()
+                
+            self._fuzzy_index = DeletionIndex(forms, self._max_fuzzy_distance)
+            
+        return self._fuzzy_index
+    
+    
+    def _get_lex_units_fuzzy(self, spec, max_distance, limit=None):
+        """
+        Get at most limit lexical units (in raw format) with a form within
+        max_distance of the form in this specification
+        """
+        form, cat, sense = self._split_unit_spec(spec)
+        index = self._get_fuzzy_index()
+        lus = []
+        
+        if self._fold:
+            folded_forms = self._get_folded_forms()
+            matches = ( (distance, other) 
+                        for distance, folded in index.lookup(self._fold(form),
+                                                             max_distance)
+                        for other in folded_forms[folded] )
+        else:
+            matches = index.lookup(form, max_distance)
+        
+        for distance, match in matches:
+            for lu in self._get_lex_units_with_form(match):
+                if ( self._lu_has_cat(lu, cat) and 
+                     self._lu_has_sense(lu, sense) ):
+                    if limit is not None and len(lus) >= limit:
+                        return lus
+                    
+                    lus.append(lu)
+                    
+        return lus
+    
+    
+    def _get_forms(self):
+        return self._forms
+    
+    
+    def _get_lex_units_with_form(self, form):
+        return self._form2lu.get(form, [])
+    
+    
+    def _get_lex_units(self, spec):
+        """
+        Get all lexical units (in raw format) which satisfy this specification
+        """
+        form, cat, sense = self._split_unit_spec(spec)
+        
+        return [ lu
+                 for lu in self._lookup_form(form)
+                 if ( self._lu_has_cat(lu, cat) and 
+                      self._lu_has_sense(lu, sense) ) ]
+    
+    
+    # graph access
+    
+    def _out_edges(self, lus, rel_name=None):
+        """
+        Iterate over (from_lu, to_lu, edge) tuples for all outgoing edges of
+        the lexical unit(s) which satisfy the relation name
+        """
+        for from_lu, to_lu, edge in self._graph.out_edges_iter(lus, data=True):
+            if self._rel_has_name(edge, rel_name):
+                yield from_lu, to_lu, edge
+                
+                
+    def _in_edges(self, lus, rel_name=None):
+        """
+        Iterate over (from_lu, to_lu, edge) tuples for all incoming edges of
+        the lexical unit(s) which satisfy the relation name
+        """
+        for from_lu, to_lu, edge in self._graph.in_edges_iter(lus, data=True):
+            if self._rel_has_name(edge, rel_name):
+                yield from_lu, to_lu, edge
+                
+                
+    def _get_mean_degrees(self, rel_name=None):
+        """
+        Get the mean number of outgoing edges which satisfy the relation name
+        of the lexical units having any, and likewise of incoming edges,
+        computing these statistics for all relations first if needed
+        """
+        # not computed by open, because only path searches need them
+        if self._degree_stats is None:
+            self._degree_stats = self._compute_degree_stats()
+            
+        # any relation is specified by an empty name (see _split_rel_spec),
+        # but its statistics are stored under None
+        return self._degree_stats.get(rel_name or None, (1.0, 1.0))
+    
+    
+    def _compute_degree_stats(self):
+        """
+        Return a dict mapping relation names, and None for all relations, to
+        pairs of the mean out-degree and the mean in-degree
+        """
+        # relation name -> (number of edges, from lexical units, to lexical
+        # units)
+        counts = {}
+        
+        for from_lu, to_lu, edge in self._graph.edges_iter(data=True):
+            for name in self._get_rel_name(edge), None:
+                try:
+                    edge_count, from_lus, to_lus = counts[name]
+                except KeyError:
+                    edge_count, from_lus, to_lus = 0, set(), set()
+                    
+                counts[name] = edge_count + 1, from_lus, to_lus
+                from_lus.add(from_lu)
+                to_lus.add(to_lu)
+                
+        return dict( (name, (edge_count / float(len(from_lus)),
+                             edge_count / float(len(to_lus))))
+                     for name, (edge_count, from_lus, to_lus) 
+                     in counts.items() )
+    
+    
     # search
     
     def _transitive_closure(self, lus, rel_name):
@@ -716,11 +1438,8 @@ class Cornet(object):
         successors= {}
         
         while queue:
-            out_edges = self._graph.out_edges_iter(queue, data=True)
-                
-            for from_lu, to_lu, edge in out_edges:
-                if ( self._rel_has_name(edge, rel_name) and
-                     to_lu not in successors):
+            for from_lu, to_lu, edge in self._out_edges(queue, rel_name):
+                if to_lu not in successors:
                     successors[to_lu] = distance + 1
                     
                     # A lexical unit from the original lus may be reached, and
@@ -736,7 +1455,10 @@ class Cornet(object):
 
     
     def _bidirectional_shortest_path(self, from_lus, to_lus, rel_name, depth):
-        # Does BFS from both source and target and meets in the middle
+        # Does BFS from both source and target and meets in the middle,
+        # each time expanding the side which is expected to be cheaper, 
+        # so a search from a hub such as the top of a hierarchy proceeds
+        # from the other side instead (see _expand_forward)
         # Based on _bidirectional_pred_succ in networkx/path.py
         # Returns (pred, succ, w) where
         # pred is a dictionary of predecessors from w to the source, and
@@ -752,19 +1474,17 @@ class Cornet(object):
             if lu in succ: 
                 return None, lu, None
 
-        # initialize fringes, start with forward
+        # initialize fringes
         forward_fringe = list(from_lus) 
         reverse_fringe = list(to_lus)
         level = 0        
     
         while forward_fringe and reverse_fringe and level != depth:
-            this_level = forward_fringe
-            forward_fringe = []
-
-            out_edges = self._graph.out_edges_iter(this_level, data=True)
-            
-            for from_lu, to_lu, edge in out_edges:
-                if self._rel_has_name(edge, rel_name):
+            if self._expand_forward(forward_fringe, reverse_fringe, rel_name):
+                this_level = forward_fringe
+                forward_fringe = []
+    
+                for from_lu, to_lu, edge in self._out_edges(this_level, rel_name):
                     if to_lu not in pred: # prevent cycles
                         forward_fringe.append(to_lu)
                         # If there are multiple matching edges,
@@ -773,17 +1493,11 @@ class Cornet(object):
                         # instead of *all* paths.
                         pred[to_lu] = (from_lu, edge)
                     if to_lu in succ:  return pred, to_lu, succ # found path
-                    
-            level += 1
-            if level == depth: break # max search depth reached
-
-            this_level = reverse_fringe
-            reverse_fringe = []
-            
-            in_edges = self._graph.in_edges_iter(this_level, data=True)
-            
-            for from_lu, to_lu, edge in in_edges:
-                if self._rel_has_name(edge, rel_name):
+            else:
+                this_level = reverse_fringe
+                reverse_fringe = []
+                
+                for from_lu, to_lu, edge in self._in_edges(this_level, rel_name):
                     if from_lu not in succ:
                         # may replace existing relation
                         succ[from_lu] = (to_lu, edge)
@@ -795,6 +1509,262 @@ class Cornet(object):
         return None, None, None  # no path found
     
     
+    def _expand_forward(self, forward_fringe, reverse_fringe, rel_name):
+        """
+        Decide whether a bidirectional search should expand its forward
+        fringe rather than its reverse fringe, i.e. the fringe with the
+        smaller expected number of edges to scan, given the mean out-degree
+        and in-degree for the relation
+        """
+        out_degree, in_degree = self._get_mean_degrees(rel_name)
+        return ( len(forward_fringe) * out_degree <= 
+                 len(reverse_fringe) * in_degree )
+    
+    
+    def _shortest_path_dag(self, from_lus, to_lus, rel_name, depth):
+        """
+        Find all shortest paths of at most depth edges by bidirectional BFS,
+        expanding whole levels of the cheaper side until the searches meet
+        (which finds all of them in whatever order the sides are expanded),
+        and return them as a dict mapping each lexical unit on these paths
+        to a list of (predecessor, edge) pairs
+        """
+        # lexical units -> distance from the sources or to the targets
+        forward_dist = dict.fromkeys(from_lus, 0)
+        reverse_dist = dict.fromkeys(to_lus, 0)
+        # lexical unit -> (lexical unit, edge) pairs one step closer to the
+        # sources or to the targets
+        preds = {}
+        succs = {}
+        meeting = [ lu for lu in forward_dist if lu in reverse_dist ]
+        forward_fringe = list(forward_dist)
+        reverse_fringe = list(reverse_dist)
+        forward_level = reverse_level = 0
+        
+        while ( not meeting and forward_fringe and reverse_fringe and
+                forward_level + reverse_level < depth ):
+            if self._expand_forward(forward_fringe, reverse_fringe, rel_name):
+                this_level = forward_fringe
+                forward_fringe = []
+                forward_level += 1
+                
+                for from_lu, to_lu, edge in self._out_edges(this_level, 
+                                                            rel_name):
+                    distance = forward_dist.get(to_lu)
+                    
+                    if distance is None:
+                        forward_dist[to_lu] = forward_level
+                        preds[to_lu] = [(from_lu, edge)]
+                        forward_fringe.append(to_lu)
+                        
+                        if to_lu in reverse_dist:
+                            meeting.append(to_lu)
+                    elif distance == forward_level:
+                        # another shortest path to to_lu
+                        preds[to_lu].append((from_lu, edge))
+            else:
+                this_level = reverse_fringe
+                reverse_fringe = []
+                reverse_level += 1
+                
+                for from_lu, to_lu, edge in self._in_edges(this_level, 
+                                                           rel_name):
+                    distance = reverse_dist.get(from_lu)
+                    
+                    if distance is None:
+                        reverse_dist[from_lu] = reverse_level
+                        succs[from_lu] = [(to_lu, edge)]
+                        reverse_fringe.append(from_lu)
+                        
+                        if from_lu in forward_dist:
+                            meeting.append(from_lu)
+                    elif distance == reverse_level:
+                        succs[from_lu].append((to_lu, edge))
+                        
+        # All meeting lexical units are on a shortest path, and so are the
+        # lexical units between them and the sources and targets
+        dag = {}
+        stack = list(meeting)
+        
+        while stack:
+            lu = stack.pop()
+            
+            if lu not in dag:
+                dag[lu] = preds.get(lu, [])
+                stack.extend( pred_lu for pred_lu, edge in dag[lu] )
+                
+        stack = list(meeting)
+        done = set(meeting)
+        
+        while stack:
+            lu = stack.pop()
+            
+            for succ_lu, edge in succs.get(lu, ()):
+                dag.setdefault(succ_lu, []).append((lu, edge))
+                
+                if succ_lu not in done:
+                    done.add(succ_lu)
+                    stack.append(succ_lu)
+                    
+        return dag
+    
+    
+    def _shortest_path(self, from_lus, to_lus, rel_name, depth, 
+                       excluded_lus=(), excluded_edges=()):
+        """
+        Find a shortest path of at most depth edges by bidirectional BFS,
+        avoiding the excluded lexical units and edges, i.e. (from_lu, to_lu,
+        relation name) tuples; return a tuple of the lexical units and a
+        tuple of the edges on the path, or None
+        """
+        # lexical unit -> (lexical unit, edge) one step closer to the sources
+        # or to the targets
+        pred = dict.fromkeys(from_lus)
+        succ = dict.fromkeys(to_lus)
+        
+        for lu in from_lus:
+            if lu in succ:
+                return (lu,), ()
+            
+        forward_fringe = list(from_lus)
+        reverse_fringe = list(to_lus)
+        level = 0
+        common_lu = None
+        
+        while forward_fringe and reverse_fringe and level < depth:
+            if self._expand_forward(forward_fringe, reverse_fringe, rel_name):
+                this_level = forward_fringe
+                forward_fringe = []
+                
+                for from_lu, to_lu, edge in self._out_edges(this_level, 
+                                                            rel_name):
+                    if ( to_lu in pred or to_lu in excluded_lus or
+                         excluded_edges and 
+                         (from_lu, to_lu, self._get_rel_name(edge)) in 
+                         excluded_edges ):
+                        continue
+                    
+                    pred[to_lu] = (from_lu, edge)
+                    
+                    if to_lu in succ:
+                        common_lu = to_lu
+                        break
+                    
+                    forward_fringe.append(to_lu)
+            else:
+                this_level = reverse_fringe
+                reverse_fringe = []
+                
+                for from_lu, to_lu, edge in self._in_edges(this_level, 
+                                                           rel_name):
+                    if ( from_lu in succ or from_lu in excluded_lus or
+                         excluded_edges and 
+                         (from_lu, to_lu, self._get_rel_name(edge)) in 
+                         excluded_edges ):
+                        continue
+                    
+                    succ[from_lu] = (to_lu, edge)
+                    
+                    if from_lu in pred:
+                        common_lu = from_lu
+                        break
+                    
+                    reverse_fringe.append(from_lu)
+                    
+            if common_lu is not None:
+                break
+                    
+            level += 1
+        else:
+            return None
+        
+        lus = deque([common_lu])
+        edges = deque()
+        lu = common_lu
+        
+        while pred[lu] is not None:
+            lu, edge = pred[lu]
+            lus.appendleft(lu)
+            edges.appendleft(edge)
+            
+        lu = common_lu
+        
+        while succ[lu] is not None:
+            lu, edge = succ[lu]
+            lus.append(lu)
+            edges.append(edge)
+            
+        return tuple(lus), tuple(edges)
+        
+    
+    def _k_shortest_paths(self, from_lus, to_lus, rel_name, depth, k):
+        """
+        Find the k shortest paths without cycles of at most depth edges by
+        Yen's algorithm; returns a list of (lexical units, edges) tuples
+        """
+        path = self._shortest_path(from_lus, to_lus, rel_name, depth)
+        
+        if path is None or k < 1:
+            return []
+        
+        paths = [path]
+        # heap of (length, sequence number, path)
+        candidates = []
+        seen = set([self._path_key(path)])
+        numbers = count()
+        
+        while len(paths) < k:
+            lus, edges = paths[-1]
+            # once there are enough candidates, longer paths are of no use
+            needed = k - len(paths)
+            
+            if len(candidates) >= needed:
+                max_length = nsmallest(needed, candidates)[-1][0]
+            else:
+                max_length = depth
+            
+            # deviations at the start: paths from sources not used yet
+            used = set( path[0][0] for path in paths )
+            spur_paths = [ ((), (), self._shortest_path(
+                [ lu for lu in from_lus if lu not in used ], 
+                to_lus, rel_name, max_length)) ]
+            
+            # deviations after every lexical unit but the target
+            for i in range(len(lus) - 1):
+                root_lus = lus[:i + 1]
+                excluded_edges = set( (lus[i], path[0][i + 1], 
+                                       self._get_rel_name(path[1][i]))
+                                      for path in paths
+                                      if path[0][:i + 1] == root_lus )
+                spur_paths.append((
+                    lus[:i], edges[:i],
+                    self._shortest_path([lus[i]], to_lus, rel_name, 
+                                        max_length - i, set(lus[:i]), 
+                                        excluded_edges) ))
+                
+            for root_lus, root_edges, spur_path in spur_paths:
+                if spur_path is not None:
+                    path = (root_lus + spur_path[0], root_edges + spur_path[1])
+                    key = self._path_key(path)
+                    
+                    if key not in seen:
+                        seen.add(key)
+                        heappush(candidates, (len(path[1]), next(numbers), 
+                                              path))
+                        
+            if not candidates:
+                break
+            
+            paths.append(heappop(candidates)[2])
+            
+        return paths
+    
+    
+    def _path_key(self, path):
+        lus, edges = path
+        return lus, tuple( self._get_rel_name(edge) for edge in edges )
+    
+    
     def _reconstruct_path(self,  pred, common_lu, succ, format=None):
         lu_formatter = self._get_lex_unit_formatter(format)
         rel_formatter = self._get_relation_formatter(format)
@@ -817,15 +1787,13 @@ class Cornet(object):
             if edge is not None: 
                 path.append(rel_formatter(edge)) 
             
-        # from source lu to common
+        # from source lu to common, which may be a source lu itself
         lu, edge = pred[common_lu]
-        path.insert(0, rel_formatter(edge))
         
         while lu is not None:
+            path.insert(0, rel_formatter(edge))
             path.insert(0, lu_formatter(lu))
             lu, edge = pred[lu]
-            if edge is not None: 
-                path.insert(0, rel_formatter(edge))
             
         return path
     
@@ -835,9 +1803,8 @@ class Cornet(object):
         from_lu_related = {}
         
         if len(path) <= depth:
-            for from_lu, to_lu, edge in self._graph.out_edges_iter(from_lu, data=True):
-                if ( to_lu not in path and
-                     self._rel_has_name(edge, rel_name)): 
+            for from_lu, to_lu, edge in self._out_edges(from_lu, rel_name):
+                if to_lu not in path:
                     to_lu_related = \
                     self._search_related_lex_units(to_lu, rel_name, depth,
                                                    lu_formatter, rel_formatter, 
@@ -870,8 +1837,14 @@ class Cornet(object):
 
         
     def _lu_to_spec(self, lu):
+        form = self._get_lu_form(lu)
+
+        if " " in form:
+            # quoted, so that the specification can be used in a query
+            form = '"' + form + '"'
+
         return self._unit_separator.join((
-            self._get_lu_form(lu),
+            form,
             self._get_lu_cat(lu),
             self._get_lu_sense(lu) ))
     
@@ -882,7 +1855,7 @@ class Cornet(object):
         if not format: format = self._output_format
         
         if format == "xml":
-            return tostring
+            return self._rel_to_xml
         elif format == "spec":
             return self._rel_to_spec
         elif format == "raw":
@@ -896,7 +1869,23 @@ class Cornet(object):
     
     
     def _rel_to_xml(self, edge):
-        return '<relation relation_name="%s">' % edge.get("relation")
+        # edges are dicts rather than elements
+        return '<relation relation_name="%s"/>' % edge.get("relation")
+    
+    
+    # synset relation formatting
+    
+    def _get_synset_relation_formatter(self, format=None):
+        if not format: format = self._output_format
+        
+        if format == "xml":
+            return tostring
+        elif format == "spec":
+            return self._get_syn_rel_name
+        elif format == "raw":
+            return lambda rel: rel
+        else:
+            raise ValueError("unknown output format: " + format)
         
 
     # synset formatting
@@ -915,28 +1904,15 @@ class Cornet(object):
 
         
     def _synset_to_specs(self, synset):
-        specs = []
-        # REMOVE-ME: a list a synonym lu id's, because cdb is still buggy and
-        # sometimes targets the same lu multiple times
-        seen_lu_ids = []
-        
-        for syn in synset.find("synonyms") or []:
-            c_lu_id = syn.get("c_lu_id")
-            try:
-                lu = self._c_lu_id2lu[c_lu_id]
-            except KeyError:
-                # no lu with this id
-                continue
-
-            if c_lu_id not in seen_lu_ids:
-                specs.append(self._lu_to_spec(lu))
-                seen_lu_ids.append(c_lu_id)
-            
-        return specs
+        return list(self._synset2specs[synset])
     
     
     # <cdb_lu> accessors
     
+    def _get_lu_id(self, lu):
+        return lu.get("c_lu_id")
+    
+    
     def _get_lu_form(self, lu):
         try:
             return lu.find("form").get("form-spelling", "") 
@@ -978,6 +1954,12 @@ class Cornet(object):
     
     def _rel_has_name(self, edge, name):
         return not name or edge.get("relation") == name 
+    
+    
+    # <relation> accessors (relations between synsets)
+    
+    def _get_syn_rel_name(self, rel):
+        return rel.get("relation_name")
         
     
 
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+approximate lookup of word forms by edit distance
+
+A DeletionIndex finds all forms within a small Levenshtein distance of a
+string by means of symmetric deletion: if two strings are within distance
+d, deleting at most d characters from each of them yields a common string.
+The index therefore maps every string obtained by deleting up to d
+characters from a form to that form, and a lookup only has to generate the
+deletions of the string looked up, instead of comparing it with every form.
+The candidates found this way are checked by computing their actual
+distance.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+
+class DeletionIndex(object):
+    """
+    Index of forms for lookup within a maximal edit distance
+    """
+
+    def __init__(self, forms, max_distance=2):
+        """
+        @param forms: forms to index
+        @type forms: iterable of strings
+        @keyword max_distance: largest distance supported by lookup
+        @type max_distance: int
+        """
+        self.max_distance = max_distance
+        # deletion -> form, or list of forms if there is more than one
+        # (most deletions belong to a single form, and a form shared with
+        # the list of forms takes no extra memory)
+        self._deletions = {}
+
+        for form in forms:
+            self._add(form)
+
+
+    def lookup(self, string, max_distance=None):
+        """
+        Find the forms within max_distance of string
+
+        @param string: string to look up
+        @keyword max_distance: maximal edit distance, no larger than the
+            maximal distance of the index (default)
+        @type max_distance: int
+
+        @return: list of (distance, form) pairs, sorted by distance and form
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        elif not 0 <= max_distance <= self.max_distance:
+            raise ValueError("maximal distance must be between 0 and %d" %
+                             self.max_distance)
+
+        candidates = set()
+
+        for deletion in _deletions(string, max_distance):
+            forms = self._deletions.get(deletion)
+
+            if forms is None:
+                continue
+            elif isinstance(forms, list):
+                candidates.update(forms)
+            else:
+                candidates.add(forms)
+
+        matches = []
+
+        for form in candidates:
+            distance = levenshtein(string, form, max_distance)
+
+            if distance is not None:
+                matches.append((distance, form))
+
+        matches.sort()
+        return matches
+
+
+    def _add(self, form):
+        deletions = self._deletions
+
+        for deletion in _deletions(form, self.max_distance):
+            forms = deletions.get(deletion)
+
+            if forms is None:
+                deletions[deletion] = form
+            elif isinstance(forms, list):
+                forms.append(form)
+            elif forms != form:
+                deletions[deletion] = [forms, form]
+
+
+
+def levenshtein(s1, s2, max_distance=None):
+    """
+    Compute the Levenshtein distance between two strings, i.e. the minimal
+    number of insertions, deletions and substitutions of single characters
+    needed to turn one into the other
+
+    @keyword max_distance: give up once the distance is known to exceed it
+    @type max_distance: int
+
+    @return: distance, or None if it exceeds max_distance
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    if max_distance is not None and len(s1) - len(s2) > max_distance:
+        return None
+
+    previous = range(len(s2) + 1)
+
+    for i, char1 in enumerate(s1):
+        current = [i + 1]
+
+        for j, char2 in enumerate(s2):
+            current.append(min(previous[j + 1] + 1,
+                               current[j] + 1,
+                               previous[j] + (char1 != char2)))
+
+        if max_distance is not None and min(current) > max_distance:
+            return None
+
+        previous = current
+
+    if max_distance is None or previous[-1] <= max_distance:
+        return previous[-1]
+
+
+def _deletions(string, max_distance):
+    """
+    Return the set of strings obtained by deleting at most max_distance
+    characters from string, including string itself
+    """
+    deletions = set([string])
+    last = [string]
+
+    for _ in range(max_distance):
+        new = []
+
+        for s in last:
+            for i in range(len(s)):
+                deletion = s[:i] + s[i + 1:]
+
+                if deletion not in deletions:
+                    deletions.add(deletion)
+                    new.append(deletion)
+
+        last = new
+
+    return deletions
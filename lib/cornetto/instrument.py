@@ -0,0 +1,597 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+opt-in instrumentation of the query pipeline of Cornet and its subclasses
+
+A hook is installed on a Cornet instance with Cornet.set_hook. From then on,
+every call to a public query method produces a QueryStats instance which is
+passed to the hook. It records the time spent in each stage of the
+pipeline:
+
+    - parse: parsing of lexical unit, relation and query specifications
+    - lookup: lookup of lexical units
+    - search: graph traversal
+    - format: formatting of lexical units, relations and synsets
+    - statistics: computation of probabilities and information content
+    - other: everything else
+
+as well as the number of nodes expanded and edges scanned during search,
+and the size of the result.
+
+The StatsCollector hook aggregates these statistics per method into
+counters and histograms. The SlowQueryLog hook writes the statistics of
+slow queries, and a sample of the others, to a log file as JSON lines.
+
+Instrumentation works by wrapping the methods of an instance, so there is
+no overhead at all when no hook is installed.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+
+from bisect import bisect_left
+from random import Random
+from threading import Lock, local
+from time import time
+
+
+# semi-private methods wrapped per stage
+_stage_methods = {
+    "parse": ( "_split_query", "_split_unit_spec", "_split_rel_spec" ),
+    "lookup": ( "_get_lex_units", "_lookup_form", "_match_lex_units",
+                "_get_lex_units_fuzzy", "_find_multi_word_units" ),
+    "search": ( "_transitive_closure", "_bidirectional_shortest_path",
+                "_search_related_lex_units", "_reconstruct_path",
+                "_shortest_path_dag", "_k_shortest_paths" ),
+    "statistics": ( "_IC", ),
+}
+
+_formatter_methods = ( "_get_lex_unit_formatter", "_get_relation_formatter",
+                       "_get_synset_formatter",
+                       "_get_synset_relation_formatter" )
+
+_edge_methods = ( "_out_edges", "_in_edges" )
+
+# public methods which are not queries
+_not_instrumented = ( "open", "close", "set_hook" )
+
+
+
+class QueryStats(object):
+    """
+    Statistics of a single call to a public query method
+
+    @ivar method: name of the method
+    @ivar args: positional arguments
+    @ivar kwargs: keyword arguments
+    @ivar start: start time (seconds since the epoch)
+    @ivar total_time: total time in seconds
+    @ivar stage_times: mapping of stage names to time in seconds
+    @ivar nodes_expanded: number of lexical units whose edges were scanned
+    @ivar edges_scanned: number of edges followed during search
+    @ivar result_size: number of items in the result
+    @ivar error: exception raised by the call, or None
+    """
+
+    def __init__(self, method, args, kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.start = time()
+        self.total_time = 0.0
+        self.stage_times = {}
+        self.nodes_expanded = 0
+        self.edges_scanned = 0
+        self.result_size = 0
+        self.error = None
+        # stack of active stages
+        self._stages = []
+        self._mark = self.start
+
+
+    def enter(self, stage):
+        now = time()
+
+        if self._stages:
+            self._add_time(self._stages[-1], now)
+
+        self._stages.append(stage)
+        self._mark = now
+
+
+    def leave(self):
+        now = time()
+        self._add_time(self._stages.pop(), now)
+        self._mark = now
+
+
+    def finish(self, result=None, error=None):
+        self.total_time = time() - self.start
+        self.stage_times["other"] = max(
+            0.0, self.total_time - sum(self.stage_times.values()))
+        self.result_size = _result_size(result)
+        self.error = error
+
+
+    def _add_time(self, stage, now):
+        # exclusive time, i.e. without time spent in nested stages
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + now - self._mark
+
+
+def _result_size(value):
+    """
+    number of lexical units, relations, synsets, etc. in the result
+    """
+    if isinstance(value, dict):
+        return len(value) + sum(_result_size(v) for v in value.values())
+    elif isinstance(value, list):
+        if value and isinstance(value[0], (list, dict)):
+            return sum(_result_size(v) for v in value)
+        return len(value)
+    elif value is None:
+        return 0
+    else:
+        return 1
+
+
+
+class QueryHook(object):
+    """
+    Interface of hooks which receive query statistics
+    """
+
+    def query_finished(self, stats):
+        """
+        Called after every call to a public query method
+
+        @param stats: statistics of the call
+        @type stats: QueryStats
+        """
+        pass
+
+
+
+class Histogram(object):
+    """
+    A histogram with fixed bucket bounds
+    """
+
+    def __init__(self, bounds):
+        """
+        @param bounds: sorted upper bounds of the buckets; values larger
+            than the last bound go into an extra overflow bucket
+        @type bounds: sequence of numbers
+        """
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+
+    @classmethod
+    def exponential(cls, start, factor, n):
+        """
+        Create a histogram with n buckets whose bounds grow exponentially
+        """
+        return cls([ start * factor ** i for i in range(n) ])
+
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+
+    def percentile(self, p):
+        """
+        Estimate a percentile as the upper bound of the bucket which contains
+        it (or the maximum for the overflow bucket)
+        """
+        if not self.count:
+            return None
+
+        rank = p / 100.0 * self.count
+        cumulative = 0
+
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+
+    def cumulative(self):
+        """
+        Return list of (upper bound, cumulative count) pairs, where the last
+        upper bound is infinite
+        """
+        pairs = []
+        cumulative = 0
+
+        for bound, count in zip(self.bounds + [float("inf")], self.counts):
+            cumulative += count
+            pairs.append((bound, cumulative))
+
+        return pairs
+
+
+    def as_dict(self):
+        return dict(count=self.count,
+                    sum=self.sum,
+                    min=self.min,
+                    max=self.max,
+                    mean=self.sum / float(self.count) if self.count else None,
+                    p50=self.percentile(50),
+                    p90=self.percentile(90),
+                    p99=self.percentile(99))
+
+
+def time_histogram():
+    """
+    histogram for durations from 10 microseconds to about 80 seconds
+    """
+    return Histogram.exponential(1e-5, 2, 24)
+
+
+def size_histogram():
+    """
+    histogram for sizes from 1 to about a billion
+    """
+    return Histogram.exponential(1, 2, 31)
+
+
+
+class MethodStats(object):
+    """
+    Aggregated statistics of a single method
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.time = time_histogram()
+        self.stage_times = {}
+        self.nodes_expanded = size_histogram()
+        self.edges_scanned = size_histogram()
+        self.result_size = size_histogram()
+
+
+    def add(self, stats):
+        self.calls += 1
+
+        if stats.error is not None:
+            self.errors += 1
+
+        self.time.observe(stats.total_time)
+
+        for stage, seconds in stats.stage_times.items():
+            try:
+                hist = self.stage_times[stage]
+            except KeyError:
+                hist = self.stage_times[stage] = time_histogram()
+            hist.observe(seconds)
+
+        self.nodes_expanded.observe(stats.nodes_expanded)
+        self.edges_scanned.observe(stats.edges_scanned)
+        self.result_size.observe(stats.result_size)
+
+
+    def as_dict(self):
+        return dict(calls=self.calls,
+                    errors=self.errors,
+                    time=self.time.as_dict(),
+                    stage_times=dict( (stage, hist.as_dict())
+                                      for stage, hist in self.stage_times.items() ),
+                    nodes_expanded=self.nodes_expanded.as_dict(),
+                    edges_scanned=self.edges_scanned.as_dict(),
+                    result_size=self.result_size.as_dict())
+
+
+
+class StatsCollector(QueryHook):
+    """
+    A hook which aggregates query statistics per method into counters and
+    histograms. It is safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+
+    def query_finished(self, stats):
+        with self._lock:
+            try:
+                method_stats = self.methods[stats.method]
+            except KeyError:
+                method_stats = self.methods[stats.method] = MethodStats()
+            method_stats.add(stats)
+
+
+    def reset(self):
+        """
+        Discard all statistics collected so far
+        """
+        with self._lock:
+            self.methods = {}
+
+
+    def snapshot(self):
+        """
+        Return statistics collected so far as a dict with method names as keys
+        """
+        with self._lock:
+            return dict( (method, method_stats.as_dict())
+                         for method, method_stats in self.methods.items() )
+
+
+
+class SlowQueryLog(QueryHook):
+    """
+    A hook which writes the statistics of queries which take longer than a
+    threshold to a file, one JSON object per line. Faster queries can be
+    sampled as well. It is safe to use from multiple threads.
+
+    Every line contains the fields "time" (seconds since the epoch),
+    "method", "args", "kwargs", "duration" (in seconds), "stage_times",
+    "nodes_expanded", "edges_scanned", "result_size", "error" (a string or
+    null) and "slow" (whether the duration exceeded the threshold).
+    """
+
+    def __init__(self, log_file, threshold=0.1, sample=0.0, seed=None):
+        """
+        @param log_file: file or filename to append lines to
+        @keyword threshold: minimal duration in seconds of slow queries
+        @type threshold: float
+        @keyword sample: fraction of the other queries to log
+        @type sample: float between 0.0 and 1.0
+        @keyword seed: seed for the random sampling
+        """
+        if isinstance(log_file, basestring):
+            log_file = open(log_file, "a")
+
+        self._file = log_file
+        self._lock = Lock()
+        self._random = Random(seed)
+        self.threshold = threshold
+        self.sample = sample
+
+
+    def query_finished(self, stats):
+        slow = stats.total_time >= self.threshold
+
+        if not slow and ( not self.sample or
+                          self._random.random() >= self.sample ):
+            return
+
+        record = dict(time=stats.start,
+                      method=stats.method,
+                      args=stats.args,
+                      kwargs=stats.kwargs,
+                      duration=stats.total_time,
+                      stage_times=stats.stage_times,
+                      nodes_expanded=stats.nodes_expanded,
+                      edges_scanned=stats.edges_scanned,
+                      result_size=stats.result_size,
+                      error=None if stats.error is None else repr(stats.error),
+                      slow=slow)
+        line = json.dumps(record, sort_keys=True, default=repr) + "\n"
+
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+
+#-------------------------------------------------------------------------------
+# installing hooks
+#-------------------------------------------------------------------------------
+
+class _Instrumentation(object):
+    """
+    Wraps the methods of a single Cornet instance
+    """
+
+    def __init__(self, cornet, hook):
+        self._cornet = cornet
+        self._hook = hook
+        # the statistics of the call in progress, per thread
+        self._local = local()
+        self._wrapped = []
+
+
+    def install(self):
+        cornet = self._cornet
+
+        for name in dir(cornet):
+            if ( not name.startswith("_") and
+                 not name.startswith("set_") and
+                 name not in _not_instrumented and
+                 callable(getattr(cornet, name)) ):
+                self._wrap(name, self._query_wrapper)
+
+        for stage, names in _stage_methods.items():
+            for name in names:
+                if hasattr(cornet, name):
+                    self._wrap(name, self._stage_wrapper, stage)
+
+        for name in _formatter_methods:
+            self._wrap(name, self._formatter_wrapper)
+
+        for name in _edge_methods:
+            self._wrap(name, self._edge_wrapper)
+
+
+    def uninstall(self):
+        for name in self._wrapped:
+            delattr(self._cornet, name)
+
+        self._wrapped = []
+
+
+    def _wrap(self, name, wrapper, *args):
+        # store wrapper as instance attribute, which shadows the method
+        setattr(self._cornet, name,
+                wrapper(name, getattr(self._cornet, name), *args))
+        self._wrapped.append(name)
+
+
+    def _query_wrapper(self, name, method):
+        def wrapper(*args, **kwargs):
+            if getattr(self._local, "stats", None) is not None:
+                # nested call (e.g. ask calls get_lex_units)
+                return method(*args, **kwargs)
+
+            stats = self._local.stats = QueryStats(name, args, kwargs)
+
+            try:
+                try:
+                    result = method(*args, **kwargs)
+                except Exception as inst:
+                    stats.finish(error=inst)
+                    raise
+                else:
+                    stats.finish(result)
+                    return result
+            finally:
+                self._local.stats = None
+                self._hook.query_finished(stats)
+
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+
+    def _stage_wrapper(self, name, method, stage):
+        def wrapper(*args, **kwargs):
+            stats = getattr(self._local, "stats", None)
+
+            if stats is None:
+                return method(*args, **kwargs)
+
+            stats.enter(stage)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.leave()
+
+        return wrapper
+
+
+    def _formatter_wrapper(self, name, method):
+        def wrapper(*args, **kwargs):
+            formatter = method(*args, **kwargs)
+
+            def timed_formatter(value):
+                stats = getattr(self._local, "stats", None)
+
+                if stats is None:
+                    return formatter(value)
+
+                stats.enter("format")
+                try:
+                    return formatter(value)
+                finally:
+                    stats.leave()
+
+            return timed_formatter
+
+        return wrapper
+
+
+    def _edge_wrapper(self, name, method):
+        def wrapper(lus, *args, **kwargs):
+            stats = getattr(self._local, "stats", None)
+
+            if stats is None:
+                return method(lus, *args, **kwargs)
+
+            # a single lexical unit or a list of them
+            if isinstance(lus, list):
+                stats.nodes_expanded += len(lus)
+            else:
+                stats.nodes_expanded += 1
+
+            return _count_edges(method(lus, *args, **kwargs), stats)
+
+        return wrapper
+
+
+def _count_edges(edges, stats):
+    for edge in edges:
+        stats.edges_scanned += 1
+        yield edge
+
+
+def install_hook(cornet, hook):
+    """
+    Install a hook on a Cornet instance, replacing any previous hook
+
+    @param cornet: instance of Cornet or a subclass
+    @param hook: hook receiving query statistics
+    @type hook: QueryHook
+    """
+    remove_hook(cornet)
+
+    if hook is not None:
+        instrumentation = _Instrumentation(cornet, hook)
+        instrumentation.install()
+        cornet._instrumentation = instrumentation
+
+
+def get_hook(cornet):
+    """
+    Return the hook installed on a Cornet instance, or None
+
+    @param cornet: instance of Cornet or a subclass
+    """
+    instrumentation = cornet.__dict__.get("_instrumentation")
+
+    if instrumentation is not None:
+        return instrumentation._hook
+
+
+def remove_hook(cornet):
+    """
+    Remove the hook from a Cornet instance, if any
+
+    @param cornet: instance of Cornet or a subclass
+    """
+    instrumentation = cornet.__dict__.pop("_instrumentation", None)
+
+    if instrumentation is not None:
+        instrumentation.uninstall()
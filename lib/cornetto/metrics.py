@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+request metrics of the Cornetto server
+
+ServerMetrics records per-method request counts, latency histograms and
+error counts, the number of requests in flight, the number of requests
+rejected by admission control, the hit rates of caches and the memory use
+of the process. These are available as a struct (for the
+XML-RPC stats() method) or as plain text in the Prometheus exposition format
+(for HTTP GET requests on the metrics path).
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import os
+import resource
+import sys
+
+from threading import Lock
+from time import time
+
+from cornetto.instrument import time_histogram
+
+
+# prefix of all metric names
+_prefix = "cornetto"
+
+
+class ServerMetrics(object):
+    """
+    Thread-safe registry of server metrics
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.start_time = time()
+        self.in_flight = 0
+        self._requests = {}
+        self._errors = {}
+        self._latency = {}
+        self._rejected = {}
+        self._caches = {}
+
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+
+    def request_finished(self, method, seconds, error=False):
+        """
+        Record a finished request
+
+        @param method: name of the method
+        @param seconds: time it took to handle the request
+        @keyword error: whether the request failed
+        """
+        self.requests_finished([(method, seconds, error)])
+
+
+    def requests_finished(self, timings):
+        """
+        Record a batch of finished requests, which arrived together and
+        therefore counted as a single request in flight
+
+        @param timings: list of tuples of method, time and error flag
+        """
+        with self._lock:
+            self.in_flight -= 1
+
+            for method, seconds, error in timings:
+                self._requests[method] = self._requests.get(method, 0) + 1
+
+                if error:
+                    self._errors[method] = self._errors.get(method, 0) + 1
+
+                try:
+                    hist = self._latency[method]
+                except KeyError:
+                    hist = self._latency[method] = time_histogram()
+                hist.observe(seconds)
+
+
+    def request_rejected(self, reason):
+        """
+        Record a request which was not admitted
+
+        @param reason: reason for rejecting it, e.g. "busy" or "rate"
+        """
+        with self._lock:
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+
+
+    def register_cache(self, name, info):
+        """
+        Register a cache whose hit rate is to be reported
+
+        @param name: name of the cache
+        @param info: function without arguments which returns the number of
+            hits and misses so far as a tuple
+        """
+        with self._lock:
+            self._caches[name] = info
+
+
+    def uptime(self):
+        return time() - self.start_time
+
+
+    def stats(self):
+        """
+        Return all metrics as a dict, which contains no None values and only
+        string keys, so it can be marshalled by XML-RPC
+        """
+        with self._lock:
+            methods = {}
+
+            for method, hist in self._latency.items():
+                latency = hist.as_dict()
+                methods[method] = dict(
+                    requests=self._requests.get(method, 0),
+                    errors=self._errors.get(method, 0),
+                    latency=dict( (key, value)
+                                  for key, value in latency.items()
+                                  if value is not None ))
+
+            in_flight = self.in_flight
+            rejected = dict(self._rejected)
+            caches = self._caches.items()
+
+        return dict(uptime=self.uptime(),
+                    pid=os.getpid(),
+                    in_flight=in_flight,
+                    rejected=rejected,
+                    # in kibibytes, because XML-RPC integers are 32 bits
+                    rss_kb=process_rss() // 1024,
+                    methods=methods,
+                    caches=dict( (name, _cache_stats(info))
+                                 for name, info in caches ))
+
+
+    def prometheus_text(self):
+        """
+        Return all metrics in the text-based exposition format of Prometheus
+        """
+        lines = []
+
+        with self._lock:
+            _add_metric(lines, "requests_total", "counter",
+                        "Number of XML-RPC requests handled",
+                        [ ({"method": method}, count)
+                          for method, count in sorted(self._requests.items()) ])
+            _add_metric(lines, "request_errors_total", "counter",
+                        "Number of XML-RPC requests which failed",
+                        [ ({"method": method}, self._errors.get(method, 0))
+                          for method in sorted(self._requests) ])
+            _add_metric(lines, "requests_in_flight", "gauge",
+                        "Number of XML-RPC requests being handled",
+                        [ ({}, self.in_flight) ])
+            _add_histogram(lines, "request_duration_seconds",
+                           "Time spent handling XML-RPC requests",
+                           sorted(self._latency.items()))
+            _add_metric(lines, "requests_rejected_total", "counter",
+                        "Number of requests rejected by admission control",
+                        [ ({"reason": reason}, count)
+                          for reason, count in sorted(self._rejected.items()) ])
+            caches = sorted(self._caches.items())
+
+        cache_stats = [ (name, _cache_stats(info)) for name, info in caches ]
+        _add_metric(lines, "cache_hits_total", "counter",
+                    "Number of cache hits",
+                    [ ({"cache": name}, stats["hits"])
+                      for name, stats in cache_stats ])
+        _add_metric(lines, "cache_misses_total", "counter",
+                    "Number of cache misses",
+                    [ ({"cache": name}, stats["misses"])
+                      for name, stats in cache_stats ])
+        _add_metric(lines, "cache_hit_ratio", "gauge",
+                    "Fraction of cache lookups which were hits",
+                    [ ({"cache": name}, stats["hit_ratio"])
+                      for name, stats in cache_stats ])
+
+        _add_metric(lines, "process_resident_memory_bytes", "gauge",
+                    "Resident memory size in bytes",
+                    [ ({}, process_rss()) ])
+        _add_metric(lines, "process_start_time_seconds", "gauge",
+                    "Start time of the process since the epoch in seconds",
+                    [ ({}, self.start_time) ])
+
+        return "\n".join(lines) + "\n"
+
+
+
+def process_rss():
+    """
+    Return the resident set size of the current process in bytes
+
+    Uses /proc where available, and the peak resident set size otherwise.
+    """
+    try:
+        statm = open("/proc/self/statm")
+        try:
+            pages = int(statm.read().split()[1])
+        finally:
+            statm.close()
+        return pages * resource.getpagesize()
+    except (IOError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on Mac OS X, kilobytes elsewhere
+        if sys.platform == "darwin":
+            return peak
+        return peak * 1024
+
+
+def _cache_stats(info):
+    hits, misses = info()
+    lookups = hits + misses
+    return dict(hits=hits,
+                misses=misses,
+                hit_ratio=hits / float(lookups) if lookups else 0.0)
+
+
+def _add_metric(lines, name, type, help, samples):
+    name = _prefix + "_" + name
+    lines.append("# HELP %s %s" % (name, help))
+    lines.append("# TYPE %s %s" % (name, type))
+
+    for labels, value in samples:
+        lines.append("%s%s %s" % (name, _format_labels(labels),
+                                  _format_value(value)))
+
+
+def _add_histogram(lines, name, help, histograms):
+    name = _prefix + "_" + name
+    lines.append("# HELP %s %s" % (name, help))
+    lines.append("# TYPE %s histogram" % name)
+
+    for method, hist in histograms:
+        for bound, count in hist.cumulative():
+            labels = _format_labels(dict(method=method, le=_format_value(bound)))
+            lines.append("%s_bucket%s %d" % (name, labels, count))
+
+        labels = _format_labels(dict(method=method))
+        lines.append("%s_sum%s %s" % (name, labels, _format_value(hist.sum)))
+        lines.append("%s_count%s %d" % (name, labels, hist.count))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"' % (key, str(value).replace("\\", r"\\").replace('"', r'\"'))
+        for key, value in sorted(labels.items()) )
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
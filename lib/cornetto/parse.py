@@ -30,6 +30,10 @@ __author__ = 'Erwin Marsi <e.marsi@gmail.com>'
 __version__ = '0.6.1'
 
 
+import gc
+import warnings
+
+from contextlib import contextmanager
 from sys import stderr
 from xml.etree.cElementTree import ElementTree, Element, iterparse, tostring
 
@@ -42,7 +46,7 @@ if LooseVersion(networkx.__version__) < LooseVersion('1.0'):
 
 
 
-def _parse_cdb_lu(file, graph, verbose=False):
+def _parse_cdb_lu(file, graph, verbose=False, prune=False):
     """
     Parse xml file which defines the lexical units.
     Add lexical units (as Element) to the XiGraph graph.
@@ -50,55 +54,19 @@ def _parse_cdb_lu(file, graph, verbose=False):
     lexical-unit-id-->lexical-unit
     """
     parser = iterparse(file)
-    return _parse_lex_units(parser, graph, verbose)
+    return _parse_lex_units(parser, graph, verbose, prune)
 
 
 
-def _parse_lex_units(parser, graph, verbose=False):
+def _parse_lex_units(parser, graph, verbose=False, prune=False):
     form2lu = {}
     c_lu_id2lu = {}
     
     for event, elem in parser:
         if elem.tag == "cdb_lu":
-            # make sure this attrib is NOT already present,
-            # because we are going to add it in _synonym_relations_to_edges()
-            assert not elem.get("c_sy_id")
-            
-            c_lu_id = elem.get("c_lu_id")
-            # REMOVE-ME: check unique id
-            assert c_lu_id and c_lu_id not in c_lu_id2lu
-            
-            graph.add_node(elem)
-            c_lu_id2lu[c_lu_id] = elem
-            
-            # note that value can be ascii or unicode (peculiarity of ElementTree)
-            form = form_elem.get("form-spelling")
-            
-            # REMOVE-ME: form should never be None 
-            if form:
-                form2lu.setdefault(form, []).append(elem)
-            elif verbose:
-                print >>stderr, ("Warning: form element in lexical unit with id "
-                                 + repr(c_lu_id) + " has no 'form-spelling' attribute")
-                continue
-            
-            # fix category flaws (ADJECTIVE, ADVERB, NOUN, VERB) in current
-            # release of Cornetto
-            cat = form_elem.get("form-cat", "")
-            newcat = cat.lower()
-
-            if newcat == "adjective":
-                newcat = "adj"
-            elif newcat == "adverb":
-                newcat = "adv"
-                
-            if newcat != cat:
-                if verbose:
-                    form_elem.set("form-cat", newcat)
-                    print >>stderr, ("Warning: changed cat from " + repr(cat)
-                                     + " to " + repr(newcat) + " in lexical unit with id " +
-                                     repr(c_lu_id))
-            
+            if prune:
+                _prune_lex_unit(elem)
+            _add_lex_unit(elem, form_elem, graph, form2lu, c_lu_id2lu, verbose)
         elif elem.tag == "form":
             form_elem = elem
             
@@ -107,7 +75,49 @@ def _parse_lex_units(parser, graph, verbose=False):
 
 
 
-def _parse_cdb_syn(file, c_lu_id2lu, verbose=False):
+def _add_lex_unit(elem, form_elem, graph, form2lu, c_lu_id2lu, verbose=False):
+    """
+    Add lexical unit element with form element form_elem to the graph and
+    the mappings form-->lexical units and lexical-unit-id-->lexical-unit
+    """
+    c_lu_id = elem.get("c_lu_id")
+    # REMOVE-ME: check unique id
+    assert c_lu_id and c_lu_id not in c_lu_id2lu
+    
+    graph.add_node(elem)
+    c_lu_id2lu[c_lu_id] = elem
+    
+    # note that value can be ascii or unicode (peculiarity of ElementTree)
+    form = form_elem.get("form-spelling")
+    
+    # REMOVE-ME: form should never be None 
+    if form:
+        form2lu.setdefault(form, []).append(elem)
+    elif verbose:
+        print >>stderr, ("Warning: form element in lexical unit with id "
+                         + repr(c_lu_id) + " has no 'form-spelling' attribute")
+        return
+    
+    # fix category flaws (ADJECTIVE, ADVERB, NOUN, VERB) in current
+    # release of Cornetto
+    cat = form_elem.get("form-cat", "")
+    newcat = cat.lower()
+
+    if newcat == "adjective":
+        newcat = "adj"
+    elif newcat == "adverb":
+        newcat = "adv"
+        
+    if newcat != cat:
+        if verbose:
+            form_elem.set("form-cat", newcat)
+            print >>stderr, ("Warning: changed cat from " + repr(cat)
+                             + " to " + repr(newcat) + " in lexical unit with id " +
+                             repr(c_lu_id))
+
+
+
+def _parse_cdb_syn(file, c_lu_id2lu, verbose=False, prune=False):
     """
     Parse xml file which defines the synsets.
     Return the mappings synset-id-->synset and
@@ -128,80 +138,88 @@ def _parse_cdb_syn(file, c_lu_id2lu, verbose=False):
     # This table will dropped once parse_cdb is finished.
     sy_id2lus = {}
     lus = []
-    # REMOVE-ME: a list a synonym lu id's, because cdb is still buggy and
+    # REMOVE-ME: a set of synonym lu id's, because cdb is still buggy and
     # sometimes targets the same lu multiple times
-    seen_lu_ids = []
+    seen_lu_ids = set()
     
     parser = iterparse(file)
     
     for event, elem in parser:
         if elem.tag == "cdb_synset":
-            c_sy_id = elem.get("c_sy_id")
-
-            if c_sy_id and c_sy_id not in sy_id2synset:
-                sy_id2synset[c_sy_id] = elem
-                # a superficial copy of the list of lexical units
-                sy_id2lus[c_sy_id] = lus[:]
-            
-            d_synset_id = elem.get("d_synset_id")
-            # not always present and may be identical to c_cy_id
-            if d_synset_id and d_synset_id != c_sy_id:
-                sy_id2synset[d_synset_id] = elem
-                # reuse the same copy of lus
-                sy_id2lus[d_synset_id] = sy_id2lus[c_sy_id] 
-                
+            if prune:
+                _prune_synset(elem)
+            _add_synset(elem, lus, sy_id2synset, sy_id2lus)
             lus = []
-            seen_lu_ids = []
+            seen_lu_ids = set()
         elif elem.tag == "synonym":
-            c_lu_id = elem.get("c_lu_id")
-            
-            try:
-                lu = c_lu_id2lu[c_lu_id]
-            except KeyError:
-                if verbose: print >>stderr, ( "Warning: lu with id " +
-                                              repr(c_lu_id) + " does not exist" )
-                continue
-            
-            if c_lu_id not in seen_lu_ids:
-                lus.append(lu)
-                seen_lu_ids.append(c_lu_id)
+            _add_synonym(elem.get("c_lu_id"), c_lu_id2lu, lus, seen_lu_ids,
+                         verbose)
             
     return sy_id2synset, sy_id2lus
 
 
+def _add_synset(elem, lus, sy_id2synset, sy_id2lus):
+    """
+    Add synset element with lexical units lus to the mappings
+    synset-id-->synset and synset-id-->list-of-lexical-units
+    """
+    c_sy_id = elem.get("c_sy_id")
+
+    if c_sy_id and c_sy_id not in sy_id2synset:
+        sy_id2synset[c_sy_id] = elem
+        # a superficial copy of the list of lexical units
+        sy_id2lus[c_sy_id] = lus[:]
+    
+    d_synset_id = elem.get("d_synset_id")
+    # not always present and may be identical to c_cy_id
+    if d_synset_id and d_synset_id != c_sy_id:
+        sy_id2synset[d_synset_id] = elem
+        # reuse the same copy of lus
+        sy_id2lus[d_synset_id] = sy_id2lus[c_sy_id] 
+
+
+def _add_synonym(c_lu_id, c_lu_id2lu, lus, seen_lu_ids, verbose=False):
+    """
+    Add the lexical unit with id c_lu_id to the lexical units lus of the
+    current synset, unless it does not exist or was seen before
+    """
+    try:
+        lu = c_lu_id2lu[c_lu_id]
+    except KeyError:
+        if verbose: print >>stderr, ( "Warning: lu with id " +
+                                      repr(c_lu_id) + " does not exist" )
+        return
+    
+    if c_lu_id not in seen_lu_ids:
+        lus.append(lu)
+        seen_lu_ids.add(c_lu_id)
+
+
 def _relations_to_edges(c_lu_id2lu, sy_id2synset, sy_id2lus, graph, verbose=False):
     """
     Convert relations to graph edges 
     """
-    # FIXME
-    # A synset may appear twice in the table sy_id2synset 
-    # so  we cannot iterate over its values directly.
-    # Instead, we must determine unqiue values first.
-    # (see remark for parse_cdb_syn)
-    for synset_el in set(sy_id2synset.values()):                    
-        _synonym_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus, graph, verbose=False)
-        _wn_internal_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus,
-                                        graph, verbose=verbose)
+    with _gc_paused():
+        # FIXME
+        # A synset may appear twice in the table sy_id2synset 
+        # so  we cannot iterate over its values directly.
+        # Instead, we must determine unqiue values first.
+        # (see remark for parse_cdb_syn)
+        for synset_el in set(sy_id2synset.values()):                    
+            _synonym_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus, graph, verbose=False)
+            _wn_internal_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus,
+                                            graph, verbose=verbose)
         
         
 def _synonym_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus, graph,
                                 verbose=False):
     """
     Add edges between all synonym lexical units in the graph.
-    Also add a new 'c_sy_id' attribute to lexical unit elements 
-    which lists all synsets this unit belongs to.
     """
     c_sy_id = synset_el.get("c_sy_id")
     nodes = sy_id2lus[c_sy_id]
     
     for from_node in nodes:
-        # For later reference, add a pointer to all synset id's to which this
-        # lu belongs. Yes, a lexical unit can belong to multiple synsets.
-        try:
-            from_node.set("c_sy_id", from_node.get("c_sy_id") + "," + c_sy_id)
-        except TypeError:
-            from_node.set("c_sy_id", c_sy_id)
-        
         for to_node in nodes:
             if from_node is not to_node:
                 add_edge(graph, from_node, to_node, relation="SYNONYM",
@@ -267,9 +285,88 @@ def _wn_internal_relations_to_edges(synset_el, c_lu_id2lu, sy_id2lus, graph,
                 add_edge(graph, from_node, to_node, relation=relation,
                          verbose=verbose)
 
-                
-                
-def parse_cdb(cdb_lu, cdb_syn, verbose=False):
+
+@contextmanager
+def _gc_paused():
+    """
+    pause the cyclic garbage collector, which would otherwise scan the
+    growing number of objects over and over again while they are created
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+#-------------------------------------------------------------------------------
+# pruning
+#-------------------------------------------------------------------------------
+
+# The lean engine parses with ElementTree like the etree engine, but prunes
+# every lexical unit and synset as soon as it is complete. Of the lexical
+# units it only keeps the <cdb_lu> and <form> elements and of the synsets the
+# <cdb_synset>, <synonyms>, <synonym>, <wn_internal_relations> and <relation>
+# elements, which is all that queries need. Output in 'xml' or 'raw' format
+# is therefore limited to these elements. It takes less memory, not less
+# time, than the etree engine.
+
+# tags of the kept children of a synset, and of their kept children
+_synset_children = {"synonyms": "synonym", "wn_internal_relations": "relation"}
+
+
+def _prune_lex_unit(elem):
+    """
+    remove all children of a lexical unit element except its form element
+    """
+    if len(elem) > 1 or elem.text:
+        form_elem = elem.find("form")
+        del elem[:]
+        elem.text = None
+
+        if form_elem is not None:
+            elem.append(form_elem)
+
+
+def _prune_synset(elem):
+    """
+    remove all children of a synset element except its synonyms and
+    internal relations
+    """
+    elem.text = None
+    elem[:] = [ child for child in elem if child.tag in _synset_children ]
+
+    for child in elem:
+        tag = _synset_children[child.tag]
+        child[:] = [ grandchild for grandchild in child
+                     if grandchild.tag == tag ]
+
+        for grandchild in child:
+            del grandchild[:]
+
+
+
+def _check_engine(engine):
+    """
+    check the name of the parser engine and return whether it prunes
+    """
+    if engine == "fast":
+        # the name of the lean engine up to version 0.6.1
+        warnings.warn('parser engine "fast" is deprecated, use "lean"',
+                      DeprecationWarning, stacklevel=3)
+        engine = "lean"
+
+    if engine not in ("etree", "lean"):
+        raise ValueError("unknown parser engine: " + repr(engine))
+
+    return engine == "lean"
+
+
+
+def parse_cdb(cdb_lu, cdb_syn, verbose=False, engine="etree"):
     """
     parse the xml files which define the Cornetto database
     
@@ -307,15 +404,25 @@ def parse_cdb(cdb_lu, cdb_syn, verbose=False):
     @keyword verbose: verbose output during parsing
     @type verbose: bool
     
+    @keyword engine: 'etree' keeps complete elements; 'lean' prunes them
+    to the elements needed for queries while parsing, which takes less
+    memory (but not less time) when the files contain much more than that,
+    as Cornetto does. With 'lean', lexical units keep only their <form>
+    element and synsets only their <synonyms> and <wn_internal_relations>
+    elements, so output in 'xml' and 'raw' format lacks everything else,
+    such as the senses, examples and external relations. 'fast' is a
+    deprecated alias of 'lean'.
+    @type engine: string ('etree', 'lean')
+    
     @return: tuple(dict, dict, dict, Graph subclass)
     """
     graph = networkx.MultiDiGraph()
 
-    form2lu, c_lu_id2lu = _parse_cdb_lu(cdb_lu, graph, verbose=verbose)
-
+    prune = _check_engine(engine)
+    form2lu, c_lu_id2lu = _parse_cdb_lu(cdb_lu, graph, verbose=verbose,
+                                        prune=prune)
     sy_id2synset, sy_id2lus = _parse_cdb_syn(cdb_syn, c_lu_id2lu,
-                                             verbose=verbose)
-
+                                             verbose=verbose, prune=prune)
     _relations_to_edges(c_lu_id2lu, sy_id2synset, sy_id2lus, graph,
                         verbose=verbose)
     
@@ -344,12 +451,12 @@ def _parse_count_totals(parser):
     return cat2count
 
 
-def _parse_cdb_lu_with_counts(file, graph, verbose=False):
+def _parse_cdb_lu_with_counts(file, graph, verbose=False, prune=False):
     """
     an extension of _parse_cdb_lu which also parses the count totals
     """
     parser = iterparse(file)
-    form2lu, c_lu_id2lu = _parse_lex_units(parser, graph, verbose)
+    form2lu, c_lu_id2lu = _parse_lex_units(parser, graph, verbose, prune)
     cat2counts = _parse_count_totals(parser)
     _check_subcounts(parser)
     return form2lu, c_lu_id2lu, cat2counts
@@ -368,26 +475,21 @@ def _check_subcounts(parser):
     raise TypeError
 
 
-def parse_cdb_with_counts(cdb_lu, cdb_syn, verbose=False):
+def parse_cdb_with_counts(cdb_lu, cdb_syn, verbose=False, engine="etree"):
     """
     an extension of parse_cdb which also parses the count totals
     """
     graph = networkx.MultiDiGraph()
+    prune = _check_engine(engine)
 
     form2lu, c_lu_id2lu, cat2counts = \
-    _parse_cdb_lu_with_counts(cdb_lu, graph, verbose=verbose)
+    _parse_cdb_lu_with_counts(cdb_lu, graph, verbose=verbose, prune=prune)
 
     sy_id2synset, sy_id2lus = \
-    _parse_cdb_syn(cdb_syn, c_lu_id2lu, verbose=verbose)
+    _parse_cdb_syn(cdb_syn, c_lu_id2lu, verbose=verbose, prune=prune)
 
     _relations_to_edges(c_lu_id2lu, sy_id2synset, sy_id2lus, graph,
                         verbose=verbose)
     
     # drop sy_id2lus
     return form2lu, c_lu_id2lu, sy_id2synset, graph, cat2counts
-
-
-
-
-
-
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+prefork server sharing one memory-mapped database snapshot
+
+A supervisor process makes sure there is an SQLite snapshot of the Cornetto
+database (see cornetto.sqlite), creates the listening socket and forks a
+number of worker processes. Every worker opens the snapshot with
+memory-mapped I/O, so the pages of the database file are shared by all
+workers through the operating system's page cache instead of being copied
+into each of them, and accepts connections on the shared socket, which
+spreads them over the workers. Workers which die are restarted.
+
+On SIGHUP, or a call to reload() on any worker, the supervisor rebuilds the
+snapshot if the xml files are newer, and replaces the workers one
+generation at a time: every old worker finishes the request it is handling
+and exits, and a new one, which opens the new snapshot, takes its place.
+Connections which arrive in the meantime wait in the backlog of the shared
+socket, so none are dropped.
+
+Metrics (stats() and GET /metrics) are kept per worker; the pid in the
+output of stats() tells which worker answered. The result cache, if any, is
+created by the supervisor and shared by all workers, so a result computed by
+one worker is served from the cache by all others.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import errno
+import os
+import signal
+import socket
+
+from sys import stderr
+from time import sleep, time
+
+from cornetto.instrument import SlowQueryLog
+from cornetto.server import ( CornetProxy, CornetServer, create_cache,
+                              register_functions, _filename )
+from cornetto.sqlite import SqliteCornet, export_cdb
+
+
+# workers which die sooner than this after being started are restarted
+# only after a delay, to avoid a fork loop when they can never start
+_min_worker_lifetime = 1.0
+
+
+
+class PreforkSupervisor(object):
+    """
+    Forks workers which serve a database snapshot on a shared socket, and
+    restarts them when they die
+    """
+
+    def __init__(self, db_file, host="localhost", port=5204, workers=4,
+                 log=False, max_depth=None, mmap_size=None, slow_log=None,
+                 slow_threshold=0.1, slow_sample=0.0, backlog=1024,
+                 cdb_lu=None, cdb_syn=None, verbose=False, cache_size=0,
+                 form_folding=None):
+        """
+        @param db_file: SQLite database file produced by export_cdb
+        @keyword host: host to listen on
+        @keyword port: port to listen on
+        @keyword workers: number of worker processes
+        @keyword log: log requests
+        @keyword max_depth: maximal search depth (between 1 and 9)
+        @keyword mmap_size: number of bytes of the database file to map into
+            memory; by default the whole file
+        @keyword slow_log: file to write a log of slow queries to
+        @keyword slow_threshold: minimal duration in seconds of slow queries
+        @keyword slow_sample: fraction of the other queries to log as well
+        @keyword backlog: maximal number of pending connections
+        @keyword cdb_lu: xml definition of the lexical units to rebuild
+            the snapshot from on reload
+        @keyword cdb_syn: xml definition of the synsets to rebuild the
+            snapshot from on reload
+        @keyword verbose: verbose output while rebuilding the snapshot
+        @keyword cache_size: size of the result cache shared by the workers
+            in megabytes; by default results are not cached
+        @keyword form_folding: form folding (see Cornet.set_form_folding)
+        """
+        self.db_file = db_file
+        self.cdb_lu = _filename(cdb_lu)
+        self.cdb_syn = _filename(cdb_syn)
+        self.verbose = verbose
+        self.workers = workers
+        self.log = log
+        self.max_depth = max_depth
+        self.form_folding = form_folding
+
+        if mmap_size is None:
+            # leave room for growth of the file by a reload
+            mmap_size = 2 * os.path.getsize(db_file)
+
+        self.mmap_size = mmap_size
+        self.slow_log = slow_log
+        self.slow_threshold = slow_threshold
+        self.slow_sample = slow_sample
+        # created before forking, so all workers share it
+        self.cache = create_cache(cache_size)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(backlog)
+
+        # pid -> start time
+        self._children = {}
+        # pids of workers asked to exit after a reload
+        self._retiring = set()
+        self._stopping = False
+        self._reload_requested = False
+        self._retire = False
+
+
+    def serve_forever(self):
+        """
+        Fork the workers and restart them when they die, until the
+        supervisor receives SIGTERM or SIGINT
+        """
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload()
+
+                while len(self._children) < self.workers:
+                    self._spawn()
+
+                try:
+                    pid, status = os.wait()
+                except OSError as inst:
+                    if inst.errno == errno.EINTR:
+                        continue
+                    raise
+
+                started = self._children.pop(pid, None)
+
+                if pid in self._retiring:
+                    self._retiring.discard(pid)
+                elif started is not None and not self._stopping:
+                    print >>stderr, "Worker %d died (status %d); restarting" % (
+                        pid, status)
+
+                    if time() - started < _min_worker_lifetime:
+                        sleep(_min_worker_lifetime)
+        finally:
+            self._kill_children()
+            self.socket.close()
+
+
+    def _spawn(self):
+        pid = os.fork()
+
+        if pid:
+            self._children[pid] = time()
+            return
+
+        # child
+        status = 1
+
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, self._request_retire)
+            self._serve()
+            status = 0
+        except KeyboardInterrupt:
+            status = 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            # never return into the supervisor's code
+            os._exit(status)
+
+
+    def _serve(self):
+        # identifies the snapshot in the cache; taken before opening it, so
+        # a snapshot replaced in between is never cached under a newer time
+        loaded_at = os.path.getmtime(self.db_file)
+        cornet = SqliteCornet(self.db_file, mmap_size=self.mmap_size,
+                              form_folding=self.form_folding)
+        proxy = CornetProxy(max_depth=self.max_depth, cornet=cornet,
+                            cache=self.cache, loaded_at=loaded_at)
+
+        if self.slow_log:
+            cornet.set_hook(SlowQueryLog(self.slow_log, self.slow_threshold,
+                                         self.slow_sample))
+
+        server = CornetServer(self.socket.getsockname(), logRequests=self.log,
+                              encoding="UTF-8", bind_and_activate=False)
+        # accept on the socket shared by all workers
+        server.socket.close()
+        server.socket = self.socket
+        register_functions(server, proxy)
+        server.register_reloader(_WorkerReloader(os.getppid()))
+
+        if self.cache is not None:
+            server.metrics.register_cache("results", self.cache.info)
+        # wake up regularly to see if the worker should retire
+        server.timeout = 0.5
+
+        while not self._retire:
+            server.handle_request()
+
+
+    def _reload(self):
+        self._reload_requested = False
+
+        if self.cdb_lu and self.cdb_syn:
+            try:
+                build_snapshot(self.cdb_lu, self.cdb_syn, self.db_file,
+                               self.verbose)
+            except Exception as inst:
+                print >>stderr, "Rebuilding snapshot failed: %s" % inst
+                return
+
+        if self.cache is not None:
+            # entries of the old snapshot are never hit again
+            self.cache.clear()
+
+        print >>stderr, "Replacing workers"
+
+        for pid in self._children:
+            if pid not in self._retiring:
+                try:
+                    os.kill(pid, signal.SIGHUP)
+                    self._retiring.add(pid)
+                except OSError:
+                    pass
+
+        # new workers are spawned as soon as the old ones have exited
+
+
+    def _request_reload(self, signum, frame):
+        self._reload_requested = True
+
+
+    def _request_retire(self, signum, frame):
+        # in worker
+        self._retire = True
+
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+    def _kill_children(self):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                # already gone
+                self._children.pop(pid, None)
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except OSError as inst:
+                if inst.errno == errno.EINTR:
+                    continue
+                # no children left
+                break
+            self._children.pop(pid, None)
+
+
+
+class _WorkerReloader(object):
+    """
+    Provides reload() and reload_status() in a worker by delegating to the
+    supervisor
+    """
+
+    def __init__(self, supervisor_pid):
+        self._supervisor_pid = supervisor_pid
+        self._loaded_at = time()
+
+
+    def reload(self):
+        """
+        reload() --> STARTED
+
+        Reload the database in the background without interrupting service.
+
+        Parameters:
+
+            STARTED boolean: always True
+
+        Remarks:
+
+            The supervisor rebuilds the snapshot if the xml files are newer
+            and then replaces all workers.
+        """
+        os.kill(self._supervisor_pid, signal.SIGHUP)
+        return True
+
+
+    def status(self):
+        """
+        reload_status() --> STATUS
+
+        Status of reloading the database
+
+        Parameters:
+
+            STATUS struct: "state" (always "serving"), "loaded_at" (time
+                this worker opened the snapshot, in seconds since the epoch)
+                and "pid" (process id of this worker)
+        """
+        return dict(state="serving",
+                    loaded_at=self._loaded_at,
+                    pid=os.getpid())
+
+
+
+def build_snapshot(cdb_lu, cdb_syn, db_file, verbose=False):
+    """
+    Export the database to an SQLite snapshot, unless there is a snapshot
+    which is newer than both xml files
+
+    @param cdb_lu: xml definition of the lexical units
+    @type cdb_lu: file or filename
+    @param cdb_syn: xml definition of the synsets
+    @type cdb_syn: file or filename
+    @param db_file: SQLite database file
+    @type db_file: string
+    """
+    if os.path.exists(db_file):
+        mtime = os.path.getmtime(db_file)
+
+        if all( mtime > os.path.getmtime(_filename(f))
+                for f in (cdb_lu, cdb_syn) ):
+            return
+
+        print >>stderr, "Snapshot %s is out of date" % db_file
+
+    print >>stderr, "Building snapshot %s - this may take a while..." % db_file
+    # build aside and rename, so workers never see a partial file
+    tmp_file = "%s.%d.tmp" % (db_file, os.getpid())
+
+    try:
+        export_cdb(cdb_lu, cdb_syn, tmp_file, verbose)
+        os.rename(tmp_file, db_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def start_prefork_server(cdb_lu=None, cdb_syn=None, snapshot=None,
+                         host="localhost", port=5204, log=None, verbose=False,
+                         max_depth=None, workers=4, mmap_size=None,
+                         slow_log=None, slow_threshold=0.1, slow_sample=0.0,
+                         cache_size=0, form_folding=None):
+    """
+    main function to start the prefork Cornetto XMLRPC server
+
+    @keyword cdb_lu: xml definition of the lexical units
+    @type cdb_lu: file or filename
+
+    @keyword cdb_syn: xml definition of the synsets
+    @type cdb_syn: file or filename
+
+    @keyword snapshot: SQLite snapshot to serve, which is (re)built from the
+        xml files if these are given and newer; by default the name of the
+        cdb_lu file plus ".db"
+    @type snapshot: string
+
+    @keyword workers: number of worker processes
+    @type workers: int
+
+    @keyword mmap_size: number of bytes of the snapshot to map into memory;
+        by default the whole file
+
+    Other arguments are the same as for cornetto.server.start_server.
+    Similarity measures are not available in prefork mode.
+    """
+    if cdb_lu and cdb_syn:
+        if not snapshot:
+            snapshot = _filename(cdb_lu) + ".db"
+        build_snapshot(cdb_lu, cdb_syn, snapshot, verbose)
+    elif not snapshot:
+        raise ValueError("either xml files or a snapshot are required")
+
+    supervisor = PreforkSupervisor(snapshot, host, port, workers=workers,
+                                   log=log, max_depth=max_depth,
+                                   mmap_size=mmap_size, slow_log=slow_log,
+                                   slow_threshold=slow_threshold,
+                                   slow_sample=slow_sample,
+                                   cdb_lu=cdb_lu, cdb_syn=cdb_syn,
+                                   verbose=verbose, cache_size=cache_size,
+                                   form_folding=form_folding)
+
+    print >>stderr, "Listening on %s:%d (%d worker processes)" % (host, port,
+                                                                  workers)
+    supervisor.serve_forever()
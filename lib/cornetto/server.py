@@ -27,16 +27,30 @@ socket server exposing Cornetto database through XML-RPC
 
 # FEATURES
 # - logging queries
-# - a forking/threading server
 
 
 __author__ = 'Erwin Marsi <e.marsi@gmail.com>'
 __version__ = '0.6.1'
 
+import signal
+
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from Queue import Queue, Full
 from sys import stderr
 from textwrap import wrap
-from SimpleXMLRPCServer import SimpleXMLRPCServer
+from threading import Condition, Lock, Thread, local
+from time import time
+from zlib import compress, decompress
+from pydoc import getdoc
+from SimpleXMLRPCServer import ( SimpleXMLRPCServer, SimpleXMLRPCRequestHandler,
+                                 SimpleXMLRPCDispatcher, list_public_methods,
+                                 resolve_dotted_attribute )
+from cornetto.admission import AdmissionController, Rejected
+from cornetto.cache import SharedCache
 from cornetto.cornet import Cornet
+from cornetto.instrument import SlowQueryLog, get_hook
+from cornetto.metrics import ServerMetrics
+from cornetto.wire import XmlRpcCodec, get_codec, handle, native_none
 
 
 class CornetProxy(object):
@@ -50,6 +64,9 @@ class CornetProxy(object):
            to False
         4. provide doc strings which are suitable to XML-RPC's 
            system.methodHelp command
+        5. optionally cache results (see cornetto.cache), keyed by method,
+           arguments and the time the database was loaded, so a reload
+           never serves stale results
            
     Note that this proxy class should be not used by other Python programs,
     which should call methods from the Cornet class directly. 
@@ -58,14 +75,35 @@ class CornetProxy(object):
     _allowed_formats = ("spec", "xml", None)
     
     
-    def __init__(self, cdb_lu, cdb_sy, verbose=False, max_depth=None,
-                 cornet_class=Cornet):
-        self._cornet = cornet_class()
+    def __init__(self, cdb_lu=None, cdb_sy=None, verbose=False, max_depth=None,
+                 cornet_class=Cornet, cornet=None, cache=None, loaded_at=None,
+                 form_folding=None):
+        # an already opened instance of (a subclass of) Cornet can be passed
+        # through the cornet keyword instead of the database files;
+        # results are cached in cache (a cornetto.cache.SharedCache) if given,
+        # where loaded_at identifies the database, so processes serving the
+        # same database file can share entries; form_folding only applies
+        # to a new instance
+        if cornet is None:
+            cornet = cornet_class(form_folding=form_folding)
+            cornet.open(cdb_lu, cdb_sy, verbose)
         # use separate call to set max depth, 
         # because None is not a valid default value
         # FIXME: crappy solution
-        if max_depth is not None: self._cornet.set_max_depth(max_depth)
-        self._cornet.open(cdb_lu, cdb_sy, verbose)
+        if max_depth is not None: cornet.set_max_depth(max_depth)
+        # the instance can be replaced by _swap while serving
+        self._generation = _Generation(cornet, loaded_at)
+        self._swap_lock = Lock()
+        self._local = local()
+        self._cache = cache
+
+
+    @property
+    def _cornet(self):
+        # the instance a call in progress in this thread started with,
+        # or else the current instance
+        generation = getattr(self._local, "generation", None)
+        return (generation or self._generation).cornet
         
 
     def help(self, method=None):
@@ -119,6 +157,21 @@ class CornetProxy(object):
         return _help_formats_text
         
         
+    def db_version(self):
+        """
+        db_version() --> VERSION
+        
+        Version of the database being served
+        
+        Parameters:
+        
+            VERSION string: identifier which changes whenever the database
+                is reloaded, so clients can tell when to drop cached results
+        """
+        generation = getattr(self._local, "generation", None) or self._generation
+        return repr(generation.loaded_at)
+        
+        
     def ask(self, query, format=None):
         """
         ask(QUERY[, FORMAT]) --> ANSWER
@@ -199,6 +252,94 @@ class CornetProxy(object):
                                        self._safe_format(format)))
         
         
+    def match_lex_units(self, spec, limit=0, format=None):
+        """
+        match_lex_units(SPEC[, LIMIT, FORMAT]) --> LUS
+
+        Get lexical units whose spelling form matches a pattern
+        
+        Parameters:       
+        
+            SPEC string: lexical unit specification with a pattern as 
+                         spelling form, where "*" matches any string, "?" any
+                         character and "[abc]" or "[!abc]" a character in or
+                         not in a set
+            LIMIT int: maximal number of lexical units (0 for no limit)
+            FORMAT string: output format ("spec" or "xml")  
+            
+            LUS array: list of lexical units, possibly empty.
+    
+        Examples (output in Python format):
+            
+            $ match_lex_units("gloei*")
+            ['gloeidraad:noun:1', 'gloeien:verb:1', 'gloeilamp:noun:1']
+            
+            $ match_lex_units("*lamp:noun:1", 3)
+            ['booglamp:noun:1', 'fotolamp:noun:1', 'gloeilamp:noun:1']
+        """
+        return self._safe_return(
+            self._cornet.match_lex_units(spec, limit or None, 
+                                         self._safe_format(format)))
+        
+        
+    def get_lex_units_fuzzy(self, spec, max_distance=2, limit=0, format=None):
+        """
+        get_lex_units_fuzzy(SPEC[, MAX_DISTANCE, LIMIT, FORMAT]) --> LUS
+
+        Get lexical units whose spelling form is within a certain edit
+        distance of the spelling form in this specification
+        
+        Parameters:       
+        
+            SPEC string: lexical unit specification
+            MAX_DISTANCE int: maximal number of inserted, deleted or 
+                              substituted characters (0, 1 or 2)
+            LIMIT int: maximal number of lexical units (0 for no limit)
+            FORMAT string: output format ("spec" or "xml")  
+            
+            LUS array: list of lexical units, possibly empty, in order of
+                       increasing edit distance
+    
+        Examples (output in Python format):
+            
+            $ get_lex_units_fuzzy("gloeilmap")
+            ['gloeilamp:noun:1']
+            
+            $ get_lex_units_fuzzy("lamb:noun", 1)
+            ['lamp:noun:3', 'lamp:noun:4', 'lamp:noun:1', 'lamp:noun:2']
+        """
+        return self._safe_return(
+            self._cornet.get_lex_units_fuzzy(spec, max_distance, limit or None,
+                                             self._safe_format(format)))
+        
+        
+    def find_multi_word_units(self, tokens, format=None):
+        """
+        find_multi_word_units(TOKENS[, FORMAT]) --> MATCHES
+
+        Find the longest multi-word units in tokenized text, from left to
+        right
+        
+        Parameters:       
+        
+            TOKENS array: words of the text
+            FORMAT string: output format ("spec" or "xml")  
+            
+            MATCHES array: list of [START, END, LUS] arrays, where START
+                           and END are the indices of the first token of a
+                           multi-word unit and of the token following it,
+                           and LUS are its lexical units
+    
+        Examples (output in Python format):
+            
+            $ find_multi_word_units(["ik", "ben", "op", "de", "hoogte"])
+            [[2, 5, ['op de hoogte:adj:1']]]
+        """
+        return self._safe_return(
+            self._cornet.find_multi_word_units(tokens, 
+                                               self._safe_format(format)))
+        
+        
     def get_related_lex_units(self, lu_spec, rel_spec, format=None):
         """
         get_related_lex_units(LU_SPEC, REL_SPEC[, FORMAT]) --> RESULT
@@ -278,7 +419,8 @@ class CornetProxy(object):
                           
         Remarks:
             
-            The result may not be the only shortest path.
+            The result may not be the only shortest path; see
+            get_shortest_path_dag and get_k_shortest_paths.
             
         Examples (output in Python format):
             
@@ -296,6 +438,74 @@ class CornetProxy(object):
                                                  rel_spec,
                                                  to_lu_spec,
                                                  self._safe_format(format)))
+    
+    
+    def get_shortest_path_dag(self, from_lu_spec, rel_spec, to_lu_spec, 
+                              format=None):
+        """
+        get_shortest_path_dag(FROM_LU_SPEC, REL_SPEC, TO_LU_SPEC[, FORMAT]) --> DAG
+        
+        Get all shortest paths between certain lexical units along certain
+        relation(s)
+        
+        Parameters:       
+        
+            FROM_LU_SPEC string: lexical unit specification of the source(s)
+            REL_SPEC string: relation(s) specification
+            TO_LU_SPEC string: lexical unit specification of the target(s)
+            FORMAT string: output format ("spec" or "xml")       
+            
+            DAG struct: maps every lexical unit on a shortest path from any 
+                        of the source lexical units to any of the target
+                        lexical units to a list of [LU, RELATION] arrays of
+                        its predecessors on these paths; empty if there is
+                        no path
+            
+        Examples (output in Python format):
+            
+            $ get_shortest_path_dag("lamp", "HAS_HYPONYM2", "fotolamp")
+            {'fotolamp:noun:1': [['gloeilamp:noun:1', 'HAS_HYPONYM']],
+             'gloeilamp:noun:1': [['lamp:noun:2', 'HAS_HYPONYM']],
+             'lamp:noun:2': []}
+        """
+        return self._safe_return(
+            self._cornet.get_shortest_path_dag(from_lu_spec,
+                                               rel_spec,
+                                               to_lu_spec,
+                                               self._safe_format(format)))
+    
+    
+    def get_k_shortest_paths(self, from_lu_spec, rel_spec, to_lu_spec, k=10,
+                             format=None):
+        """
+        get_k_shortest_paths(FROM_LU_SPEC, REL_SPEC, TO_LU_SPEC[, K, FORMAT]) --> PATHS
+        
+        Get the K shortest paths without cycles between certain lexical
+        units along certain relation(s)
+        
+        Parameters:       
+        
+            FROM_LU_SPEC string: lexical unit specification of the source(s)
+            REL_SPEC string: relation(s) specification
+            TO_LU_SPEC string: lexical unit specification of the target(s)
+            K int: maximal number of paths (default is 10)
+            FORMAT string: output format ("spec" or "xml")       
+            
+            PATHS array: list of paths as returned by test_lex_units_relation,
+                         in order of length, possibly empty
+            
+        Examples (output in Python format):
+            
+            $ get_k_shortest_paths("lamp", "HAS_HYPONYM+", "fotolamp", 2)
+            [['lamp:noun:2', 'HAS_HYPONYM', 'gloeilamp:noun:1', 'HAS_HYPONYM', 'fotolamp:noun:1'],
+             ['lamp:noun:1', 'HAS_HYPONYM', 'gloeilamp:noun:1', 'HAS_HYPONYM', 'fotolamp:noun:1']]
+        """
+        return self._safe_return(
+            self._cornet.get_k_shortest_paths(from_lu_spec,
+                                              rel_spec,
+                                              to_lu_spec,
+                                              k,
+                                              self._safe_format(format)))
             
     
     def get_synsets(self, spec, format=None):
@@ -368,9 +578,9 @@ class CornetProxy(object):
              'HAS_MERO_PART': [['slangekop:noun:1', 'slangenkop:noun:1']]}
         """
         return self._safe_return(
-            self._cornet.get_related_lex_units(lu_spec,
-                                               rel_name,
-                                               self._safe_format(format)))
+            self._cornet.get_related_synsets(lu_spec,
+                                             rel_name,
+                                             self._safe_format(format)))
         
   
     def get_lex_unit_by_id(self, c_lu_id, format=None):
@@ -454,7 +664,7 @@ class CornetProxy(object):
                  'mensenkind:noun:1',
                  'mens:noun:1',
                  'sterveling:noun:1',
-                 'homo sapiens:noun:1'],
+                 '"homo sapiens":noun:1'],
              5: ['zoogdier:noun:1'],
              7: ['dier:noun:1', 'gedierte:noun:2', 'beest:noun:1'],
              9: ['organisme:noun:2'],
@@ -507,12 +717,80 @@ class CornetProxy(object):
     
         
     # private methods
+
+    def _dispatch(self, method, params):
+        """
+        called by SimpleXMLRPCDispatcher for every call; keeps the call on
+        the same Cornet instance, even if another one is swapped in
+        """
+        try:
+            func = resolve_dotted_attribute(self, method, False)
+        except AttributeError:
+            raise Exception('method "%s" is not supported' % method)
+
+        with self._swap_lock:
+            generation = self._generation
+            generation.enter()
+
+        self._local.generation = generation
+
+        try:
+            if self._cache is None:
+                return func(*params)
+            else:
+                return self._cached_call(generation, func, method, params)
+        finally:
+            self._local.generation = None
+            generation.leave()
+
+
+    def _cached_call(self, generation, func, method, params):
+        # results depend on whether the transport handles None as well;
+        # unlike pickles, the repr of equal arguments is the same in every
+        # process
+        key = repr((generation.loaded_at, method, tuple(params),
+                    getattr(native_none, "value", False)))
+        value = self._cache.get(key)
+
+        if value is not None:
+            return loads(decompress(value))
+
+        result = func(*params)
+        # results of searches are large but very repetitive
+        self._cache.put(key, compress(dumps(result, HIGHEST_PROTOCOL), 1))
+        return result
+
+
+    def _listMethods(self):
+        # SimpleXMLRPCDispatcher does not look into instances with a
+        # _dispatch method for introspection, so tell it what is public
+        return list_public_methods(self)
+
+
+    def _methodHelp(self, method):
+        return getdoc(resolve_dotted_attribute(self, method, False))
+
+
+    def _swap(self, cornet):
+        """
+        make cornet the instance for all new calls and return the
+        generation of the previous instance, which may still have calls
+        in progress
+        """
+        with self._swap_lock:
+            old, self._generation = self._generation, _Generation(cornet)
+
+        return old
+
         
     def _safe_return(self, value):
         """
         translates None return values, which XML-RPC cannot handle, to False
+        (unless the call came in through a transport which can handle None)
         """
-        if value is None:
+        if getattr(native_none, "value", False):
+            return value
+        elif value is None:
             return False
         elif type(value) is type([]):
             return [self._safe_return(e) 
@@ -565,8 +843,423 @@ class CornetProxy(object):
     
 
 
+class _Generation(object):
+    """
+    A Cornet instance together with the number of calls in progress on it
+    """
+
+    def __init__(self, cornet, loaded_at=None):
+        self.cornet = cornet
+        self.loaded_at = loaded_at or time()
+        self.in_flight = 0
+        self._idle = Condition(Lock())
+
+
+    def enter(self):
+        with self._idle:
+            self.in_flight += 1
+
+
+    def leave(self):
+        with self._idle:
+            self.in_flight -= 1
+
+            if not self.in_flight:
+                self._idle.notify_all()
+
+
+    def drain(self, timeout=None):
+        """
+        wait until no calls are in progress; returns False on timeout
+        """
+        if timeout is not None:
+            deadline = time() + timeout
+
+        with self._idle:
+            while self.in_flight:
+                if timeout is None:
+                    self._idle.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        return False
+                    self._idle.wait(remaining)
+
+        return True
+
+
+
+class Reloader(object):
+    """
+    Reloads the database of a proxy without interrupting service
+
+    The new Cornet (or SimCornet) instance is read in a background thread
+    while the old one keeps answering calls. Then the new instance is
+    swapped into the proxy for all new calls, listeners are notified (e.g.
+    to clear caches), and the calls still in progress on the old instance
+    are allowed to finish, after which it is released.
+    """
+
+    def __init__(self, proxy, load, drain_timeout=300):
+        """
+        @param proxy: proxy to reload
+        @type proxy: CornetProxy
+        @param load: function without arguments which returns a new,
+            opened instance of (a subclass of) Cornet
+        @keyword drain_timeout: maximal number of seconds to wait for calls
+            in progress on the old instance
+        """
+        self.proxy = proxy
+        self.drain_timeout = drain_timeout
+        self._load = load
+        self._lock = Lock()
+        self._listeners = []
+        self.state = "serving"
+        self.reloads = 0
+        self.error = None
+
+
+    def add_listener(self, listener):
+        """
+        Add a function which is called with the new instance right after
+        every swap
+        """
+        self._listeners.append(listener)
+
+
+    def reload(self):
+        """
+        reload() --> STARTED
+
+        Reload the database in the background without interrupting service.
+
+        Parameters:
+
+            STARTED boolean: False if a reload is already in progress
+
+        Remarks:
+
+            See reload_status() for the progress of the reload.
+        """
+        with self._lock:
+            if self.state != "serving":
+                return False
+            self.state = "loading"
+
+        thread = Thread(target=self._reload, name="cornetto-reload")
+        thread.daemon = True
+        thread.start()
+        return True
+
+
+    def status(self):
+        """
+        reload_status() --> STATUS
+
+        Status of reloading the database
+
+        Parameters:
+
+            STATUS struct: "state" ("serving", "loading" or "draining"),
+                "reloads" (number of successful reloads), "loaded_at" (time
+                the current database was loaded, in seconds since the
+                epoch) and "error" (error of the last reload, or "")
+        """
+        return dict(state=self.state,
+                    reloads=self.reloads,
+                    loaded_at=self.proxy._generation.loaded_at,
+                    error=self.error or "")
+
+
+    def _reload(self):
+        print >>stderr, "Reloading Cornetto database..."
+
+        try:
+            old_cornet = self.proxy._generation.cornet
+            cornet = self._load()
+
+            # keep query logging and statistics going
+            hook = get_hook(old_cornet)
+            if hook is not None: cornet.set_hook(hook)
+
+            self.state = "draining"
+            old = self.proxy._swap(cornet)
+
+            for listener in self._listeners:
+                listener(cornet)
+
+            if not old.drain(self.drain_timeout):
+                print >>stderr, ( "Gave up waiting for %d calls on the old "
+                                  "database" % old.in_flight )
+        except Exception as inst:
+            self.error = "%s: %s" % (inst.__class__.__name__, inst)
+            print >>stderr, "Reload failed:", self.error
+        else:
+            self.reloads += 1
+            self.error = None
+            print >>stderr, "Reloaded Cornetto database"
+        finally:
+            with self._lock:
+                self.state = "serving"
+
+
+
+class CornetRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Request handler which, apart from XML-RPC requests by POST, accepts
+    JSON-RPC requests (see cornetto.wire) and answers GET requests for
+    metrics in Prometheus format and for a health check
+    """
+
+    metrics_path = "/metrics"
+    health_path = "/health"
+
+
+    def do_POST(self):
+        # admission control identifies clients by IP address
+        self.server.client.address = self.client_address[0]
+        codec = get_codec(self.path)
+
+        if codec is None or isinstance(codec, XmlRpcCodec):
+            SimpleXMLRPCRequestHandler.do_POST(self)
+            return
+
+        try:
+            length = int(self.headers["content-length"])
+        except (KeyError, ValueError):
+            self.send_error(411)
+            return
+
+        body, encoding, timings = handle(
+            self.server, codec, self.rfile.read(length),
+            self.headers.get("content-encoding", ""),
+            self.headers.get("accept-encoding", ""))
+
+        self.send_response(200)
+        self.send_header("Content-type", codec.content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        if path == self.metrics_path:
+            body = self.server.metrics.prometheus_text()
+            content_type = "text/plain; version=0.0.4"
+        elif path == self.health_path:
+            body = "OK\n"
+            content_type = "text/plain"
+        else:
+            self.report_404()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+
+class CornetDispatcher(SimpleXMLRPCDispatcher):
+    """
+    XML-RPC dispatcher which keeps server metrics and provides the stats()
+    and health() methods
+    """
+
+    def __init__(self, encoding=None):
+        SimpleXMLRPCDispatcher.__init__(self, allow_none=False,
+                                        encoding=encoding)
+        self.metrics = ServerMetrics()
+        self.admission = None
+        # per thread: the client whose request is being handled
+        self.client = local()
+        self.register_function(self.stats)
+        self.register_function(self.health)
+
+
+    def stats(self):
+        """
+        stats() --> STATS
+
+        Return server metrics: per-method request counts, errors and latency
+        percentiles (in seconds), requests in flight, requests rejected by
+        admission control, cache hit rates, resident memory size (in
+        kibibytes) and uptime (in seconds)
+        """
+        return self.metrics.stats()
+
+
+    def health(self):
+        """
+        health() --> STATUS
+
+        Return "OK" if the server is up; cheap enough to call frequently
+        """
+        return "OK"
+
+
+    def register_reloader(self, reloader):
+        """
+        Register the reload() and reload_status() methods of a reloader
+        """
+        self.register_function(reloader.reload, "reload")
+        self.register_function(reloader.status, "reload_status")
+
+
+    def set_admission(self, admission):
+        """
+        Set the admission controller, which may refuse calls when the
+        server is busy or a client exceeds its limits, or None
+        """
+        self.admission = admission
+
+
+    def _metric_label(self, method):
+        # methods are only counted under their own name if they exist,
+        # so clients cannot create arbitrary many metrics
+        try:
+            method_names = self._method_names
+        except AttributeError:
+            # registration is complete once requests come in
+            method_names = self._method_names = frozenset(
+                self.system_listMethods())
+
+        if method in method_names:
+            return method
+        else:
+            return "unknown"
+
+
+
+class CornetServer(CornetDispatcher, SimpleXMLRPCServer):
+    """
+    XML-RPC server which records metrics on every request
+    """
+
+    def __init__(self, addr, requestHandler=CornetRequestHandler,
+                 logRequests=True, encoding=None, bind_and_activate=True):
+        SimpleXMLRPCServer.__init__(self, addr,
+                                    requestHandler=requestHandler,
+                                    logRequests=logRequests,
+                                    encoding=encoding,
+                                    bind_and_activate=bind_and_activate)
+        CornetDispatcher.__init__(self, encoding=encoding)
+
+
+    def _dispatch(self, method, params):
+        admission = self.admission
+
+        # the calls in a multicall are admitted one by one
+        if admission is None or method == "system.multicall":
+            return self._dispatch_admitted(method, params)
+
+        client = getattr(self.client, "address", None)
+
+        try:
+            ticket = admission.admit(client, [method])
+        except Rejected as inst:
+            self.metrics.request_rejected(inst.reason)
+            raise
+
+        try:
+            return self._dispatch_admitted(method, params)
+        finally:
+            admission.release(client, ticket)
+
+
+    def _dispatch_admitted(self, method, params):
+        method_label = self._metric_label(method)
+        self.metrics.request_started()
+        start = time()
+        error = True
+
+        try:
+            result = CornetDispatcher._dispatch(self, method, params)
+            error = False
+            return result
+        finally:
+            self.metrics.request_finished(method_label, time() - start, error)
+
+
+
+class ThreadPoolCornetServer(CornetServer):
+    """
+    XML-RPC server which handles requests in a fixed pool of threads
+
+    Connections wait in a bounded queue for a free thread. When the queue
+    is full, new connections are answered right away with "503 Service
+    Unavailable" instead of piling up, so an overloaded server stays
+    responsive. Unlike SocketServer.ThreadingMixIn, which starts a thread
+    for every connection, the number of threads is bounded as well.
+    """
+
+    def __init__(self, addr, threads=8, queue_size=64, **kwargs):
+        """
+        @param addr: host and port to listen on
+        @keyword threads: number of threads
+        @keyword queue_size: maximal number of connections waiting for a
+            thread
+
+        Other keyword arguments are passed on to CornetServer.
+        """
+        CornetServer.__init__(self, addr, **kwargs)
+        self.threads = threads
+        self._queue = Queue(queue_size)
+
+        for i in range(threads):
+            thread = Thread(target=self._work,
+                            name="cornetto-worker-%d" % i)
+            thread.daemon = True
+            thread.start()
+
+
+    def process_request(self, request, client_address):
+        try:
+            self._queue.put_nowait((request, client_address))
+        except Full:
+            self.metrics.request_rejected("queue_full")
+            self._shed(request)
+
+
+    def _work(self):
+        while True:
+            request, client_address = self._queue.get()
+
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+    def _shed(self, request):
+        try:
+            request.sendall("HTTP/1.0 503 Service Unavailable\r\n"
+                            "Content-Type: text/plain\r\n"
+                            "Content-Length: 12\r\n"
+                            "Retry-After: 1\r\n"
+                            "Connection: close\r\n"
+                            "\r\n"
+                            "server busy\n")
+        except Exception:
+            pass
+
+        self.shutdown_request(request)
+
+
+
 def start_server(cdb_lu, cdb_syn, host="localhost", port=5204, log=None,
-                 verbose=False, max_depth=None, similarity=False, proxy_class=None):
+                 verbose=False, max_depth=None, similarity=False, proxy_class=None,
+                 slow_log=None, slow_threshold=0.1, slow_sample=0.0,
+                 threads=0, queue_size=64, reserved=1, client_calls=None,
+                 client_rate=None, client_burst=None, cache_size=0,
+                 form_folding=None):
     """
     main function to start the Cornetto XMLRPC server
     
@@ -598,6 +1291,97 @@ def start_server(cdb_lu, cdb_syn, host="localhost", port=5204, log=None,
     @keyword proxy_class: class that serves as proxy to (a subclass of) 
         the Cornet class (e.g. CornetProxy or SimCornetProxy)
     @type proxy_class: (subclass of) CornetProxy
+
+    @keyword slow_log: file to write a log of slow queries to, as JSON lines
+        (see cornetto.instrument.SlowQueryLog)
+    @type slow_log: file or filename
+
+    @keyword slow_threshold: minimal duration in seconds of slow queries
+    @type slow_threshold: float
+
+    @keyword slow_sample: fraction of the other queries to log as well
+    @type slow_sample: float
+
+    @keyword threads: number of threads handling requests; by default
+        requests are handled one at a time
+    @type threads: int
+
+    @keyword queue_size: maximal number of connections waiting for a thread;
+        further connections are refused with "503 Service Unavailable"
+    @type queue_size: int
+
+    @keyword reserved: number of threads reserved for cheap calls, such as
+        get_lex_units; expensive calls, such as ask or similarity measures,
+        which would occupy one of these are refused with a "server busy"
+        fault (code 503). At least one thread is left for expensive calls.
+    @type reserved: int
+
+    @keyword client_calls: maximal number of calls in progress per client
+        IP address
+    @type client_calls: int
+
+    @keyword client_rate: maximal number of calls per second per client IP
+        address
+    @type client_rate: float
+
+    @keyword client_burst: maximal number of calls per client IP address in
+        a burst; by default twice the rate
+    @type client_burst: int
+
+    @keyword cache_size: size of the result cache in megabytes; by default
+        results are not cached
+    @type cache_size: int
+
+    @keyword form_folding: match spelling forms in lexical unit
+        specifications ignoring case ('case'), diacritics ('diacritics') or
+        both ('all'); see Cornet.set_form_folding
+    @type form_folding: string
+
+    @note: The database is reloaded from the same files, without
+    interrupting service, on SIGHUP or a call to reload().
+
+    @note: Calls by clients which exceed their limits are refused with a
+    "too many requests" fault (code 429); see cornetto.admission.
+    """
+    cache = create_cache(cache_size)
+    cornet = create_proxy(cdb_lu, cdb_syn, verbose, max_depth, similarity,
+                          proxy_class, slow_log, slow_threshold, slow_sample,
+                          cache, form_folding)
+
+    if threads:
+        server = ThreadPoolCornetServer((host, port), threads=threads,
+                                        queue_size=queue_size,
+                                        logRequests=log, encoding="UTF-8")
+    else:
+        server = CornetServer((host, port), logRequests=log, encoding="UTF-8")
+
+    register_functions(server, cornet)
+    reloader = create_reloader(cornet, cdb_lu, cdb_syn, verbose, max_depth,
+                               form_folding)
+    server.register_reloader(reloader)
+    register_cache(server, reloader, cache)
+    server.set_admission(create_admission(
+        max_expensive=max(1, threads - reserved) if threads else None,
+        client_calls=client_calls, client_rate=client_rate,
+        client_burst=client_burst))
+
+    if threads:
+        print >>stderr, "Listening on %s:%d (%d threads)" % (host, port, threads)
+    else:
+        print >>stderr, "Listening on %s:%d" % (host, port)
+
+    server.serve_forever()
+    
+    
+    
+
+def create_proxy(cdb_lu, cdb_syn, verbose=False, max_depth=None,
+                 similarity=False, proxy_class=None, slow_log=None,
+                 slow_threshold=0.1, slow_sample=0.0, cache=None,
+                 form_folding=None):
+    """
+    Read the Cornetto database and create a proxy to it for serving; see
+    start_server for the arguments
     """
     print >>stderr, "Reading Cornetto database - this may take a while..."
     
@@ -609,16 +1393,86 @@ def start_server(cdb_lu, cdb_syn, host="localhost", port=5204, log=None,
     else:
         proxy_class = CornetProxy
     
-    cornet = proxy_class(cdb_lu, cdb_syn, verbose, max_depth)
-    
-    server = SimpleXMLRPCServer((host, port), logRequests=log, encoding="UTF-8")
-    server.register_introspection_functions()
-    server.register_function(echo)
-    server.register_instance(cornet)
-    
-    print >>stderr, "Listening on %s:%d" % (host, port)
-    server.serve_forever()
-    
+    cornet = proxy_class(cdb_lu, cdb_syn, verbose, max_depth, cache=cache,
+                         form_folding=form_folding)
+
+    if slow_log:
+        cornet._cornet.set_hook(SlowQueryLog(slow_log, slow_threshold,
+                                             slow_sample))
+
+    return cornet
+
+
+def create_reloader(proxy, cdb_lu, cdb_syn, verbose=False, max_depth=None,
+                    form_folding=None):
+    """
+    Create a reloader which reads the database from the same files as
+    the proxy, and reloads on SIGHUP where there is such a signal (not on
+    MS Windows, where reload() can still be called through the proxy)
+    """
+    # files may have been opened already, so reopen them by name
+    cdb_lu, cdb_syn = _filename(cdb_lu), _filename(cdb_syn)
+    proxy_class = proxy.__class__
+    reloader = Reloader(
+        proxy,
+        lambda: proxy_class(cdb_lu, cdb_syn, verbose, max_depth,
+                            form_folding=form_folding)._cornet)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reloader.reload())
+
+    return reloader
+
+
+def create_cache(cache_size):
+    """
+    Create a result cache of cache_size megabytes, or return None if
+    cache_size is zero
+    """
+    if cache_size:
+        return SharedCache(cache_size * 1024 * 1024)
+
+
+def register_cache(dispatcher, reloader, cache):
+    """
+    Report the hit rate of the result cache in the metrics of a dispatcher,
+    and clear it whenever the reloader swaps in a new database
+    """
+    if cache is not None:
+        dispatcher.metrics.register_cache("results", cache.info)
+        reloader.add_listener(lambda cornet: cache.clear())
+
+
+def create_admission(max_calls=None, max_expensive=None, client_calls=None,
+                     client_rate=None, client_burst=None):
+    """
+    Create an admission controller with the given limits, or return None if
+    there are no limits; see cornetto.admission.AdmissionController
+    """
+    if ( max_calls is None and max_expensive is None and
+         client_calls is None and not client_rate ):
+        return None
+
+    return AdmissionController(max_calls=max_calls,
+                               max_expensive=max_expensive,
+                               client_calls=client_calls,
+                               client_rate=client_rate,
+                               client_burst=client_burst)
+
+
+def _filename(f):
+    return getattr(f, "name", f)
+
+
+def register_functions(dispatcher, cornet):
+    """
+    Register the functions of a proxy, plus introspection, multicall and
+    echo, with an XML-RPC dispatcher
+    """
+    dispatcher.register_introspection_functions()
+    dispatcher.register_multicall_functions()
+    dispatcher.register_function(echo)
+    dispatcher.register_instance(cornet)
     
     
 
@@ -658,6 +1512,18 @@ Examples of valid lexical unit specifications are:
    - slang::1
    - slang
 
+The spelling form of a multi-word unit is put in double quotes ('"'), e.g.:
+
+   - "homo sapiens":noun:1
+
+Function "match_lex_units" takes a pattern as spelling form, in which '*'
+matches any string, '?' any single character, and '[abc]' or '[!abc]' a
+character in or not in a set, e.g.:
+
+   - gloei*
+   - *lamp:noun
+   - l?mp::1
+
 
 *** Relation specifications ***
 
@@ -47,7 +47,7 @@ class SimCornet(Cornet):
     # Public methods
     # ------------------------------------------------------------------------------  
     
-    def open(self, cdb_lu, cdb_syn, verbose=False):
+    def open(self, cdb_lu, cdb_syn, verbose=False, engine="etree"):
         """
         Open and parse Cornetto database files with counts
         
@@ -56,12 +56,14 @@ class SimCornet(Cornet):
         @param cdb_syn: xml definition of the synsets
         @type cdb_syn: file or filename
         @keyword verbose: verbose output during parsing
+        @keyword engine: parser engine, 'etree' or 'lean' (see parse_cdb)
         """
         ( self._form2lu, 
           self._c_lu_id2lu,
           self._c_sy_id2synset, 
           self._graph,
-          self._cat2counts ) = parse_cdb_with_counts(cdb_lu, cdb_syn, verbose)
+          self._cat2counts ) = parse_cdb_with_counts(cdb_lu, cdb_syn, verbose, engine)
+        self._after_parse()
         
     
     # counts
@@ -37,10 +37,13 @@ class SimCornetProxy(CornetProxy):
     through XML-RPC. See CornetProxy
     """
     
-    def __init__(self, cdb_lu, cdb_sy, verbose=False, max_depth=None,
-                 cornet_class=SimCornet):
+    def __init__(self, cdb_lu=None, cdb_sy=None, verbose=False, max_depth=None,
+                 cornet_class=SimCornet, cornet=None, cache=None,
+                 loaded_at=None, form_folding=None):
         CornetProxy.__init__(self, cdb_lu, cdb_sy, verbose=verbose,
-                             max_depth=max_depth, cornet_class=cornet_class)
+                             max_depth=max_depth, cornet_class=cornet_class,
+                             cornet=cornet, cache=cache, loaded_at=loaded_at,
+                             form_folding=form_folding)
         
         
     def get_count(self, lu_spec, subcount=False, format=None):
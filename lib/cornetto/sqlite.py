@@ -0,0 +1,732 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+storage of the Cornetto database in an indexed SQLite file
+
+Parsing the Cornetto xml files takes a long time and the resulting tables
+and graph take a lot of memory. The function export_cdb writes the
+lexical units, synsets and relations to an SQLite database file once. The
+SqliteCornet class then answers queries directly from this file, so
+startup is practically instantaneous and memory use is bounded by the size
+of the SQLite page cache.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import sqlite3
+from collections import namedtuple
+from xml.etree.cElementTree import Element, fromstring, tostring
+
+from cornetto.cornet import Cornet, _glob_affixes
+from cornetto.parse import parse_cdb
+
+
+# increment whenever the database layout changes
+_schema_version = 1
+
+_schema = """
+CREATE TABLE lex_unit (
+    c_lu_id TEXT PRIMARY KEY,
+    form TEXT NOT NULL,
+    cat TEXT NOT NULL,
+    sense TEXT NOT NULL,
+    xml TEXT NOT NULL
+);
+
+CREATE INDEX lex_unit_form ON lex_unit (form);
+
+CREATE TABLE synset (
+    c_sy_id TEXT PRIMARY KEY,
+    xml TEXT NOT NULL
+);
+
+-- maps both c_sy_id and d_synset_id to c_sy_id
+CREATE TABLE synset_alias (
+    sy_id TEXT PRIMARY KEY,
+    c_sy_id TEXT NOT NULL
+);
+
+CREATE TABLE member (
+    c_sy_id TEXT NOT NULL,
+    c_lu_id TEXT NOT NULL
+);
+
+CREATE INDEX member_synset ON member (c_sy_id, c_lu_id);
+CREATE INDEX member_lex_unit ON member (c_lu_id, c_sy_id);
+
+CREATE TABLE synset_relation (
+    from_sy_id TEXT NOT NULL,
+    relation TEXT NOT NULL,
+    to_sy_id TEXT NOT NULL
+);
+
+CREATE INDEX synset_relation_from ON synset_relation (from_sy_id, relation, to_sy_id);
+
+-- edges of the graph between lexical units
+CREATE TABLE relation (
+    from_lu_id TEXT NOT NULL,
+    relation TEXT NOT NULL,
+    to_lu_id TEXT NOT NULL
+);
+
+CREATE INDEX relation_from ON relation (from_lu_id, relation, to_lu_id);
+CREATE INDEX relation_to ON relation (to_lu_id, relation, from_lu_id);
+"""
+
+
+#-------------------------------------------------------------------------------
+# export
+#-------------------------------------------------------------------------------
+
+def export_cdb(cdb_lu, cdb_syn, db_file, verbose=False):
+    """
+    Parse the xml files which define the Cornetto database and write
+    the result to an SQLite database file
+
+    @param cdb_lu: xml definition of the lexical units
+    @type cdb_lu: file or filename
+
+    @param cdb_syn: xml definition of the synsets
+    @type cdb_syn: file or filename
+
+    @param db_file: name of SQLite database file, which must not exist yet
+    @type db_file: string
+
+    @keyword verbose: verbose output during parsing
+    @type verbose: bool
+    """
+    form2lu, c_lu_id2lu, sy_id2synset, graph = parse_cdb(cdb_lu, cdb_syn,
+                                                         verbose)
+    db = sqlite3.connect(db_file)
+
+    try:
+        db.executescript(_schema)
+        _export_lex_units(db, form2lu, c_lu_id2lu)
+        _export_synsets(db, sy_id2synset, c_lu_id2lu)
+        _export_relations(db, graph)
+        db.execute("PRAGMA user_version = %d" % _schema_version)
+        db.commit()
+        # compact and gather statistics for the query planner
+        db.execute("ANALYZE")
+        db.execute("VACUUM")
+    finally:
+        db.close()
+
+
+def _export_lex_units(db, form2lu, c_lu_id2lu):
+    # Insert lexical units per form in document order, so that lookup by
+    # form, which is ordered by rowid, returns them in the same order as
+    # Cornet does.
+    exported = set()
+    rows = []
+
+    for lus in form2lu.values():
+        for lu in lus:
+            rows.append(_lex_unit_row(lu))
+            exported.add(lu.get("c_lu_id"))
+
+    # lexical units without form
+    for c_lu_id, lu in c_lu_id2lu.items():
+        if c_lu_id not in exported:
+            rows.append(_lex_unit_row(lu))
+
+    db.executemany("INSERT INTO lex_unit VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def _lex_unit_row(lu):
+    form_el = lu.find("form")
+
+    if form_el is None:
+        form, cat = "", ""
+    else:
+        form = form_el.get("form-spelling", "")
+        cat = form_el.get("form-cat", "")
+
+    return ( lu.get("c_lu_id"),
+             form,
+             cat,
+             lu.get("c_seq_nr", ""),
+             tostring(lu) )
+
+
+def _export_synsets(db, sy_id2synset, c_lu_id2lu):
+    synset_rows = []
+    alias_rows = []
+    member_rows = []
+    relation_rows = []
+
+    # a synset may appear twice in sy_id2synset (see parse._parse_cdb_syn)
+    for sy_id, synset in sy_id2synset.items():
+        c_sy_id = synset.get("c_sy_id")
+        alias_rows.append((sy_id, c_sy_id))
+
+        if sy_id != c_sy_id:
+            continue
+
+        synset_rows.append((c_sy_id, tostring(synset)))
+        # REMOVE-ME: cdb is still buggy and sometimes targets the same lu
+        # multiple times
+        seen_lu_ids = set()
+
+        for syn in synset.find("synonyms") or []:
+            c_lu_id = syn.get("c_lu_id")
+
+            if c_lu_id in c_lu_id2lu and c_lu_id not in seen_lu_ids:
+                member_rows.append((c_sy_id, c_lu_id))
+                seen_lu_ids.add(c_lu_id)
+
+        for rel in synset.find("wn_internal_relations") or []:
+            # target can identify another synset by c_sy_id or d_synset_id
+            try:
+                to_sy_id = sy_id2synset[rel.get("target")].get("c_sy_id")
+            except KeyError:
+                continue
+
+            relation_rows.append((c_sy_id, rel.get("relation_name"), to_sy_id))
+
+    db.executemany("INSERT INTO synset VALUES (?, ?)", synset_rows)
+    db.executemany("INSERT INTO synset_alias VALUES (?, ?)", alias_rows)
+    db.executemany("INSERT INTO member VALUES (?, ?)", member_rows)
+    db.executemany("INSERT INTO synset_relation VALUES (?, ?, ?)", relation_rows)
+
+
+def _export_relations(db, graph):
+    rows = ( (from_lu.get("c_lu_id"), edge["relation"], to_lu.get("c_lu_id"))
+             for from_lu, to_lu, edge in graph.edges_iter(data=True) )
+    db.executemany("INSERT INTO relation VALUES (?, ?, ?)", rows)
+
+
+#-------------------------------------------------------------------------------
+# SqliteCornet
+#-------------------------------------------------------------------------------
+
+# Internally, a lexical unit is represented by a tuple which holds just
+# the information needed for search and formatting. In contrast to Elements,
+# tuples compare by value, so the same lexical unit read twice from the
+# database is still the same node during search.
+LexUnit = namedtuple("LexUnit", "c_lu_id form cat sense")
+
+
+_lex_unit_columns = "lu.c_lu_id, lu.form, lu.cat, lu.sense"
+
+_select_lex_units_by_form = (
+    "SELECT " + _lex_unit_columns + " FROM lex_unit lu "
+    "WHERE lu.form = ? ORDER BY lu.rowid")
+
+_select_lex_units_by_glob = (
+    "SELECT " + _lex_unit_columns + " FROM lex_unit lu "
+    "WHERE lu.form GLOB ? ORDER BY lu.form, lu.rowid")
+
+# SQLite does not use the index on form for a GLOB with a parameter, so
+# patterns with a literal prefix are restricted to a range of forms
+_select_lex_units_by_prefix_glob = (
+    "SELECT " + _lex_unit_columns + " FROM lex_unit lu "
+    "WHERE lu.form >= ? AND lu.form < ? AND lu.form GLOB ? "
+    "ORDER BY lu.form, lu.rowid")
+
+_select_forms = "SELECT DISTINCT form FROM lex_unit WHERE form != ''"
+
+_select_lex_unit_by_id = (
+    "SELECT " + _lex_unit_columns + " FROM lex_unit lu "
+    "WHERE lu.c_lu_id = ?")
+
+_select_lex_unit_xml = "SELECT xml FROM lex_unit WHERE c_lu_id = ?"
+
+_select_out_edges = (
+    "SELECT r.relation, " + _lex_unit_columns + " FROM relation r "
+    "JOIN lex_unit lu ON lu.c_lu_id = r.to_lu_id "
+    "WHERE r.from_lu_id = ?")
+
+_select_out_edges_by_relation = _select_out_edges + " AND r.relation = ?"
+
+_select_in_edges = (
+    "SELECT r.relation, " + _lex_unit_columns + " FROM relation r "
+    "JOIN lex_unit lu ON lu.c_lu_id = r.from_lu_id "
+    "WHERE r.to_lu_id = ?")
+
+_select_in_edges_by_relation = _select_in_edges + " AND r.relation = ?"
+
+_select_degree_stats = (
+    "SELECT relation, COUNT(*), COUNT(DISTINCT from_lu_id), "
+    "COUNT(DISTINCT to_lu_id) FROM relation GROUP BY relation")
+
+_select_total_degree_stats = (
+    "SELECT NULL, COUNT(*), COUNT(DISTINCT from_lu_id), "
+    "COUNT(DISTINCT to_lu_id) FROM relation")
+
+# only touches the covering index on relation
+_select_successor_ids = (
+    "SELECT to_lu_id FROM relation "
+    "WHERE from_lu_id = ? AND relation = ?")
+
+_select_synset_ids = (
+    "SELECT c_sy_id FROM member WHERE c_lu_id = ? ORDER BY rowid")
+
+_select_synset_id_by_alias = "SELECT c_sy_id FROM synset_alias WHERE sy_id = ?"
+
+_select_synset_xml = "SELECT xml FROM synset WHERE c_sy_id = ?"
+
+_select_synset_members = (
+    "SELECT " + _lex_unit_columns + " FROM member m "
+    "JOIN lex_unit lu ON lu.c_lu_id = m.c_lu_id "
+    "WHERE m.c_sy_id = ? ORDER BY m.rowid")
+
+_select_synset_member_by_form = (
+    "SELECT " + _lex_unit_columns + " FROM member m "
+    "JOIN lex_unit lu ON lu.c_lu_id = m.c_lu_id "
+    "WHERE m.c_sy_id = ? AND lu.form = ? ORDER BY m.rowid LIMIT 1")
+
+_select_related_synsets = (
+    "SELECT relation, to_sy_id FROM synset_relation "
+    "WHERE from_sy_id = ?")
+
+_select_related_synsets_by_relation = _select_related_synsets + " AND relation = ?"
+
+
+class SqliteCornet(Cornet):
+    """
+    A Cornet class which answers queries from a SQLite database file
+    produced by export_cdb instead of from the parsed xml files.
+
+    All queries are answered by means of prepared statements against the
+    indexed tables, so nothing but the SQLite page cache is held in memory.
+    The public interface is identical to that of the Cornet class, except
+    that lexical units and synsets in 'raw' format are Element instances
+    created from the stored xml.
+
+    @note: A database connection must not be shared between processes, so
+    open the database after forking.
+    """
+
+    # page cache size in kibibytes
+    _default_cache_size = 16384
+    # size of memory-mapped part of the database file in bytes
+    _default_mmap_size = 0
+
+
+    def __init__(self, db_file=None,
+                 output_format=Cornet._default_output_format,
+                 max_depth=Cornet._default_max_depth,
+                 form_folding=None,
+                 cache_size=_default_cache_size,
+                 mmap_size=_default_mmap_size):
+        """
+        Create a new SqliteCornet instance
+
+        @keyword db_file: SQLite database file produced by export_cdb
+        @keyword output_format: default output format
+        @type output_format: string ('spec', 'xml', 'raw')
+        @keyword max_depth: a maximal depth between 1 and 9
+        @type max_depth: int
+        @keyword form_folding: form folding (see L{Cornet.set_form_folding})
+        @type form_folding: None, 'case', 'diacritics' or 'all'
+        @keyword cache_size: size of the SQLite page cache in kibibytes
+        @type cache_size: int
+        @keyword mmap_size: number of bytes of the database file to access
+            through memory-mapped I/O
+        @type mmap_size: int
+        """
+        Cornet.__init__(self, output_format=output_format, max_depth=max_depth,
+                        form_folding=form_folding)
+
+        if db_file:
+            self.open(db_file, cache_size, mmap_size)
+
+
+    def open(self, db_file, cache_size=_default_cache_size,
+             mmap_size=_default_mmap_size):
+        """
+        Open Cornetto database file
+
+        @param db_file: SQLite database file produced by export_cdb
+        @type db_file: string
+        @keyword cache_size: size of the SQLite page cache in kibibytes
+        @type cache_size: int
+        @keyword mmap_size: number of bytes of the database file to access
+            through memory-mapped I/O
+        @type mmap_size: int
+
+        @note: Pages read through memory-mapped I/O are shared between all
+        processes which have the same database file open, instead of being
+        copied into the page cache of each connection.
+        """
+        db = sqlite3.connect(db_file)
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+
+        if version != _schema_version:
+            db.close()
+            raise ValueError("%s is not a Cornetto database with schema "
+                             "version %d" % (db_file, _schema_version))
+
+        # str for ascii values and unicode otherwise,
+        # just like ElementTree attributes
+        db.text_factory = sqlite3.OptimizedUnicode
+        # negative value means size in kibibytes instead of pages
+        db.execute("PRAGMA cache_size = %d" % -cache_size)
+        db.execute("PRAGMA mmap_size = %d" % mmap_size)
+        # never write to a database which may be shared
+        db.execute("PRAGMA query_only = ON")
+        self._db = db
+        # one edge dict per relation, like the edge data in the graph
+        self._edges = {}
+        self._fuzzy_index = None
+        self._degree_stats = None
+        self._index_folded_forms()
+        # built on first use, so opening takes no time
+        self._phrases = None
+
+
+    def close(self):
+        """
+        Close Cornetto database file
+        """
+        self._db.close()
+
+
+    def get_synsets(self, spec, format=None):
+        """
+        Get all synsets containing lexical units which satisfy a certain
+        specification. See L{Cornet.get_synsets}
+        """
+        formatter = self._get_synset_formatter(format)
+
+        return [ formatter(c_sy_id)
+                 for lu in self._get_lex_units(spec)
+                 for c_sy_id in self._get_lu_synset_ids(lu) ]
+
+
+    def get_related_synsets(self, lu_spec, rel_name=None, format=None):
+        """
+        For all synsets containing lexical units satisfying this specification
+        find the related synsets along this relation. See
+        L{Cornet.get_related_synsets}
+        """
+        if rel_name:
+            rel_name = rel_name.upper()
+
+        syn_formatter = self._get_synset_formatter(format)
+        rel_formatter = self._get_synset_relation_formatter(format)
+        related_syns = {}
+
+        for lu in self._get_lex_units(lu_spec):
+            for from_sy_id in self._get_lu_synset_ids(lu):
+                if rel_name:
+                    rows = self._db.execute(_select_related_synsets_by_relation,
+                                            (from_sy_id, rel_name))
+                else:
+                    rows = self._db.execute(_select_related_synsets,
+                                            (from_sy_id,))
+
+                for relation, to_sy_id in rows:
+                    # like the <relation> elements of a synset
+                    rel_repr = rel_formatter(Element("relation",
+                                                     relation_name=relation,
+                                                     target=to_sy_id))
+                    related_syns.setdefault(rel_repr, []).append(
+                        syn_formatter(to_sy_id))
+
+        return related_syns
+
+
+    def get_lex_unit_by_id(self, c_lu_id, format=None):
+        """
+        Get lexical unit by id. See L{Cornet.get_lex_unit_by_id}
+        """
+        row = self._db.execute(_select_lex_unit_by_id, (c_lu_id,)).fetchone()
+
+        if row:
+            return self._get_lex_unit_formatter(format)(LexUnit(*row))
+
+
+    def get_synset_by_id(self, c_sy_id, format=None):
+        """
+        Get synset by id. See L{Cornet.get_synset_by_id}
+        """
+        row = self._db.execute(_select_synset_id_by_alias, (c_sy_id,)).fetchone()
+
+        if row:
+            return self._get_synset_formatter(format)(row[0])
+
+
+    def get_lex_unit_from_synset(self, c_sy_id, lemma, format=None):
+        """
+        Get a lexical unit based on a synset ID and a lemma. See
+        L{Cornet.get_lex_unit_from_synset}
+        """
+        row = self._db.execute(_select_synset_id_by_alias, (c_sy_id,)).fetchone()
+
+        if row:
+            row = self._db.execute(_select_synset_member_by_form,
+                                   (row[0], lemma)).fetchone()
+        if row:
+            return self._get_lex_unit_formatter(format)(LexUnit(*row))
+
+
+    def get_lex_units_from_synsets(self, pairs, format=None):
+        """
+        Get lexical units based on synset IDs and lemmas. See
+        L{Cornet.get_lex_units_from_synsets}
+        """
+        return [ self.get_lex_unit_from_synset(c_sy_id, lemma, format)
+                 for c_sy_id, lemma in pairs ]
+
+
+    # ------------------------------------------------------------------------------
+    # Semi-private methods
+    # ------------------------------------------------------------------------------
+
+    # lookup
+
+    def _match_lex_units(self, spec, limit=None):
+        if self._fold:
+            # match against the index of folded forms, like Cornet
+            return Cornet._match_lex_units(self, spec, limit)
+
+        pattern, cat, sense = self._split_unit_spec(spec)
+        prefix, suffix = _glob_affixes(pattern)
+        # SQLite negates a set of characters by "[^...]" instead of "[!...]"
+        pattern = pattern.replace("[!", "[^")
+        lus = []
+
+        if prefix:
+            # the first form after all those starting with prefix
+            end = prefix[:-1] + unichr(ord(prefix[-1]) + 1)
+            rows = self._db.execute(_select_lex_units_by_prefix_glob,
+                                    (prefix, end, pattern))
+        else:
+            rows = self._db.execute(_select_lex_units_by_glob, (pattern,))
+
+        rows = map(LexUnit._make, rows)
+
+        if len(suffix) > len(prefix):
+            # in the order of the reversed forms, like Cornet, which looks
+            # them up in its index of reversed forms (the sort is stable)
+            rows.sort(key=lambda lu: lu.form[::-1])
+
+        for lu in rows:
+            if self._lu_has_cat(lu, cat) and self._lu_has_sense(lu, sense):
+                if limit is not None and len(lus) >= limit:
+                    break
+
+                lus.append(lu)
+
+        return lus
+
+
+    def _get_forms(self):
+        return [ row[0] for row in self._db.execute(_select_forms) ]
+
+
+    def _get_lex_units_with_form(self, form):
+        return map(LexUnit._make,
+                   self._db.execute(_select_lex_units_by_form, (form,)))
+
+
+    def _get_lu_synset_ids(self, lu):
+        return [ row[0]
+                 for row in self._db.execute(_select_synset_ids, (lu.c_lu_id,)) ]
+
+
+    # graph access
+
+    def _out_edges(self, lus, rel_name=None):
+        if isinstance(lus, LexUnit):
+            lus = (lus,)
+
+        for from_lu in lus:
+            if rel_name:
+                rows = self._db.execute(_select_out_edges_by_relation,
+                                        (from_lu.c_lu_id, rel_name))
+            else:
+                rows = self._db.execute(_select_out_edges, (from_lu.c_lu_id,))
+
+            for row in rows:
+                yield from_lu, LexUnit._make(row[1:]), self._get_edge(row[0])
+
+
+    def _in_edges(self, lus, rel_name=None):
+        if isinstance(lus, LexUnit):
+            lus = (lus,)
+
+        for to_lu in lus:
+            if rel_name:
+                rows = self._db.execute(_select_in_edges_by_relation,
+                                        (to_lu.c_lu_id, rel_name))
+            else:
+                rows = self._db.execute(_select_in_edges, (to_lu.c_lu_id,))
+
+            for row in rows:
+                yield LexUnit._make(row[1:]), to_lu, self._get_edge(row[0])
+
+
+    def _compute_degree_stats(self):
+        stats = {}
+
+        for query in _select_degree_stats, _select_total_degree_stats:
+            for name, edge_count, from_count, to_count in self._db.execute(query):
+                if edge_count:
+                    stats[name] = (edge_count / float(from_count),
+                                   edge_count / float(to_count))
+
+        return stats
+
+
+    def _get_edge(self, relation):
+        try:
+            return self._edges[relation]
+        except KeyError:
+            edge = self._edges[relation] = dict(relation=relation)
+            return edge
+
+
+    # search
+
+    def _transitive_closure(self, lus, rel_name):
+        """
+        Computes the transitive closure of a set of lexical units
+        over a certain relation. Returns a dict with successors as keys
+        and their distance (in edges) to the orginal lexical units.
+
+        Search only touches the covering index on relations; lexical units
+        are read once the closure is complete.
+        """
+        assert isinstance(lus, list), repr(lus) + " is not a list"
+        if not rel_name:
+            # no covering index for this case
+            return Cornet._transitive_closure(self, lus, rel_name)
+
+        queue = [ lu.c_lu_id for lu in lus ]
+        lu_ids = set(queue)
+        next_queue = []
+        distance = 0
+        successors = {}
+
+        while queue:
+            for from_lu_id in queue:
+                for to_lu_id, in self._db.execute(_select_successor_ids,
+                                                  (from_lu_id, rel_name)):
+                    if to_lu_id not in successors:
+                        successors[to_lu_id] = distance + 1
+
+                        if to_lu_id not in lu_ids:
+                            next_queue.append(to_lu_id)
+
+            queue, next_queue = next_queue, []
+            distance += 1
+
+        return dict( (LexUnit._make(self._db.execute(_select_lex_unit_by_id,
+                                                     (lu_id,)).fetchone()),
+                      distance)
+                     for lu_id, distance in successors.items() )
+
+
+    # lexical unit formatting
+
+    def _get_lex_unit_formatter(self, format=None):
+        if not format: format = self._output_format
+
+        if format == "spec":
+            return self._lu_to_spec
+        elif format == "xml":
+            return self._lu_to_xml
+        elif format == "raw":
+            return self._lu_to_element
+        else:
+            raise ValueError("unknown output format: " + format)
+
+
+    def _lu_to_xml(self, lu):
+        return self._db.execute(_select_lex_unit_xml,
+                                (lu.c_lu_id,)).fetchone()[0]
+
+
+    def _lu_to_element(self, lu):
+        return fromstring(self._lu_to_xml(lu))
+
+
+    # relation formatting
+
+    def _get_relation_formatter(self, format=None):
+        if not format: format = self._output_format
+
+        if format == "xml":
+            return self._rel_to_xml
+        else:
+            return Cornet._get_relation_formatter(self, format)
+
+
+    # synset formatting
+
+    def _get_synset_formatter(self, format=None):
+        if not format: format = self._output_format
+
+        if format == "spec":
+            return self._synset_to_specs
+        elif format == "xml":
+            return self._synset_to_xml
+        elif format == "raw":
+            return self._synset_to_element
+        else:
+            raise ValueError("unknown output format: " + format)
+
+
+    def _synset_to_specs(self, c_sy_id):
+        return [ self._lu_to_spec(LexUnit._make(row))
+                 for row in self._db.execute(_select_synset_members,
+                                             (c_sy_id,)) ]
+
+
+    def _synset_to_xml(self, c_sy_id):
+        return self._db.execute(_select_synset_xml, (c_sy_id,)).fetchone()[0]
+
+
+    def _synset_to_element(self, c_sy_id):
+        return fromstring(self._synset_to_xml(c_sy_id))
+
+
+    # <cdb_lu> accessors
+
+    def _get_lu_id(self, lu):
+        return lu.c_lu_id
+
+
+    def _get_lu_form(self, lu):
+        return lu.form
+
+
+    def _get_lu_cat(self, lu):
+        return lu.cat
+
+
+    def _get_lu_sense(self, lu):
+        return lu.sense
+
+
+    def _lu_has_cat(self, lu, cat):
+        # value of "form-cat" can be "noun"/"NOUN"
+        return not cat or lu.cat.lower() == cat
+
+
+    def _lu_has_sense(self, lu, sense):
+        return not sense or lu.sense == sense
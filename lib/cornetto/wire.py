@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+wire formats of the Cornetto servers
+
+Apart from XML-RPC, the servers speak JSON-RPC 2.0 (POST on "/json") and,
+if the msgpack package is installed, the same protocol encoded in
+MessagePack (POST on "/msgpack"). Both support batches of calls, and
+marshal None natively, so results are not rewritten as they are for
+XML-RPC. Bodies of requests and responses may be gzip compressed.
+
+A JSON-RPC request looks like
+
+    {"jsonrpc": "2.0", "method": "ask", "params": ["lamp +"], "id": 1}
+
+and is answered by
+
+    {"jsonrpc": "2.0", "result": {...}, "id": 1}
+
+or, if the call failed, by
+
+    {"jsonrpc": "2.0", "error": {"code": -32000, "message": "..."}, "id": 1}
+
+A batch is an array of requests, answered by an array of responses.
+Requests without an "id" are notifications, which get no response.
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import xmlrpclib
+
+from sys import exc_info
+from threading import local
+from time import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# responses smaller than this are not compressed
+gzip_threshold = 1400
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+SERVER_ERROR = -32000
+
+# per thread: whether the current call is marshalled by a codec which
+# handles None, in which case CornetProxy leaves results alone
+native_none = local()
+
+
+
+class Call(object):
+    """
+    A single decoded method call
+    """
+
+    def __init__(self, method, params, id=None, notification=False):
+        self.method = method
+        self.params = params
+        self.id = id
+        self.notification = notification
+
+
+
+class XmlRpcCodec(object):
+    """
+    XML-RPC, including system.multicall for batches
+    """
+
+    content_type = "text/xml"
+    allow_none = False
+
+
+    def decode(self, body):
+        """
+        Decode a request body into a list of calls and a flag which says
+        whether it was a batch; raises WireError if the body is invalid
+        """
+        try:
+            params, method = xmlrpclib.loads(body)
+        except Exception:
+            raise WireError(1, "%s:%s" % exc_info()[:2])
+
+        return [Call(method, params)], False
+
+
+    def encode(self, responses, batch):
+        """
+        Encode a list of responses, each a tuple of a call, a result and a
+        fault (code and message), of which either result or fault is None
+        """
+        call, result, fault = responses[0]
+
+        if fault:
+            return xmlrpclib.dumps(xmlrpclib.Fault(*fault), encoding="UTF-8")
+        else:
+            return xmlrpclib.dumps((result,), methodresponse=1,
+                                   encoding="UTF-8")
+
+
+    def encode_error(self, code, message):
+        """
+        Encode an error which prevented decoding of the request
+        """
+        return xmlrpclib.dumps(xmlrpclib.Fault(code, message), encoding="UTF-8")
+
+
+
+class JsonRpcCodec(object):
+    """
+    JSON-RPC 2.0, including batches
+    """
+
+    content_type = "application/json"
+    allow_none = True
+
+
+    def decode(self, body):
+        try:
+            request = self.loads(body)
+        except Exception:
+            raise WireError(PARSE_ERROR, "parse error: %s" % exc_info()[1])
+
+        if isinstance(request, list):
+            if not request:
+                raise WireError(INVALID_REQUEST, "empty batch")
+            return [ self._decode_call(r) for r in request ], True
+        else:
+            return [self._decode_call(request)], False
+
+
+    def _decode_call(self, request):
+        if not isinstance(request, dict):
+            raise WireError(INVALID_REQUEST, "request is not an object")
+
+        method = request.get("method")
+
+        if not isinstance(method, basestring):
+            raise WireError(INVALID_REQUEST, "method is not a string")
+
+        params = request.get("params", [])
+
+        if not isinstance(params, list):
+            # named parameters are not supported by XML-RPC style methods
+            raise WireError(INVALID_REQUEST, "params is not an array")
+
+        return Call(method, params, request.get("id"),
+                    notification="id" not in request)
+
+
+    def encode(self, responses, batch):
+        encoded = []
+
+        for call, result, fault in responses:
+            if call.notification:
+                continue
+
+            if fault:
+                encoded.append(dict(jsonrpc="2.0",
+                                    error=dict(code=fault[0],
+                                               message=fault[1]),
+                                    id=call.id))
+            else:
+                encoded.append(dict(jsonrpc="2.0", result=result, id=call.id))
+
+        if batch:
+            return self.dumps(encoded)
+        elif encoded:
+            return self.dumps(encoded[0])
+        else:
+            return ""
+
+
+    def encode_error(self, code, message):
+        return self.dumps(dict(jsonrpc="2.0",
+                               error=dict(code=code, message=message),
+                               id=None))
+
+
+    def loads(self, body):
+        return json.loads(body)
+
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+
+
+class MsgpackCodec(JsonRpcCodec):
+    """
+    JSON-RPC 2.0 encoded in MessagePack
+    """
+
+    content_type = "application/x-msgpack"
+
+
+    def loads(self, body):
+        return msgpack.unpackb(body, raw=False)
+
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+
+
+class WireError(Exception):
+    """
+    Error in decoding a request
+    """
+
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+
+
+
+def get_codec(path):
+    """
+    Return the codec for requests posted on a path, or None
+    """
+    if path in ("/", "/RPC2"):
+        return XmlRpcCodec()
+    elif path == "/json":
+        return JsonRpcCodec()
+    elif path == "/msgpack" and msgpack is not None:
+        return MsgpackCodec()
+
+
+def execute(dispatcher, codec, calls, batch):
+    """
+    Execute decoded calls and encode the responses
+
+    @param dispatcher: dispatcher with registered functions
+    @type dispatcher: SimpleXMLRPCDispatcher
+    @param codec: codec for encoding responses
+    @param calls: list of Call instances
+    @param batch: whether the calls came in a batch
+
+    @return: encoded responses, and a list of tuples of method, duration
+        and error flag for each call
+    """
+    responses = []
+    timings = []
+
+    for call in calls:
+        start = time()
+        native_none.value = codec.allow_none
+
+        try:
+            result = dispatcher._dispatch(call.method, call.params)
+        except Exception:
+            responses.append((call, None, _fault(codec, dispatcher, call)))
+            timings.append((call.method, time() - start, True))
+        else:
+            responses.append((call, result, None))
+            timings.append((call.method, time() - start, False))
+        finally:
+            native_none.value = False
+
+    try:
+        return codec.encode(responses, batch), timings
+    except Exception:
+        # e.g. values which cannot be marshalled
+        return codec.encode_error(*_fault(codec, dispatcher)), timings
+
+
+def handle(dispatcher, codec, body, content_encoding="", accept_encoding=""):
+    """
+    Decode a request body, execute the calls and encode the responses
+
+    @return: response body, its content encoding (or None), and a list of
+        tuples of method, duration and error flag for each call
+    """
+    try:
+        calls, batch = codec.decode(decompress(body, content_encoding))
+    except WireError as inst:
+        response, timings = codec.encode_error(inst.code, inst.message), []
+    else:
+        response, timings = execute(dispatcher, codec, calls, batch)
+
+    return compress(response, accept_encoding) + (timings,)
+
+
+def _fault(codec, dispatcher, call=None):
+    """
+    fault code and message for the current exception,
+    as in SimpleXMLRPCDispatcher
+    """
+    exc_type, exc_value = exc_info()[:2]
+
+    if isinstance(exc_value, xmlrpclib.Fault):
+        return exc_value.faultCode, exc_value.faultString
+
+    message = "%s:%s" % (exc_type, exc_value)
+
+    if not codec.allow_none:
+        return 1, message
+    elif call and call.method not in dispatcher.system_listMethods():
+        return METHOD_NOT_FOUND, message
+    else:
+        return SERVER_ERROR, message
+
+
+def compress(body, accept_encoding):
+    """
+    gzip compress a response body if the client accepts it and it is large
+    enough; returns the body and its content encoding (or None)
+    """
+    if ( len(body) > gzip_threshold and
+         "gzip" in [ e.split(";")[0].strip().lower()
+                     for e in accept_encoding.split(",") ] ):
+        return xmlrpclib.gzip_encode(body), "gzip"
+    else:
+        return body, None
+
+
+def decompress(body, content_encoding):
+    """
+    decompress a request body according to its content encoding
+    """
+    content_encoding = content_encoding.lower()
+
+    if content_encoding in ("", "identity"):
+        return body
+    elif content_encoding == "gzip":
+        try:
+            return xmlrpclib.gzip_decode(body)
+        except ValueError:
+            raise WireError(PARSE_ERROR, "invalid gzip data")
+    else:
+        raise WireError(INVALID_REQUEST,
+                        "unsupported content encoding: %s" % content_encoding)
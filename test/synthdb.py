@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+synthetic Cornetto database shared by the tests
+
+The tests do not need the licensed Cornetto files: they run on a small
+database generated by benchmarks/synthetic.py, to which a few multi-word,
+non-ascii and punctuated lexical units are added. Run them from the top
+directory with
+
+    python -m unittest discover -s test
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import atexit
+import shutil
+import sys
+import tempfile
+
+from os.path import abspath, dirname, join
+
+
+_top_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(_top_dir, "benchmarks"))
+sys.path.insert(0, join(_top_dir, "lib"))
+
+from synthetic import SyntheticCornetto
+
+from cornetto.cornet import Cornet
+from cornetto.sqlite import SqliteCornet, export_cdb
+
+
+# (c_lu_id, form, cat, sense) tuples of lexical units added to the synthetic
+# ones, each in a synset of its own; forms are utf-8 encoded
+extra_lex_units = [
+    ("l_x0", "homo sapiens", "noun", "1"),
+    ("l_x1", "op de hoogte", "adj", "1"),
+    ("l_x2", "op de", "adv", "1"),
+    ("l_x3", "Homo Erectus", "noun", "1"),
+    ("l_x4", "caf\xc3\xa9", "noun", "1"),
+    ("l_x5", "caf\xc3\xa9tje", "noun", "1"),
+    ("l_x6", "e-mail", "noun", "1"),
+    ("l_x7", "en/of", "adv", "1"),
+]
+
+# the synthetic database, generated on first use
+_synth = None
+_files = None
+
+
+
+def get_synthetic():
+    """
+    Get the synthetic database (a SyntheticCornetto instance)
+    """
+    global _synth
+
+    if _synth is None:
+        _synth = SyntheticCornetto(forms=300, seed=1)
+        hypernym_sy_id = _synth.synsets[0][0]
+
+        for c_lu_id, form, cat, sense in extra_lex_units:
+            c_sy_id = "d_x-" + c_lu_id
+            _synth.lex_units.append((c_lu_id, form, cat, sense))
+            _synth.synsets.append((c_sy_id, [c_lu_id]))
+            _synth.relations.append((c_sy_id, "HAS_HYPERONYM", hypernym_sy_id))
+            _synth.relations.append((hypernym_sy_id, "HAS_HYPONYM", c_sy_id))
+
+    return _synth
+
+
+def get_files():
+    """
+    Get the names of the cdb_lu and cdb_syn xml files and of the SQLite
+    export of the synthetic database, which are written on first use
+    """
+    global _files
+
+    if _files is None:
+        tmp_dir = tempfile.mkdtemp(prefix="cornetto-test-")
+        atexit.register(shutil.rmtree, tmp_dir, True)
+        cdb_lu = join(tmp_dir, "cdb_lu.xml")
+        cdb_syn = join(tmp_dir, "cdb_syn.xml")
+        db_file = join(tmp_dir, "cdb.db")
+        get_synthetic().write(cdb_lu, cdb_syn)
+        export_cdb(cdb_lu, cdb_syn, db_file)
+        _files = cdb_lu, cdb_syn, db_file
+
+    return _files
+
+
+def open_cornet(**kwargs):
+    """
+    Open the synthetic database as a Cornet instance
+    """
+    cdb_lu, cdb_syn, db_file = get_files()
+    return Cornet(cdb_lu, cdb_syn, **kwargs)
+
+
+def open_sqlite_cornet(**kwargs):
+    """
+    Open the SQLite export of the synthetic database as a SqliteCornet
+    instance
+    """
+    cdb_lu, cdb_syn, db_file = get_files()
+    return SqliteCornet(db_file, **kwargs)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of admission control, and of the threaded server which applies it
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+import xmlrpclib
+
+from threading import Thread
+
+from synthdb import open_cornet
+
+from cornetto.admission import AdmissionController, Rejected, SERVER_BUSY, \
+     TOO_MANY_REQUESTS, TokenBucket
+from cornetto.server import CornetProxy, ThreadPoolCornetServer, \
+     create_admission, register_functions
+
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(2, 3)
+        now = bucket.last
+        self.assertEqual([ bucket.take(now) for i in range(4) ],
+                         [True, True, True, False])
+
+
+    def test_refill(self):
+        bucket = TokenBucket(2, 3)
+        now = bucket.last
+
+        while bucket.take(now):
+            pass
+
+        # two tokens per second
+        self.assertFalse(bucket.take(now + 0.25))
+        self.assertTrue(bucket.take(now + 0.5))
+        self.assertFalse(bucket.take(now + 0.5))
+        self.assertFalse(bucket.full(now + 1.5))
+        # no more than the burst size
+        self.assertTrue(bucket.full(now + 100))
+        self.assertEqual([ bucket.take(now + 100) for i in range(4) ],
+                         [True, True, True, False])
+
+
+
+class AdmissionControllerTest(unittest.TestCase):
+
+    def assertRejected(self, admission, client, methods, code, reason):
+        try:
+            admission.admit(client, methods)
+        except Rejected as inst:
+            self.assertEqual((inst.faultCode, inst.reason), (code, reason))
+        else:
+            self.fail("admitted %r" % methods)
+
+
+    def test_reserved_for_cheap_calls(self):
+        admission = AdmissionController(max_calls=3, max_expensive=1)
+        ticket = admission.admit("a", ["ask"])
+        # the other slots are reserved for cheap calls
+        self.assertRejected(admission, "b", ["get_k_shortest_paths"],
+                            SERVER_BUSY, "busy")
+        # a batch is expensive if any of its calls is
+        self.assertRejected(admission, "b", ["get_lex_units", "lin_sim"],
+                            SERVER_BUSY, "busy")
+        cheap_tickets = [ admission.admit("b", ["get_lex_units"]),
+                          admission.admit("c", ["help", "echo"]) ]
+        self.assertRejected(admission, "d", ["echo"], SERVER_BUSY, "busy")
+
+        for client, cheap_ticket in zip("bc", cheap_tickets):
+            admission.release(client, cheap_ticket)
+
+        admission.release("a", ticket)
+        self.assertEqual((admission.calls, admission.expensive), (0, 0))
+        admission.admit("b", ["ask"])
+
+
+    def test_client_calls(self):
+        admission = AdmissionController(client_calls=2)
+        tickets = [ admission.admit("a", ["ask"]) for i in range(2) ]
+        self.assertRejected(admission, "a", ["echo"], TOO_MANY_REQUESTS,
+                            "client_busy")
+        # other clients are not affected
+        admission.admit("b", ["ask"])
+        admission.release("a", tickets[0])
+        admission.admit("a", ["ask"])
+
+
+    def test_client_rate(self):
+        admission = AdmissionController(client_rate=0.001)
+        # the burst is at least one call
+        self.assertEqual(admission.client_burst, 1)
+        admission.release("a", admission.admit("a", ["echo"]))
+        self.assertRejected(admission, "a", ["echo"], TOO_MANY_REQUESTS,
+                            "rate")
+        admission.admit("b", ["echo"])
+
+
+
+class ThreadPoolServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadPoolCornetServer(("127.0.0.1", 0), threads=2,
+                                            logRequests=False,
+                                            encoding="UTF-8")
+        register_functions(cls.server, CornetProxy(cornet=open_cornet()))
+        cls.server.set_admission(create_admission(max_expensive=1,
+                                                  client_rate=0.001,
+                                                  client_burst=3))
+        thread = Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.url = "http://127.0.0.1:%d" % cls.server.server_address[1]
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def test_round_trip(self):
+        proxy = xmlrpclib.ServerProxy(self.url)
+        cornet_proxy = CornetProxy(cornet=open_cornet())
+        self.assertEqual(proxy.get_lex_units("homo"),
+                         cornet_proxy.get_lex_units("homo"))
+        self.assertEqual(proxy.ask('"homo sapiens" HAS_HYPERONYM'),
+                         cornet_proxy.ask('"homo sapiens" HAS_HYPERONYM'))
+        self.assertEqual(proxy.echo(u"caf\xe9"), u"caf\xe9")
+
+        # the burst is used up
+        try:
+            proxy.echo(1)
+        except xmlrpclib.Fault as inst:
+            self.assertEqual(inst.faultCode, TOO_MANY_REQUESTS)
+        else:
+            self.fail("rate limit not applied")
+
+        self.assertEqual(self.server.metrics.stats()["rejected"], {"rate": 1})
+
+
+
+if __name__ == "__main__":
+    unittest.main()
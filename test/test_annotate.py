@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the annotation of text, in particular with multi-word units
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+
+from synthdb import get_synthetic, open_cornet, open_sqlite_cornet
+
+from cornetto.annotate import Annotator, Match, annotate_parallel
+
+
+
+class AnnotatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.annotators = [ Annotator(open_cornet()),
+                           Annotator(open_sqlite_cornet()) ]
+        cls.folding_annotator = Annotator(open_cornet(), "case")
+        # (start, end, c_lu_ids) of some matches in tokens
+        cls.tokens = u"zie op de hoogte en homo sapiens".split()
+        cls.op_de = Match(1, 3, ("l_x2",))
+        cls.op_de_hoogte = Match(1, 4, ("l_x1",))
+        cls.homo_sapiens = Match(5, 7, ("l_x0",))
+
+
+    def annotate(self, method, *args):
+        """
+        Call method on all annotators, check that the results are the same,
+        and return the result
+        """
+        results = [ list(getattr(annotator, method)(*args))
+                    for annotator in self.annotators ]
+
+        for result in results[1:]:
+            self.assertEqual(result, results[0], "%s%r" % (method, args))
+
+        return results[0]
+
+
+    def test_annotate_tokens(self):
+        matches = self.annotate("annotate_tokens", self.tokens)
+
+        for match in self.op_de, self.op_de_hoogte, self.homo_sapiens:
+            self.assertTrue(match in matches, match)
+
+        self.assertEqual(matches, sorted(matches))
+
+
+    def test_annotate_tokens_longest(self):
+        matches = self.annotate("annotate_tokens", self.tokens, True)
+
+        for match in self.op_de_hoogte, self.homo_sapiens:
+            self.assertTrue(match in matches, match)
+
+        self.assertFalse(self.op_de in matches)
+
+        # no overlap
+        for match, next_match in zip(matches, matches[1:]):
+            self.assertTrue(match.end <= next_match.start)
+
+
+    def test_single_words(self):
+        synth = get_synthetic()
+        tokens = [ form.decode("utf-8") for c_lu_id, form, cat, sense
+                   in synth.lex_units[:50] ]
+
+        for start, end, c_lu_ids in self.annotate("annotate_tokens", tokens):
+            self.assertEqual(end, start + 1)
+            self.assertTrue(synth.lex_units[start][0] in c_lu_ids)
+
+
+    def test_form_folding(self):
+        tokens = u"homo erectus".split()
+        self.assertEqual(self.annotate("annotate_tokens", tokens, True), [])
+        self.assertEqual(list(self.folding_annotator.annotate_tokens(tokens)),
+                         [Match(0, 2, ("l_x3",))])
+
+
+    def test_annotate_text(self):
+        text = u"Zij is op de  hoogte van de e-mail, en/of het caf\xe9tje."
+        found = [ (text[start:end], c_lu_ids) for start, end, c_lu_ids
+                  in self.annotate("annotate_text", text, True) ]
+
+        for match in [ (u"op de  hoogte", ("l_x1",)),
+                       (u"e-mail", ("l_x6",)),
+                       (u"en/of", ("l_x7",)),
+                       (u"caf\xe9tje", ("l_x5",)) ]:
+            self.assertTrue(match in found, match)
+
+
+    def test_annotate_parallel(self):
+        texts = [ u" ".join(self.tokens[i:]) for i in range(len(self.tokens)) ]
+        annotator = self.annotators[0]
+        self.assertEqual(list(annotate_parallel(annotator, texts, workers=2,
+                                                chunk_size=2)),
+                         [ list(annotator.annotate_text(text))
+                           for text in texts ])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the asynchronous server over the loopback interface
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import asyncore
+import httplib
+import json
+import os
+import socket
+import unittest
+import xmlrpclib
+
+from threading import Thread
+
+from synthdb import open_cornet
+
+from cornetto.asyncserver import AsyncCornetServer
+from cornetto.client import CornetClient
+from cornetto.server import CornetDispatcher, CornetProxy, register_functions
+
+
+
+class AsyncServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.proxy = CornetProxy(cornet=open_cornet())
+        dispatcher = CornetDispatcher(encoding="UTF-8")
+        register_functions(dispatcher, cls.proxy)
+        cls.server = AsyncCornetServer(dispatcher, "127.0.0.1", 0, workers=2)
+        cls.port = cls.server.socket.getsockname()[1]
+        cls.thread = Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        # closing all channels in the event loop ends it
+        cls.server.trigger.pull(asyncore.close_all)
+        cls.thread.join()
+        os.close(cls.server.trigger._writer)
+
+
+    def test_round_trip(self):
+        spec = '"homo sapiens":noun:1 HAS_HYPERONYM'
+
+        for protocol in "json", "xmlrpc":
+            with CornetClient("127.0.0.1", self.port,
+                              protocol=protocol) as client:
+                self.assertEqual(client.get_lex_units("homo sapiens"),
+                                 self.proxy.get_lex_units("homo sapiens"))
+                self.assertEqual(client.ask(spec, format="xml"),
+                                 self.proxy.ask(spec, "xml"))
+                results = client.batch([ ("get_lex_units", ("homo",)),
+                                         ("no_such_method", ()) ])
+                self.assertEqual(results[0],
+                                 self.proxy.get_lex_units("homo"))
+                self.assertTrue(isinstance(results[1], xmlrpclib.Fault))
+                # answered by the event loop itself
+                self.assertEqual(client.call("health"), "OK")
+
+
+    def test_keep_alive(self):
+        connection = httplib.HTTPConnection("127.0.0.1", self.port)
+        connection.request("GET", "/health")
+        self.assertEqual(connection.getresponse().read(), "OK\n")
+        sock = connection.sock
+
+        for i in range(2):
+            connection.request("POST", "/json", json.dumps(
+                dict(jsonrpc="2.0", method="echo", params=[i], id=i)))
+            response = connection.getresponse()
+            self.assertEqual(response.getheader("connection"), "keep-alive")
+            self.assertEqual(json.loads(response.read())["result"], i)
+
+        # all on the same connection
+        self.assertTrue(connection.sock is sock)
+        connection.close()
+
+
+    def test_pipelined(self):
+        requests = []
+
+        for i in range(3):
+            body = json.dumps(dict(jsonrpc="2.0", method="get_lex_units",
+                                   params=["homo"], id=i))
+            requests.append("POST /json HTTP/1.1\r\n"
+                            "Content-Length: %d\r\n\r\n%s" % (len(body), body))
+
+        sock = socket.create_connection(("127.0.0.1", self.port))
+        # the last request closes the connection, so its end can be read
+        sock.sendall("".join(requests[:-1]) +
+                     requests[-1].replace("\r\n", "\r\nConnection: close\r\n",
+                                          1))
+        data = []
+
+        while True:
+            chunk = sock.recv(8192)
+
+            if not chunk:
+                break
+
+            data.append(chunk)
+
+        sock.close()
+        bodies = [ part.split("\r\n\r\n", 1)[1]
+                   for part in "".join(data).split("HTTP/1.1 ")[1:] ]
+        # answered in order
+        self.assertEqual([ json.loads(body)["id"] for body in bodies ],
+                         [0, 1, 2])
+        self.assertEqual(json.loads(bodies[0])["result"],
+                         self.proxy.get_lex_units("homo"))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
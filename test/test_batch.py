@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the cornetto-batch.py script, which answers queries in chunks in a
+pool of worker processes
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from os.path import abspath, dirname, join
+
+from synthdb import get_files, get_synthetic, open_cornet
+
+
+_top_dir = dirname(dirname(abspath(__file__)))
+_script = join(_top_dir, "bin", "cornetto-batch.py")
+
+
+
+class BatchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cornet = open_cornet()
+        synth = get_synthetic()
+        cls.forms = sorted(set( lu[1].decode("utf-8")
+                                for lu in synth.lex_units ))
+        # the extra lexical units are hyponyms of the first synset
+        c_lu_id = synth.synsets[0][1][0]
+        cls.hypernym = [ form.decode("utf-8")
+                         for lu_id, form, cat, sense in synth.lex_units
+                         if lu_id == c_lu_id ][0]
+
+
+    def batch(self, lines, *options):
+        """
+        Run the script on lines, in chunks of two queries for two workers,
+        and return the results of its JSON lines output
+        """
+        cdb_lu, cdb_syn, db_file = get_files()
+        env = dict(os.environ, PYTHONPATH=join(_top_dir, "lib"))
+        process = subprocess.Popen([sys.executable, _script, "-w", "2",
+                                    "-c", "2", "-f", "jsonl"] +
+                                   list(options) + [cdb_lu, cdb_syn],
+                                   stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, env=env)
+        out, err = process.communicate(
+            u"".join( line + u"\n" for line in lines ).encode("utf-8"))
+        self.assertEqual(process.returncode, 0, err)
+        return [ json.loads(line) for line in out.splitlines() ]
+
+
+    def test_ask(self):
+        # more queries than fit in the chunks pending at once
+        queries = [ form + u" HAS_HYPERONYM" for form in self.forms[:15] ]
+        records = self.batch(queries)
+        self.assertEqual([ record["query"] for record in records ],
+                         [ [query] for query in queries ])
+        self.assertEqual([ record["result"] for record in records ],
+                         [ _json(self.cornet.ask(query))
+                           for query in queries ])
+
+
+    def test_blank_lines(self):
+        lines = [u"", self.forms[0], u"  ", u"", self.forms[1], u""]
+        records = self.batch(lines, "-M", "get_lex_units")
+        # one result per line
+        self.assertEqual(len(records), len(lines))
+
+        for line, record in zip(lines, records):
+            if line.strip():
+                self.assertEqual(record["result"],
+                                 _json(self.cornet.get_lex_units(line)))
+            else:
+                self.assertEqual(record, dict(query=[], result=None))
+
+
+    def test_numeric_arguments(self):
+        args = [u"homo sapiens", u"HAS_HYPERONYM", self.hypernym]
+        records = self.batch([ u"\t".join(args + [k]) for k in u"1", u"" ],
+                             "-M", "get_k_shortest_paths")
+        self.assertEqual(records[0]["result"],
+                         _json(self.cornet.get_k_shortest_paths(*args, k=1)))
+        # empty argument for the default
+        self.assertEqual(records[1]["result"],
+                         _json(self.cornet.get_k_shortest_paths(*args)))
+
+        records = self.batch([u"homo sapins\t0", u"homo sapins\t1\t0",
+                              u"homo sapins\tone"],
+                             "-M", "get_lex_units_fuzzy")
+        self.assertEqual([ record["result"] for record in records[:2] ],
+                         [[], []])
+        self.assertEqual(self.batch([u"homo sapins\t1"],
+                                    "-M", "get_lex_units_fuzzy")[0]["result"],
+                         ['"homo sapiens":noun:1'])
+        self.assertTrue("ValueError" in records[2]["error"])
+
+
+
+def _json(result):
+    # as decoded from the output
+    return json.loads(json.dumps(result))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
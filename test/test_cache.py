@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the result cache shared by forked processes
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import os
+import unittest
+
+from synthdb import open_cornet
+
+from cornetto.cache import SharedCache, _header, _slot_header
+from cornetto.server import CornetProxy
+
+
+
+class SharedCacheTest(unittest.TestCase):
+
+    def test_classes(self):
+        cache = SharedCache(size=_header.size + 2 * 100000,
+                            slot_sizes=(4096, 512), ways=4)
+        # every class gets an equal share, in sets of ways slots
+        self.assertEqual(cache._classes,
+                         [ (512, 48, _header.size),
+                           (4096, 6, _header.size + 48 * 4 * 512) ])
+        self.assertEqual(cache.max_entry_size, 4096 - _slot_header.size)
+        self.assertEqual(len(cache._memory),
+                         _header.size + 48 * 4 * 512 + 6 * 4 * 4096)
+        # at least one set per class
+        self.assertEqual([ sets for slot_size, sets, offset
+                           in SharedCache(size=0)._classes ],
+                         [1, 1, 1, 1])
+
+
+    def test_smallest_class(self):
+        cache = SharedCache(size=1024 * 1024, slot_sizes=(512, 4096), ways=2)
+        small, large = "s" * 100, "l" * 1000
+        self.assertTrue(cache.put("small", small))
+        self.assertTrue(cache.put("large", large))
+        self.assertEqual(self.classes(cache, "small"), [512])
+        self.assertEqual(self.classes(cache, "large"), [4096])
+        # a new value of another size replaces the old one
+        self.assertTrue(cache.put("small", large))
+        self.assertEqual(self.classes(cache, "small"), [4096])
+        self.assertEqual(cache.get("small"), large)
+        # too large for any slot
+        self.assertFalse(cache.put("huge", "h" * cache.max_entry_size))
+        self.assertEqual(cache.get("huge"), None)
+
+
+    def classes(self, cache, key):
+        """
+        slot sizes of the classes with an entry for key
+        """
+        tag, sets = cache._locate(key)
+        return [ slot_size for slot_size, first in sets
+                 if cache._find(first, slot_size, tag, key) is not None ]
+
+
+    def test_lru(self):
+        # a single set of two slots
+        cache = SharedCache(size=_header.size + 2 * 512, slot_sizes=(512,),
+                            ways=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        self.assertEqual(cache.get("a"), "1")
+        cache.put("c", "3")
+        # b was least recently used
+        self.assertEqual([ cache.get(key) for key in "abc" ], ["1", None, "3"])
+        cache.put("d", "4")
+        self.assertEqual([ cache.get(key) for key in "acd" ], [None, "3", "4"])
+
+
+    def test_info_and_clear(self):
+        cache = SharedCache(size=1024 * 1024)
+        cache.put("a", "1")
+        cache.get("a")
+        cache.get("b")
+        self.assertEqual(cache.info(), (1, 1))
+        cache.clear()
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.info(), (1, 2))
+
+
+    def test_shared(self):
+        cache = SharedCache(size=1024 * 1024)
+        pid = os.fork()
+
+        if not pid:
+            # child
+            try:
+                cache.put("child", "value")
+            finally:
+                os._exit(0)
+
+        os.waitpid(pid, 0)
+        self.assertEqual(cache.get("child"), "value")
+
+
+
+class CachedProxyTest(unittest.TestCase):
+
+    def test_cached_calls(self):
+        cache = SharedCache(size=1024 * 1024)
+        proxy = CornetProxy(cornet=open_cornet(), cache=cache)
+        expected = CornetProxy(cornet=open_cornet()).get_lex_units("homo")
+
+        for i in range(3):
+            self.assertEqual(proxy._dispatch("get_lex_units", ("homo",)),
+                             expected)
+
+        self.assertEqual(cache.info(), (2, 1))
+        # keyed by arguments
+        proxy._dispatch("get_lex_units", ("sapiens",))
+        self.assertEqual(cache.info(), (2, 2))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the client, against a scripted server and a real one
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import shutil
+import tempfile
+import unittest
+import xmlrpclib
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from os.path import join
+from threading import Thread
+
+from synthdb import open_cornet
+
+from cornetto.admission import SERVER_BUSY, TOO_MANY_REQUESTS
+from cornetto.client import CornetClient
+from cornetto.server import CornetProxy, CornetServer, register_functions
+
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(
+            int(self.headers["content-length"])))
+        self.server.requests.append(request)
+        status, response = self.server.respond(request)
+        body = "" if response is None else json.dumps(response)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, *args):
+        pass
+
+
+
+class ScriptedServer(HTTPServer):
+    """
+    JSON-RPC server which answers db_version() with its version and other
+    calls with their method and parameters, unless the next request is to
+    be answered by a scripted function
+    """
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), _Handler)
+        self.version = "1"
+        self.requests = []
+        # functions taking the server and a request and returning an HTTP
+        # status and a response object
+        self.script = []
+        # started and shut down for every test, so poll often
+        thread = Thread(target=self.serve_forever, args=(0.01,))
+        thread.daemon = True
+        thread.start()
+
+
+    def respond(self, request):
+        if self.script:
+            return self.script.pop(0)(self, request)
+
+        return 200, _responses(request, lambda call: None, self.answer)
+
+
+    def answer(self, call):
+        if call["method"] == "db_version":
+            return self.version
+
+        return [call["method"]] + call["params"]
+
+
+    def methods(self):
+        """
+        Return the methods called in every request so far
+        """
+        return [ [ call["method"] for call in _calls(request) ]
+                 for request in self.requests ]
+
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _calls(request):
+    return request if isinstance(request, list) else [request]
+
+
+def _responses(request, fault, result):
+    """
+    Return responses to the calls in a request, with an error if fault
+    returns a code for a call, and otherwise the result
+    """
+    responses = []
+
+    for call in _calls(request):
+        code = fault(call)
+
+        if code is None:
+            responses.append(dict(jsonrpc="2.0", result=result(call),
+                                  id=call["id"]))
+        else:
+            responses.append(dict(jsonrpc="2.0", id=call["id"],
+                                  error=dict(code=code, message="refused")))
+
+    if isinstance(request, list):
+        return responses
+
+    return responses[0]
+
+
+def _status(status):
+    """
+    script function answering with an HTTP error status
+    """
+    return lambda server, request: (status, None)
+
+
+def _fault(code, method=None):
+    """
+    script function answering calls of method, or all calls, with a fault
+    """
+    return lambda server, request: (200, _responses(
+        request,
+        lambda call: code if method in (None, call["method"]) else None,
+        server.answer))
+
+
+
+class RetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ScriptedServer()
+        self.client = CornetClient("127.0.0.1", self.server.server_address[1],
+                                   retries=2, backoff=0.0)
+
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+
+    def test_no_retry(self):
+        self.assertEqual(self.client.call("echo", "a"), ["echo", "a"])
+        self.assertEqual(len(self.server.requests), 1)
+
+
+    def test_retry_status(self):
+        self.server.script = [_status(502), _status(504)]
+        self.assertEqual(self.client.call("echo", "a"), ["echo", "a"])
+        self.assertEqual(len(self.server.requests), 3)
+
+
+    def test_retries_exhausted(self):
+        self.server.script = [_status(503)] * 4
+
+        try:
+            self.client.call("echo", "a")
+        except xmlrpclib.ProtocolError as inst:
+            self.assertEqual(inst.errcode, 503)
+        else:
+            self.fail("no error after the last retry")
+
+        # the call and two retries
+        self.assertEqual(len(self.server.requests), 3)
+
+
+    def test_other_status(self):
+        self.server.script = [_status(500)]
+        self.assertRaises(xmlrpclib.ProtocolError, self.client.call, "echo",
+                          "a")
+        self.assertEqual(len(self.server.requests), 1)
+
+
+    def test_retry_busy(self):
+        self.server.script = [_fault(SERVER_BUSY), _fault(TOO_MANY_REQUESTS)]
+        self.assertEqual(self.client.call("echo", "a"), ["echo", "a"])
+        self.assertEqual(len(self.server.requests), 3)
+
+
+    def test_retry_refused_calls_of_batch(self):
+        self.server.script = [_fault(SERVER_BUSY, "ask")]
+        self.assertEqual(self.client.batch([ ("echo", ("a",)),
+                                             ("ask", ("b",)) ]),
+                         [["echo", "a"], ["ask", "b"]])
+        # only the refused call is sent again
+        self.assertEqual(self.server.methods(), [["echo", "ask"], ["ask"]])
+
+
+    def test_other_fault(self):
+        self.server.script = [_fault(1)]
+        self.assertRaises(xmlrpclib.Fault, self.client.call, "echo", "a")
+        self.assertEqual(len(self.server.requests), 1)
+        # failed calls in a batch are returned as faults
+        self.server.script = [_fault(1, "ask")]
+        results = self.client.batch([("echo", ("a",)), ("ask", ("b",))])
+        self.assertEqual(results[0], ["echo", "a"])
+        self.assertEqual(results[1].faultCode, 1)
+
+
+    def test_arguments(self):
+        # trailing defaults are left to the server
+        self.client.get_lex_units("a")
+        self.client.get_lex_units_fuzzy("a", max_distance=2, limit=3)
+        self.client.set_output_format("xml")
+        self.client.get_lex_units("a")
+        self.assertEqual([ request["params"] for request
+                           in self.server.requests ],
+                         [["a"], ["a", 2, 3], ["a", "xml"]])
+        self.assertRaises(TypeError, self.client.get_lex_units, "a",
+                          no_such_argument=1)
+
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ScriptedServer()
+        self.tmp_dir = tempfile.mkdtemp(prefix="cornetto-test-")
+        self.clients = []
+
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, True)
+
+
+    def client(self, **kwargs):
+        kwargs.setdefault("version_interval", 0)
+        client = CornetClient("127.0.0.1", self.server.server_address[1],
+                              backoff=0.0, **kwargs)
+        self.clients.append(client)
+        return client
+
+
+    def test_memory_cache(self):
+        client = self.client(cache_size=2, version_interval=1000)
+
+        for form in "abacb":
+            self.assertEqual(client.get_lex_units(form),
+                             ["get_lex_units", form])
+
+        # the version is checked once, and "b" was evicted by "c"
+        self.assertEqual(self.server.methods(),
+                         [["db_version"]] + [["get_lex_units"]] * 4)
+        client.clear_cache()
+        client.get_lex_units("b")
+        self.assertEqual(len(self.server.requests), 6)
+
+
+    def test_batch(self):
+        client = self.client(cache_size=10)
+        client.get_lex_units("a")
+        # the version check, and the batch
+        self.server.script = [_fault(1, "get_synsets")] * 2
+        self.assertEqual(client.batch([ ("get_lex_units", ("a",)),
+                                        ("get_synsets", ("a",)) ])[0],
+                         ["get_lex_units", "a"])
+        # only the missing results are asked for, and faults are not cached
+        self.assertEqual(self.server.methods()[-1], ["get_synsets"])
+        self.assertEqual(client.get_synsets("a"), ["get_synsets", "a"])
+
+
+    def test_new_version(self):
+        client = self.client(cache_size=10)
+        client.get_lex_units("a")
+        client.get_lex_units("a")
+        self.server.version = "2"
+        client.get_lex_units("a")
+        self.assertEqual(self.server.methods(),
+                         [["db_version"], ["get_lex_units"], ["db_version"],
+                          ["db_version"], ["get_lex_units"]])
+
+
+    def test_expired(self):
+        client = self.client(cache_size=10, cache_ttl=-1)
+        client.get_lex_units("a")
+        client.get_lex_units("a")
+        self.assertEqual(self.server.methods().count(["get_lex_units"]), 2)
+
+
+    def test_disk_cache(self):
+        cache_file = join(self.tmp_dir, "cache.db")
+        self.client(cache_file=cache_file).get_lex_units("a")
+        # another client, e.g. in another process, shares the results
+        client = self.client(cache_size=10, cache_file=cache_file)
+        self.assertEqual(client.get_lex_units("a"), ["get_lex_units", "a"])
+        self.assertEqual(self.server.methods().count(["get_lex_units"]), 1)
+        # results of other versions are removed from the file
+        self.server.version = "2"
+        self.assertEqual(client.get_lex_units("a"), ["get_lex_units", "a"])
+        self.assertEqual(self.server.methods().count(["get_lex_units"]), 2)
+        self.server.version = "1"
+        self.client(cache_file=cache_file).get_lex_units("a")
+        self.assertEqual(self.server.methods().count(["get_lex_units"]), 3)
+
+
+    def test_older_server(self):
+        # without db_version, results are cached until they expire
+        client = self.client(cache_size=10)
+        self.server.script = [_fault(-32601, "db_version")] * 3
+        client.get_lex_units("a")
+        self.assertEqual(client.get_lex_units("a"), ["get_lex_units", "a"])
+        self.assertEqual(self.server.methods().count(["get_lex_units"]), 1)
+
+
+
+class LoopbackTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = CornetServer(("127.0.0.1", 0), logRequests=False,
+                                  encoding="UTF-8")
+        cls.proxy = CornetProxy(cornet=open_cornet())
+        register_functions(cls.server, cls.proxy)
+        thread = Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def test_protocols(self):
+        spec = '"homo sapiens":noun:1'
+
+        for protocol in "json", "xmlrpc":
+            with CornetClient("127.0.0.1", self.server.server_address[1],
+                              protocol=protocol) as client:
+                self.assertEqual(client.get_lex_units("homo sapiens"),
+                                 self.proxy.get_lex_units("homo sapiens"))
+                self.assertEqual(client.ask(spec + " HAS_HYPERONYM",
+                                            format="xml"),
+                                 self.proxy.ask(spec + " HAS_HYPERONYM",
+                                                "xml"))
+                results = client.batch([ ("get_lex_units", ("homo",)),
+                                         ("no_such_method", ()) ])
+                self.assertEqual(results[0],
+                                 self.proxy.get_lex_units("homo"))
+                self.assertTrue(isinstance(results[1], xmlrpclib.Fault))
+                self.assertEqual(client.map("echo", [1, (2,)]), [1, 2])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of fuzzy lookup by edit distance
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import random
+import unittest
+
+from synthdb import get_synthetic, open_cornet, open_sqlite_cornet
+
+from cornetto.fuzzy import DeletionIndex, levenshtein
+
+
+
+class LevenshteinTest(unittest.TestCase):
+
+    def test_distance(self):
+        for s1, s2, distance in [ ("", "", 0),
+                                  ("lamp", "lamp", 0),
+                                  ("lamp", "", 4),
+                                  ("lamp", "lam", 1),
+                                  ("lamp", "lamb", 1),
+                                  ("lamp", "klamp", 1),
+                                  ("gloeilmap", "gloeilamp", 2),
+                                  ("kitten", "sitting", 3),
+                                  (u"caf\xe9", u"cafe", 1) ]:
+            self.assertEqual(levenshtein(s1, s2), distance, (s1, s2))
+            self.assertEqual(levenshtein(s2, s1), distance, (s2, s1))
+
+
+    def test_max_distance(self):
+        self.assertEqual(levenshtein("kitten", "sitting", 3), 3)
+        self.assertEqual(levenshtein("kitten", "sitting", 2), None)
+        # the difference in length alone exceeds the maximum
+        self.assertEqual(levenshtein("lamp", "gloeilamp", 4), None)
+
+
+
+class DeletionIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.forms = sorted(set( lu[1].decode("utf-8")
+                                for lu in get_synthetic().lex_units ))
+        cls.index = DeletionIndex(cls.forms)
+        cls.strings = _misspellings(cls.forms, random.Random(1))[:100]
+
+
+    def test_lookup(self):
+        for string in self.strings:
+            # by brute force
+            matches = sorted( (levenshtein(string, form), form)
+                              for form in self.forms )
+
+            for max_distance in 0, 1, 2:
+                expected = [ (distance, form) for distance, form in matches
+                             if distance <= max_distance ]
+                self.assertEqual(self.index.lookup(string, max_distance),
+                                 expected, (string, max_distance))
+
+
+    def test_max_distance(self):
+        self.assertRaises(ValueError, self.index.lookup, "lamp", 3)
+        self.assertRaises(ValueError, self.index.lookup, "lamp", -1)
+
+
+
+class FuzzyLexUnitsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cornets = [ open_cornet(), open_sqlite_cornet() ]
+        forms = sorted(set( lu[1].decode("utf-8")
+                            for lu in get_synthetic().lex_units ))
+        cls.strings = _misspellings(forms, random.Random(2))[:50]
+
+
+    def call(self, method, *args):
+        """
+        Call method on all instances, check that the results are the same,
+        and return the result
+        """
+        results = [ getattr(cornet, method)(*args) for cornet in self.cornets ]
+
+        for result in results[1:]:
+            self.assertEqual(result, results[0], "%s%r" % (method, args))
+
+        return results[0]
+
+
+    def test_get_lex_units_fuzzy(self):
+        for string in self.strings:
+            specs = self.call("get_lex_units_fuzzy", string)
+            forms = [ spec.rsplit(":", 2)[0] for spec in specs ]
+            distances = [ levenshtein(string, form) for form in forms ]
+            # in order of increasing edit distance
+            self.assertEqual(distances, sorted(distances), string)
+            self.assertTrue(all( distance <= 2 for distance in distances ))
+
+            for max_distance in 0, 1:
+                self.call("get_lex_units_fuzzy", string, max_distance)
+
+            self.call("get_lex_units_fuzzy", string + ":noun")
+            self.assertEqual(self.call("get_lex_units_fuzzy", string, 2, 1),
+                             specs[:1])
+
+
+    def test_non_ascii(self):
+        self.assertEqual(self.call("get_lex_units_fuzzy", "cafe", 1),
+                         [u"caf\xe9:noun:1"])
+        self.assertEqual(self.call("get_lex_units_fuzzy", "caf\xc3\xa9tej", 2),
+                         [u"caf\xe9tje:noun:1"])
+
+
+    def test_form_folding(self):
+        for cornet in open_cornet(form_folding="all"), \
+                      open_sqlite_cornet(form_folding="all"):
+            self.assertEqual(cornet.get_lex_units_fuzzy("HOMO ERECTUS", 0),
+                             ['"Homo Erectus":noun:1'])
+            self.assertEqual(cornet.get_lex_units_fuzzy("KAFE", 1),
+                             [u"caf\xe9:noun:1"])
+            # the distance is between folded forms
+            self.assertEqual(cornet.get_lex_units_fuzzy(u"CAF\xc9TJ", 0), [])
+            self.assertEqual(cornet.get_lex_units_fuzzy(u"CAF\xc9TJ", 1),
+                             [u"caf\xe9tje:noun:1"])
+
+
+
+def _misspellings(forms, rand):
+    """
+    Return the forms with one or two random insertions, deletions or
+    substitutions each
+    """
+    letters = u"abcdefghijklmnopqrstuvwxyz\xe9"
+    strings = []
+
+    for form in forms:
+        for _ in range(rand.randint(1, 2)):
+            i = rand.randint(0, len(form))
+            edit = rand.choice("ids")
+
+            if edit == "i":
+                form = form[:i] + rand.choice(letters) + form[i:]
+            elif edit == "d":
+                form = form[:i] + form[i + 1:]
+            else:
+                form = form[:i] + rand.choice(letters) + form[i + 1:]
+
+        strings.append(form)
+
+    return strings
+
+
+
+if __name__ == "__main__":
+    unittest.main()
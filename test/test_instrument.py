@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the instrumentation of the query pipeline
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import unittest
+
+from StringIO import StringIO
+
+from synthdb import open_cornet, open_sqlite_cornet
+
+from cornetto.instrument import Histogram, SlowQueryLog, StatsCollector, \
+     get_hook
+
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hist = Histogram([1, 2, 4, 8])
+
+        for value in 0.5, 1.5, 3, 3, 100:
+            self.hist.observe(value)
+
+
+    def test_counts(self):
+        self.assertEqual(self.hist.counts, [1, 1, 2, 0, 1])
+        self.assertEqual((self.hist.count, self.hist.sum), (5, 108))
+        self.assertEqual((self.hist.min, self.hist.max), (0.5, 100))
+        self.assertEqual(self.hist.cumulative(),
+                         [(1, 1), (2, 2), (4, 4), (8, 4), (float("inf"), 5)])
+
+
+    def test_percentile(self):
+        # upper bound of the bucket with the percentile
+        self.assertEqual(self.hist.percentile(20), 1)
+        self.assertEqual(self.hist.percentile(50), 4)
+        self.assertEqual(self.hist.percentile(80), 4)
+        # the maximum for the overflow bucket
+        self.assertEqual(self.hist.percentile(90), 100)
+        self.assertEqual(self.hist.percentile(100), 100)
+
+
+    def test_percentile_below_bound(self):
+        hist = Histogram([1, 2])
+        self.assertEqual(hist.percentile(50), None)
+        hist.observe(0.25)
+        # no larger than the maximum
+        self.assertEqual(hist.percentile(50), 0.25)
+        self.assertEqual(hist.as_dict()["mean"], 0.25)
+
+
+    def test_exponential(self):
+        self.assertEqual(Histogram.exponential(1, 2, 4).bounds, [1, 2, 4, 8])
+
+
+
+class StatsCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.collector = StatsCollector()
+        self.cornets = [ open_cornet(), open_sqlite_cornet() ]
+
+        for cornet in self.cornets:
+            cornet.set_hook(self.collector)
+
+
+    def tearDown(self):
+        self.cornets[1].close()
+
+
+    def test_calls(self):
+        for cornet in self.cornets:
+            # ask calls other query methods, which are not counted again
+            result = cornet.ask('"homo sapiens":noun:1 HAS_HYPERONYM')
+            self.assertTrue(result)
+            self.assertRaises(ValueError, cornet.get_lex_units_fuzzy,
+                              "homo", 5)
+
+        stats = self.collector.snapshot()
+        self.assertEqual(sorted(stats), ["ask", "get_lex_units_fuzzy"])
+        self.assertEqual((stats["ask"]["calls"], stats["ask"]["errors"]),
+                         (2, 0))
+        self.assertEqual(stats["get_lex_units_fuzzy"]["errors"], 2)
+
+        for stage in "parse", "lookup", "search", "format", "other":
+            self.assertEqual(stats["ask"]["stage_times"][stage]["count"], 2,
+                             stage)
+
+        self.assertTrue(stats["ask"]["edges_scanned"]["min"] > 0)
+        self.assertTrue(stats["ask"]["nodes_expanded"]["min"] > 0)
+        # the lexical unit and its relation
+        self.assertTrue(stats["ask"]["result_size"]["min"] > 1)
+
+
+    def test_reset(self):
+        self.cornets[0].get_lex_units("homo")
+        self.assertTrue(self.collector.snapshot())
+        self.collector.reset()
+        self.assertEqual(self.collector.snapshot(), {})
+
+
+    def test_remove_hook(self):
+        for cornet in self.cornets:
+            self.assertTrue(get_hook(cornet) is self.collector)
+            cornet.set_hook(None)
+            self.assertTrue(get_hook(cornet) is None)
+            self.assertFalse("get_lex_units" in cornet.__dict__)
+            cornet.get_lex_units("homo")
+
+        self.assertEqual(self.collector.snapshot(), {})
+
+
+
+class SlowQueryLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cornet = open_cornet()
+
+
+    def log(self, queries, **kwargs):
+        """
+        Ask queries with a slow query log installed, and return the records
+        in the log
+        """
+        log_file = StringIO()
+        self.cornet.set_hook(SlowQueryLog(log_file, **kwargs))
+
+        for query in queries:
+            self.cornet.ask(query)
+
+        return [ json.loads(line) for line in log_file.getvalue().splitlines() ]
+
+
+    def test_threshold(self):
+        queries = ["homo", '"homo sapiens" HAS_HYPERONYM']
+        records = self.log(queries, threshold=0.0)
+        self.assertEqual([ record["args"] for record in records ],
+                         [ [query] for query in queries ])
+
+        for record in records:
+            self.assertTrue(record["slow"])
+            self.assertEqual(record["method"], "ask")
+            self.assertEqual(record["error"], None)
+            self.assertTrue(record["duration"] >= 0.0)
+            self.assertEqual(sorted(record),
+                             ["args", "duration", "edges_scanned", "error",
+                              "kwargs", "method", "nodes_expanded",
+                              "result_size", "slow", "stage_times", "time"])
+
+        self.assertTrue(records[1]["result_size"] > 1)
+        self.assertEqual(self.log(queries, threshold=1000.0), [])
+
+
+    def test_sample(self):
+        queries = ["homo"] * 50
+        records = self.log(queries, threshold=1000.0, sample=1.0)
+        self.assertEqual(len(records), 50)
+        self.assertFalse(any( record["slow"] for record in records ))
+
+        records = self.log(queries, threshold=1000.0, sample=0.5, seed=1)
+        self.assertTrue(0 < len(records) < 50)
+        # the same sample for the same seed
+        self.assertEqual(len(self.log(queries, threshold=1000.0, sample=0.5,
+                                      seed=1)),
+                         len(records))
+
+
+    def test_error(self):
+        log_file = StringIO()
+        self.cornet.set_hook(SlowQueryLog(log_file, threshold=0.0))
+        self.assertRaises(ValueError, self.cornet.get_lex_units_fuzzy,
+                          "homo", 5)
+        record = json.loads(log_file.getvalue())
+        self.assertTrue(record["error"].startswith("ValueError("))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the server metrics, and of the metrics and health endpoints
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+import urllib2
+import xmlrpclib
+
+from threading import Thread
+
+from synthdb import open_cornet
+
+from cornetto.metrics import ServerMetrics
+from cornetto.server import CornetProxy, CornetServer, register_functions
+
+
+
+class ServerMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = ServerMetrics()
+
+        for method, seconds, error in [ ("ask", 0.5, False),
+                                        ("ask", 2e-5, True),
+                                        ('say "hi"\\', 0.1, False) ]:
+            self.metrics.request_started()
+            self.metrics.request_finished(method, seconds, error)
+
+        self.metrics.request_started()
+        self.metrics.request_rejected("busy")
+        self.metrics.register_cache("results", lambda: (3, 1))
+
+
+    def test_stats(self):
+        stats = self.metrics.stats()
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertEqual(stats["rejected"], {"busy": 1})
+        self.assertEqual(stats["caches"]["results"],
+                         dict(hits=3, misses=1, hit_ratio=0.75))
+        ask = stats["methods"]["ask"]
+        self.assertEqual((ask["requests"], ask["errors"]), (2, 1))
+        self.assertEqual(ask["latency"]["max"], 0.5)
+        self.assertTrue(stats["rss_kb"] > 0)
+        # can be marshalled by XML-RPC
+        xmlrpclib.dumps((stats,), methodresponse=True)
+
+
+    def test_prometheus_text(self):
+        text = self.metrics.prometheus_text()
+        lines = text.splitlines()
+        self.assertTrue(text.endswith("\n"))
+
+        for line in [ "# TYPE cornetto_requests_total counter",
+                      'cornetto_requests_total{method="ask"} 2',
+                      'cornetto_request_errors_total{method="ask"} 1',
+                      "cornetto_requests_in_flight 1",
+                      "# TYPE cornetto_request_duration_seconds histogram",
+                      'cornetto_request_duration_seconds_bucket'
+                      '{le="+Inf",method="ask"} 2',
+                      'cornetto_request_duration_seconds_count'
+                      '{method="ask"} 2',
+                      'cornetto_requests_rejected_total{reason="busy"} 1',
+                      'cornetto_cache_hit_ratio{cache="results"} 0.75' ]:
+            self.assertTrue(line in lines, line)
+
+        # label values are escaped
+        self.assertTrue('cornetto_requests_total{method="say \\"hi\\"\\\\"} 1'
+                        in lines)
+
+        # buckets are cumulative
+        buckets = [ int(line.rsplit(" ", 1)[1]) for line in lines
+                    if line.startswith('cornetto_request_duration_seconds_'
+                                       'bucket') and 'method="ask"' in line ]
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual((buckets[0], buckets[-1]), (0, 2))
+
+        # every metric has help and a type
+        for line in lines:
+            if not line.startswith("#"):
+                name = line.split("{")[0].split(" ")[0]
+                self.assertTrue(any( name.startswith(other.split()[2])
+                                     for other in lines
+                                     if other.startswith("# TYPE") ), name)
+
+
+
+class EndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = CornetServer(("127.0.0.1", 0), logRequests=False,
+                                  encoding="UTF-8")
+        register_functions(cls.server, CornetProxy(cornet=open_cornet()))
+        thread = Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.url = "http://127.0.0.1:%d" % cls.server.server_address[1]
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def test_metrics(self):
+        proxy = xmlrpclib.ServerProxy(self.url)
+        self.assertEqual(proxy.get_lex_units("homo"),
+                         CornetProxy(cornet=open_cornet()).get_lex_units("homo"))
+        self.assertRaises(xmlrpclib.Fault, proxy.no_such_method)
+
+        response = urllib2.urlopen(self.url + "/metrics")
+        self.assertTrue(response.info()["content-type"].startswith(
+            "text/plain"))
+        lines = response.read().splitlines()
+        self.assertTrue('cornetto_requests_total{method="get_lex_units"} 1'
+                        in lines)
+        # unknown methods are counted together
+        self.assertTrue('cornetto_request_errors_total{method="unknown"} 1'
+                        in lines)
+
+        stats = proxy.stats()
+        self.assertEqual(stats["methods"]["get_lex_units"]["requests"], 1)
+
+
+    def test_health(self):
+        self.assertEqual(urllib2.urlopen(self.url + "/health").read(), "OK\n")
+        self.assertEqual(xmlrpclib.ServerProxy(self.url).health(), "OK")
+
+        try:
+            urllib2.urlopen(self.url + "/no/such/path")
+        except urllib2.HTTPError as inst:
+            self.assertEqual(inst.code, 404)
+        else:
+            self.fail("no 404 for unknown path")
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests that the parser engines load the same database
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+import warnings
+
+from synthdb import get_files
+
+from cornetto.parse import parse_cdb
+
+
+
+class ParseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cdb_lu, cdb_syn, db_file = get_files()
+        cls.etree = parse_cdb(cdb_lu, cdb_syn, engine="etree")
+        cls.lean = parse_cdb(cdb_lu, cdb_syn, engine="lean")
+
+
+    def test_same_ids(self):
+        for etree_map, lean_map in zip(self.etree[:3], self.lean[:3]):
+            self.assertEqual(sorted(lean_map), sorted(etree_map))
+
+
+    def test_same_edges(self):
+        self.assertEqual(_edges(self.lean[3]), _edges(self.etree[3]))
+
+
+    def test_pruned(self):
+        form2lu, c_lu_id2lu, sy_id2synset, graph = self.lean
+
+        for lu in c_lu_id2lu.itervalues():
+            self.assertEqual([ child.tag for child in lu ], ["form"])
+
+        for synset in sy_id2synset.itervalues():
+            for child in synset:
+                self.assertTrue(child.tag in ("synonyms",
+                                              "wn_internal_relations"),
+                                child.tag)
+
+
+    def test_deprecated_engine(self):
+        cdb_lu, cdb_syn, db_file = get_files()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            fast = parse_cdb(cdb_lu, cdb_syn, engine="fast")
+
+        self.assertEqual([ w.category for w in caught ], [DeprecationWarning])
+        self.assertEqual([ child.tag for child in fast[1].values()[0] ],
+                         ["form"])
+
+
+    def test_unknown_engine(self):
+        cdb_lu, cdb_syn, db_file = get_files()
+        self.assertRaises(ValueError, parse_cdb, cdb_lu, cdb_syn,
+                          engine="expat")
+
+
+
+def _edges(graph):
+    return sorted( (from_lu.get("c_lu_id"), to_lu.get("c_lu_id"),
+                    attr["relation"])
+                   for from_lu, to_lu, attr in graph.edges_iter(data=True) )
+
+
+
+if __name__ == "__main__":
+    unittest.main()
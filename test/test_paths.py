@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of path search, against all paths found by brute force
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+
+from synthdb import get_synthetic, open_cornet, open_sqlite_cornet
+
+
+# relation specifications searched
+_rel_specs = ("3", "HAS_HYPONYM5", "HAS_HYPERONYM5")
+
+
+
+class PathTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cornets = [ open_cornet(), open_sqlite_cornet() ]
+        forms = sorted(set( lu[1].decode("utf-8")
+                            for lu in get_synthetic().lex_units ))
+        # pairs of different forms, with a few related ones
+        cls.pairs = [ (form1, form2)
+                      for form1 in forms[:12] + [u"homo sapiens"]
+                      for form2 in forms[-12:] + [u"Homo Erectus"]
+                      if form1 != form2 ]
+
+
+    def test_shortest_path_dag(self):
+        found = 0
+
+        for cornet in self.cornets:
+            for rel_spec in _rel_specs:
+                for form1, paths in self.all_paths(cornet, rel_spec):
+                    for form2 in paths:
+                        dag = cornet.get_shortest_path_dag(form1, rel_spec,
+                                                           form2)
+                        self.assertEqual(_dag_paths(dag),
+                                         _shortest(paths[form2]),
+                                         (form1, rel_spec, form2))
+                        found += bool(dag)
+
+        self.assertTrue(found)
+
+
+    def test_k_shortest_paths(self):
+        for cornet in self.cornets:
+            for rel_spec in _rel_specs:
+                for form1, paths in self.all_paths(cornet, rel_spec):
+                    for form2 in paths:
+                        k_paths = cornet.get_k_shortest_paths(form1, rel_spec,
+                                                              form2, k=5)
+                        args = form1, rel_spec, form2
+                        # in order of length
+                        self.assertEqual(map(len, k_paths),
+                                         sorted(map(len, paths[form2]))[:5],
+                                         args)
+
+                        for path in k_paths:
+                            # without cycles
+                            self.assertEqual(len(set(path[::2])),
+                                             len(path[::2]), args)
+                            self.assertTrue(tuple(path) in paths[form2], args)
+
+                        # without duplicates
+                        self.assertEqual(len(set(map(tuple, k_paths))),
+                                         len(k_paths), args)
+
+
+    def test_test_lex_units_relation(self):
+        for cornet in self.cornets:
+            for rel_spec in _rel_specs:
+                for form1, paths in self.all_paths(cornet, rel_spec):
+                    for form2 in paths:
+                        path = cornet.test_lex_units_relation(form1, rel_spec,
+                                                              form2)
+                        shortest = _shortest(paths[form2])
+
+                        if shortest:
+                            self.assertTrue(tuple(path) in shortest)
+                        else:
+                            self.assertEqual(path, [])
+
+
+    def test_same_answers(self):
+        cornet, sqlite_cornet = self.cornets
+
+        for form1, form2 in self.pairs:
+            for rel_spec in _rel_specs:
+                args = form1, rel_spec, form2
+                self.assertEqual(
+                    _sorted_values(sqlite_cornet.get_shortest_path_dag(*args)),
+                    _sorted_values(cornet.get_shortest_path_dag(*args)), args)
+                self.assertEqual(
+                    map(len, sqlite_cornet.get_k_shortest_paths(*args)),
+                    map(len, cornet.get_k_shortest_paths(*args)), args)
+
+
+    def test_expand_forward(self):
+        for cornet in self.cornets:
+            lus = cornet._get_lex_units(self.pairs[0][0])[:1]
+            # any relation, as returned by _split_rel_spec("+")
+            self.assertEqual(cornet._get_mean_degrees(""),
+                             cornet._get_mean_degrees(None))
+            self.assertNotEqual(cornet._get_mean_degrees(""), (1.0, 1.0))
+            # lexical units have more hyponyms than hyperonyms, so for fringes
+            # of the same size the side with fewer edges to scan differs
+            self.assertFalse(cornet._expand_forward(lus, lus, "HAS_HYPONYM"))
+            self.assertTrue(cornet._expand_forward(lus, lus, "HAS_HYPERONYM"))
+
+
+    def all_paths(self, cornet, rel_spec):
+        """
+        Iterate over pairs of a source form and a dict mapping target forms
+        to the set of all paths without cycles from the source to the
+        target (as tuples of lexical units and relations in spec format)
+        """
+        rel_name, depth = cornet._split_rel_spec(rel_spec)
+        sources = sorted(set( form1 for form1, form2 in self.pairs ))
+
+        for form1 in sources:
+            # paths from the source, as tuples of lexical units and edges
+            paths = []
+
+            for lu in cornet._get_lex_units(form1):
+                _extend((lu,), paths, cornet, rel_name, depth)
+
+            form2paths = {}
+
+            for form2 in [ form2 for f1, form2 in self.pairs if f1 == form1 ]:
+                targets = set(cornet._get_lex_units(form2))
+                form2paths[form2] = set( _format_path(cornet, path)
+                                         for path in paths
+                                         if path[-1] in targets )
+
+            yield form1, form2paths
+
+
+
+def _extend(path, paths, cornet, rel_name, depth):
+    """
+    Add all extensions of path, of at most depth relations, to paths
+    """
+    paths.append(path)
+
+    if depth:
+        for from_lu, to_lu, edge in cornet._out_edges(path[-1], rel_name):
+            if to_lu not in path[::2]:
+                _extend(path + (edge, to_lu), paths, cornet, rel_name,
+                        depth - 1)
+
+
+def _format_path(cornet, path):
+    return tuple( cornet._lu_to_spec(item) if i % 2 == 0
+                  else cornet._get_rel_name(item)
+                  for i, item in enumerate(path) )
+
+
+def _shortest(paths):
+    # paths which end at an earlier target are longer than that one
+    if paths:
+        length = min(map(len, paths))
+        return set( path for path in paths if len(path) == length )
+
+    return set()
+
+
+def _dag_paths(dag):
+    """
+    Return the set of paths in a graph as returned by get_shortest_path_dag
+    """
+    preds = set( pred for lu_preds in dag.values() for pred, rel in lu_preds )
+    paths = set()
+
+    def extend(path):
+        if dag[path[0]]:
+            for pred, rel in dag[path[0]]:
+                extend((pred, rel) + path)
+        else:
+            paths.add(path)
+
+    for lu in dag:
+        if lu not in preds:
+            extend((lu,))
+
+    return paths
+
+
+def _sorted_values(d):
+    return dict( (key, sorted(value)) for key, value in d.items() )
+
+
+
+if __name__ == "__main__":
+    unittest.main()
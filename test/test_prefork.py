@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the prefork server over the loopback interface
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import os
+import signal
+import unittest
+import xmlrpclib
+
+from time import sleep, time
+
+from synthdb import get_files, open_sqlite_cornet
+
+from cornetto.client import CornetClient
+from cornetto.prefork import PreforkSupervisor
+from cornetto.server import CornetProxy
+
+
+
+class PreforkServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cdb_lu, cdb_syn, db_file = get_files()
+        cls.proxy = CornetProxy(cornet=open_sqlite_cornet())
+        supervisor = PreforkSupervisor(db_file, "127.0.0.1", 0, workers=2,
+                                       cdb_lu=cdb_lu, cdb_syn=cdb_syn)
+        cls.port = supervisor.socket.getsockname()[1]
+        cls.url = "http://127.0.0.1:%d" % cls.port
+        cls.pid = os.fork()
+
+        if not cls.pid:
+            # child
+            try:
+                supervisor.serve_forever()
+            finally:
+                os._exit(0)
+
+        supervisor.socket.close()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        # the supervisor stops its workers first
+        os.kill(cls.pid, signal.SIGTERM)
+        os.waitpid(cls.pid, 0)
+
+
+    def test_round_trip(self):
+        spec = '"homo sapiens":noun:1 HAS_HYPERONYM'
+
+        for protocol in "json", "xmlrpc":
+            with CornetClient("127.0.0.1", self.port,
+                              protocol=protocol) as client:
+                self.assertEqual(client.get_lex_units("homo sapiens"),
+                                 self.proxy.get_lex_units("homo sapiens"))
+                self.assertEqual(client.ask(spec, format="xml"),
+                                 self.proxy.ask(spec, "xml"))
+                results = client.batch([ ("get_lex_units", ("homo",)),
+                                         ("no_such_method", ()) ])
+                self.assertEqual(results[0],
+                                 self.proxy.get_lex_units("homo"))
+                self.assertTrue(isinstance(results[1], xmlrpclib.Fault))
+
+
+    def test_reload(self):
+        status = xmlrpclib.ServerProxy(self.url).reload_status()
+        self.assertNotEqual(status["pid"], self.pid)
+        started = time()
+        self.assertTrue(xmlrpclib.ServerProxy(self.url).reload())
+
+        # old workers are replaced by ones started after the reload
+        while time() - started < 10:
+            status = xmlrpclib.ServerProxy(self.url).reload_status()
+
+            if status["loaded_at"] >= started:
+                break
+
+            sleep(0.05)
+
+        self.assertTrue(status["loaded_at"] >= started)
+        # and the database is still served
+        self.assertEqual(xmlrpclib.ServerProxy(self.url).get_lex_units("homo"),
+                         self.proxy.get_lex_units("homo"))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the server proxy, with Cornet as well as SqliteCornet
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import signal
+import unittest
+import xmlrpclib
+
+from time import sleep
+
+from synthdb import get_files, get_synthetic, open_cornet, open_sqlite_cornet
+
+from cornetto.server import CornetProxy, create_reloader
+
+
+
+class CornetProxyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.proxies = [ CornetProxy(cornet=open_cornet()),
+                        CornetProxy(cornet=open_sqlite_cornet()) ]
+        cls.forms = sorted(set( lu[1].decode("utf-8")
+                                for lu in get_synthetic().lex_units ))
+
+
+    def call(self, method, *args):
+        """
+        Call method on all proxies, check that the results can be sent by
+        XML-RPC and are the same, and return the result
+        """
+        results = []
+
+        for proxy in self.proxies:
+            result = getattr(proxy, method)(*args)
+            xmlrpclib.dumps((result,), methodresponse=True)
+            results.append(result)
+
+        for result in results[1:]:
+            self.assertEqual(_sorted_values(result),
+                             _sorted_values(results[0]),
+                             "%s%r" % (method, args))
+
+        return results[0]
+
+
+    def test_get_related_synsets(self):
+        rel_names = set()
+
+        for form in self.forms:
+            for rel_name in self.call("get_related_synsets", form):
+                self.assertTrue(isinstance(rel_name, basestring), rel_name)
+                rel_names.add(rel_name)
+                # relation names are case insensitive
+                self.assertEqual(self.call("get_related_synsets", form,
+                                           rel_name.lower()).keys(),
+                                 [rel_name])
+
+        self.assertTrue("HAS_HYPERONYM" in rel_names)
+        self.assertEqual(self.call("get_related_synsets", self.forms[0],
+                                   "NO_SUCH_RELATION"), {})
+
+
+    def test_get_related_synsets_xml(self):
+        for form in self.forms[:20]:
+            for rel in self.call("get_related_synsets", form, "HAS_HYPERONYM",
+                                 "xml"):
+                self.assertTrue(rel.startswith('<relation '
+                                               'relation_name="HAS_HYPERONYM"'),
+                                rel)
+
+
+
+    def test_test_lex_units_relation_xml(self):
+        # the extra lexical units are hyponyms of the first synset
+        synth = get_synthetic()
+        c_lu_id = synth.synsets[0][1][0]
+        hypernym = [ form for lu_id, form, cat, sense in synth.lex_units
+                     if lu_id == c_lu_id ][0]
+
+        for proxy in self.proxies:
+            path = proxy.test_lex_units_relation("homo sapiens",
+                                                 "HAS_HYPERONYM", hypernym,
+                                                 "xml")
+            self.assertEqual(len(path), 3)
+            self.assertEqual(path[1],
+                             '<relation relation_name="HAS_HYPERONYM"/>')
+
+
+
+class ReloaderTest(unittest.TestCase):
+
+    def test_reload_without_sighup(self):
+        # as on MS Windows, where there is no SIGHUP
+        cdb_lu, cdb_syn, db_file = get_files()
+        proxy = CornetProxy(cornet=open_cornet())
+        old_cornet = proxy._generation.cornet
+        sighup = signal.SIGHUP
+        del signal.SIGHUP
+
+        try:
+            reloader = create_reloader(proxy, cdb_lu, cdb_syn)
+        finally:
+            signal.SIGHUP = sighup
+
+        self.assertTrue(reloader.reload())
+
+        for i in range(600):
+            if reloader.state == "serving": break
+            sleep(0.05)
+
+        self.assertEqual(reloader.status()["reloads"], 1)
+        self.assertFalse(proxy._generation.cornet is old_cornet)
+        self.assertEqual(proxy.get_lex_units("homo sapiens"),
+                         ['"homo sapiens":noun:1'])
+
+
+
+def _sorted_values(d):
+    return dict( (key, sorted(value)) for key, value in d.items() )
+
+
+
+if __name__ == "__main__":
+    unittest.main()
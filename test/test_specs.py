@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests that lexical unit specifications in answers can be asked again
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+
+from synthdb import get_synthetic, open_cornet, open_sqlite_cornet
+
+
+
+class SpecTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cornets = [ open_cornet(), open_sqlite_cornet() ]
+        cls.forms = sorted(set( lu[1].decode("utf-8")
+                                for lu in get_synthetic().lex_units ))
+
+
+    def test_round_trip(self):
+        for cornet in self.cornets:
+            for form in self.forms:
+                for spec in cornet.get_lex_units(form):
+                    self.assertEqual(cornet.get_lex_units(spec), [spec])
+                    self.assertEqual(cornet.ask(spec), [spec])
+
+
+    def test_multi_word_units(self):
+        for cornet in self.cornets:
+            self.assertEqual(cornet.get_lex_units("homo sapiens"),
+                             ['"homo sapiens":noun:1'])
+            self.assertEqual(cornet.ask('"op  de hoogte"'),
+                             ['"op de hoogte":adj:1'])
+            # related lexical units of a multi-word unit, asked the other
+            # way round
+            spec = '"homo sapiens":noun:1'
+            related = cornet.ask(spec + " HAS_HYPERONYM")
+            self.assertTrue(related[spec]["HAS_HYPERONYM"])
+
+            for other in related[spec]["HAS_HYPERONYM"]:
+                answer = cornet.ask(other + " HAS_HYPONYM")
+                self.assertTrue(spec in answer[other]["HAS_HYPONYM"])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests that SqliteCornet gives the same answers as Cornet
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import unittest
+
+from synthdb import get_synthetic, open_cornet, open_sqlite_cornet
+
+
+
+class SqliteCornetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cornet = open_cornet()
+        cls.sqlite_cornet = open_sqlite_cornet()
+        synth = get_synthetic()
+        cls.forms = sorted(set( lu[1].decode("utf-8")
+                                for lu in synth.lex_units ))
+        cls.specs = [ u"%s:%s:%s" % (form.decode("utf-8"), cat, sense)
+                      for c_lu_id, form, cat, sense in synth.lex_units ]
+        cls.c_lu_ids = [ lu[0] for lu in synth.lex_units ]
+        cls.c_sy_ids = [ synset[0] for synset in synth.synsets ]
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sqlite_cornet.close()
+
+
+    def assertSameAnswers(self, method, args_list, normalize=lambda x: x):
+        for args in args_list:
+            expected = getattr(self.cornet, method)(*args)
+            answer = getattr(self.sqlite_cornet, method)(*args)
+            self.assertEqual(normalize(answer), normalize(expected),
+                             "%s%r" % (method, args))
+
+
+    def test_get_lex_units(self):
+        self.assertSameAnswers("get_lex_units",
+                               [ (form,) for form in self.forms ] +
+                               [ (spec,) for spec in self.specs ] +
+                               [ ("lamp::2",), ("bestaat niet",) ],
+                               sorted)
+
+
+    def test_get_lex_units_xml(self):
+        self.assertSameAnswers("get_lex_units",
+                               [ (spec, "xml") for spec in self.specs[:20] ])
+
+
+    def test_get_lex_units_utf8(self):
+        # utf-8 encoded specifications, like those from the command line
+        self.assertSameAnswers("get_lex_units",
+                               [ ("caf\xc3\xa9",), ("caf\xc3\xa9:noun",),
+                                 (u"caf\xe9",) ],
+                               sorted)
+
+
+    def test_match_lex_units(self):
+        # results in the same order, also for suffix patterns
+        self.assertSameAnswers("match_lex_units",
+                               [ (pattern, limit)
+                                 for pattern in ("a*", "ka*:noun", "*en",
+                                                 "*e?", "*a*e", "[!a-k]*s",
+                                                 "homo*", "*je",
+                                                 u"caf\xe9*", "caf\xc3\xa9*",
+                                                 "*\xc3\xa9", "bestaat*niet")
+                                 for limit in (None, 5) ])
+
+
+    def test_match_lex_units_folded(self):
+        for cornet in open_cornet(form_folding="all"), \
+                      open_sqlite_cornet(form_folding="all"):
+            self.assertEqual(cornet.match_lex_units("HOMO*"),
+                             ['"Homo Erectus":noun:1',
+                              '"homo sapiens":noun:1'])
+            self.assertEqual(cornet.match_lex_units("*ERECTUS"),
+                             ['"Homo Erectus":noun:1'])
+            self.assertEqual(cornet.match_lex_units("Cafe"),
+                             [u"caf\xe9:noun:1"])
+            self.assertEqual(cornet.match_lex_units(u"CAF\xc9*", 1),
+                             [u"caf\xe9:noun:1"])
+
+
+    def test_get_synsets(self):
+        self.assertSameAnswers("get_synsets",
+                               [ (form,) for form in self.forms ],
+                               _sorted_synsets)
+
+
+    def test_get_related_lex_units(self):
+        self.assertSameAnswers("get_related_lex_units",
+                               [ (form, rel_spec)
+                                 for form in self.forms
+                                 for rel_spec in ("HAS_HYPERONYM",
+                                                  "HAS_HYPONYM2", "1") ])
+
+
+    def test_test_lex_units_relation(self):
+        # any shortest path will do
+        self.assertSameAnswers("test_lex_units_relation",
+                               [ (form1, rel_spec, form2)
+                                 for form1 in self.forms[:20]
+                                 for form2 in self.forms[-20:]
+                                 for rel_spec in ("HAS_HYPERONYM+", "+") ],
+                               len)
+
+
+    def test_get_lex_unit_by_id(self):
+        self.assertSameAnswers("get_lex_unit_by_id",
+                               [ (c_lu_id,) for c_lu_id in self.c_lu_ids ] +
+                               [ ("no_such_id",) ])
+
+
+    def test_get_synset_by_id(self):
+        self.assertSameAnswers("get_synset_by_id",
+                               [ (c_sy_id,) for c_sy_id in self.c_sy_ids ] +
+                               [ ("no_such_id",) ],
+                               _sorted_synset)
+
+
+    def test_get_lex_unit_from_synset(self):
+        synth = get_synthetic()
+        c_lu_id2form = dict( (c_lu_id, form.decode("utf-8"))
+                             for c_lu_id, form, cat, sense in synth.lex_units )
+        pairs = [ (c_sy_id, c_lu_id2form[c_lu_ids[0]])
+                  for c_sy_id, c_lu_ids in synth.synsets ]
+        self.assertSameAnswers("get_lex_unit_from_synset",
+                               pairs + [ (self.c_sy_ids[0], "bestaat niet") ])
+        self.assertSameAnswers("get_lex_units_from_synsets", [ (pairs,) ])
+
+
+    def test_all_common_subsumers(self):
+        self.assertSameAnswers("all_common_subsumers",
+                               [ (form1, form2)
+                                 for form1 in self.forms[:20]
+                                 for form2 in self.forms[-20:] ],
+                               _sorted_values)
+
+
+
+def _sorted_synset(synset):
+    return synset and sorted(synset)
+
+
+def _sorted_synsets(synsets):
+    return sorted( sorted(synset) for synset in synsets )
+
+
+def _sorted_values(d):
+    return dict( (key, sorted(value)) for key, value in d.items() )
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2008-2013 by
+# Erwin Marsi and Tilburg University
+
+
+# This file is part of the Pycornetto package.
+
+# Pycornetto is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# Pycornetto is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+tests of the JSON-RPC and MessagePack wire formats and gzip compression
+"""
+
+__author__ = 'Erwin Marsi <e.marsi@gmail.com>'
+__version__ = '0.6.1'
+
+
+import json
+import unittest
+import urllib2
+import xmlrpclib
+
+from threading import Thread
+
+from synthdb import open_cornet
+
+from cornetto import wire
+from cornetto.server import CornetDispatcher, CornetProxy, CornetServer, \
+     register_functions
+from cornetto.wire import JsonRpcCodec, MsgpackCodec, WireError, \
+     XmlRpcCodec, compress, decompress, get_codec, handle, msgpack
+
+
+
+class CodecTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dispatcher = CornetDispatcher()
+        cls.proxy = CornetProxy(cornet=open_cornet())
+        register_functions(cls.dispatcher, cls.proxy)
+
+
+    def call(self, request, codec=None, **kwargs):
+        """
+        Handle a JSON-RPC request, given as an object, and return the
+        decoded response
+        """
+        codec = codec or JsonRpcCodec()
+        body, encoding, timings = handle(self.dispatcher, codec,
+                                         codec.dumps(request), **kwargs)
+        self.assertEqual(encoding, None)
+        return codec.loads(body) if body else None
+
+
+    def test_call(self):
+        response = self.call(dict(jsonrpc="2.0", method="get_lex_units",
+                                  params=["homo"], id=7))
+        self.assertEqual(response, dict(jsonrpc="2.0", id=7,
+                                        result=self.proxy.get_lex_units("homo")))
+
+
+    def test_batch(self):
+        response = self.call([ dict(jsonrpc="2.0", method="echo",
+                                    params=[i], id=i)
+                               for i in range(3) ] +
+                             [ dict(jsonrpc="2.0", method="echo",
+                                    params=["ignored"]) ])
+        # no response to the notification
+        self.assertEqual([ (r["id"], r["result"]) for r in response ],
+                         [(0, 0), (1, 1), (2, 2)])
+
+
+    def test_notification(self):
+        self.assertEqual(self.call(dict(jsonrpc="2.0", method="echo",
+                                        params=[1])),
+                         None)
+
+
+    def test_errors(self):
+        for request, code in [
+            (dict(jsonrpc="2.0", method="no_such_method", id=1),
+             wire.METHOD_NOT_FOUND),
+            (dict(jsonrpc="2.0", method="get_lex_units", params=[], id=1),
+             wire.SERVER_ERROR),
+            ([], wire.INVALID_REQUEST),
+            ("get_lex_units", wire.INVALID_REQUEST),
+            (dict(jsonrpc="2.0", method=1, id=1), wire.INVALID_REQUEST),
+            (dict(jsonrpc="2.0", method="echo", params={"s": 1}, id=1),
+             wire.INVALID_REQUEST) ]:
+            response = self.call(request)
+            self.assertEqual(response["error"]["code"], code, request)
+            self.assertTrue(response["error"]["message"], request)
+
+        body, encoding, timings = handle(self.dispatcher, JsonRpcCodec(),
+                                         "{not json")
+        self.assertEqual(json.loads(body)["error"]["code"], wire.PARSE_ERROR)
+        self.assertEqual(timings, [])
+
+
+    def test_timings(self):
+        body, encoding, timings = handle(
+            self.dispatcher, JsonRpcCodec(),
+            '[{"method": "echo", "params": [1], "id": 1},'
+            ' {"method": "no_such_method", "id": 2}]')
+        self.assertEqual([ (method, error) for method, seconds, error
+                           in timings ],
+                         [("echo", False), ("no_such_method", True)])
+
+
+    def test_native_none(self):
+        # None is marshalled as null, whereas XML-RPC cannot marshal it
+        self.assertEqual(self.call(dict(jsonrpc="2.0", method="echo",
+                                        params=[None], id=1))["result"],
+                         None)
+        body, encoding, timings = handle(
+            self.dispatcher, XmlRpcCodec(),
+            xmlrpclib.dumps(("homo",), "get_lex_units"))
+        self.assertEqual(xmlrpclib.loads(body)[0][0],
+                         self.proxy.get_lex_units("homo"))
+
+
+    def test_xml_rpc_errors(self):
+        self.assertRaises(WireError, XmlRpcCodec().decode, "<not xml")
+        body, encoding, timings = handle(
+            self.dispatcher, XmlRpcCodec(),
+            xmlrpclib.dumps((), "no_such_method"))
+        self.assertRaises(xmlrpclib.Fault, xmlrpclib.loads, body)
+
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        codec = MsgpackCodec()
+        response = self.call([ dict(jsonrpc="2.0", method="echo",
+                                    params=[u"caf\xe9"], id=1),
+                               dict(jsonrpc="2.0", method="no_such_method",
+                                    id=2) ], codec)
+        self.assertEqual(response[0]["result"], u"caf\xe9")
+        self.assertEqual(response[1]["error"]["code"], wire.METHOD_NOT_FOUND)
+
+
+    def test_get_codec(self):
+        for path in "/", "/RPC2":
+            self.assertTrue(isinstance(get_codec(path), XmlRpcCodec))
+
+        self.assertTrue(isinstance(get_codec("/json"), JsonRpcCodec))
+        self.assertEqual(get_codec("/other"), None)
+
+        if msgpack is None:
+            self.assertEqual(get_codec("/msgpack"), None)
+        else:
+            self.assertTrue(isinstance(get_codec("/msgpack"), MsgpackCodec))
+
+
+
+class CompressionTest(unittest.TestCase):
+
+    def test_compress(self):
+        large = "x" * (wire.gzip_threshold + 1)
+        body, encoding = compress(large, "deflate, gzip;q=1.0")
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(decompress(body, "GZIP"), large)
+        # small bodies, or clients which do not accept gzip
+        self.assertEqual(compress("x", "gzip"), ("x", None))
+        self.assertEqual(compress(large, "deflate"), (large, None))
+        self.assertEqual(compress(large, ""), (large, None))
+
+
+    def test_decompress(self):
+        self.assertEqual(decompress("x", ""), "x")
+        self.assertEqual(decompress("x", "identity"), "x")
+
+        for content_encoding, code in [ ("gzip", wire.PARSE_ERROR),
+                                        ("br", wire.INVALID_REQUEST) ]:
+            try:
+                decompress("not compressed", content_encoding)
+            except WireError as inst:
+                self.assertEqual(inst.code, code)
+            else:
+                self.fail("no error for " + content_encoding)
+
+
+    def test_handle(self):
+        dispatcher = CornetDispatcher()
+        register_functions(dispatcher, CornetProxy(cornet=open_cornet()))
+        codec = JsonRpcCodec()
+        large = u"x" * (wire.gzip_threshold + 1)
+        request = xmlrpclib.gzip_encode(codec.dumps(
+            dict(jsonrpc="2.0", method="echo", params=[large], id=1)))
+        body, encoding, timings = handle(dispatcher, codec, request,
+                                         "gzip", "gzip")
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(json.loads(xmlrpclib.gzip_decode(body))["result"],
+                         large)
+
+
+
+class EndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = CornetServer(("127.0.0.1", 0), logRequests=False,
+                                  encoding="UTF-8")
+        register_functions(cls.server, CornetProxy(cornet=open_cornet()))
+        thread = Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.url = "http://127.0.0.1:%d/json" % cls.server.server_address[1]
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def test_json(self):
+        large = u"caf\xe9" * wire.gzip_threshold
+        request = urllib2.Request(
+            self.url,
+            json.dumps([ dict(jsonrpc="2.0", method="echo", params=[large],
+                              id=1),
+                         dict(jsonrpc="2.0", method="get_lex_units",
+                              params=["homo"], id=2) ]),
+            {"Content-Type": "application/json", "Accept-Encoding": "gzip"})
+        response = urllib2.urlopen(request)
+        self.assertEqual(response.info()["content-type"], "application/json")
+        self.assertEqual(response.info()["content-encoding"], "gzip")
+        results = json.loads(xmlrpclib.gzip_decode(response.read()))
+        self.assertEqual(results[0]["result"], large)
+        self.assertEqual(results[1]["result"],
+                         CornetProxy(cornet=open_cornet()).get_lex_units("homo"))
+        # XML-RPC on the same server
+        self.assertEqual(xmlrpclib.ServerProxy(self.url[:-5]).echo(1), 1)
+
+
+
+if __name__ == "__main__":
+    unittest.main()